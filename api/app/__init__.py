@@ -1,11 +1,14 @@
 # app/__init__.py
 import logging
-from flask import Flask, request
+from datetime import datetime
+from flask import Flask
 from flask_cors import CORS
 # Import instances from our new extensions file
-from app.extensions import scheduler, redis_client
+from app.extensions import scheduler, storage_health
+from app.access_log import init_access_log
+from app.metrics import init_route_metrics
+from app.tracing import init_request_tracing
 from app.routes import bp
-import redis # <--- ADD THIS LINE to handle the exception type
 import os
 
 def create_app():
@@ -19,17 +22,12 @@ def create_app():
     logging.basicConfig(level=logging.INFO,
                         format='%(asctime)s %(levelname)s %(name)s %(threadName)s : %(message)s')
     
-    # Log all incoming requests
-    @app.before_request
-    def log_request_info():
-        app.logger.info('Headers: %s', request.headers)
-        app.logger.info('Body: %s', request.get_data())
-
-    # Log all responses
-    @app.after_request
-    def log_response_info(response):
-        app.logger.info('Response: %s', response.get_data())
-        return response
+    # Sampled one-line access log; payloads only with ACCESS_LOG_PAYLOADS=1
+    init_access_log(app)
+    # Per-route latency and payload size histograms for /metrics
+    init_route_metrics(app)
+    # Root span per API request; spans are viewable at /debug/traces
+    init_request_tracing(app)
 
     # Enable CORS for all routes
     # Allow localhost for development and production domains
@@ -59,15 +57,14 @@ def create_app():
         # Frontend dev server will handle static assets on port 3000
         pass
 
-    # --- Check Redis Connection ---
-    try:
-        redis_client.ping()
-        print("Successfully connected to Redis!")
-    except redis.exceptions.ConnectionError as e: # This will now work correctly
-        error_message = f"Could not connect to Redis: {e}"
-        print(error_message)
-        # Raise an exception to prevent the app from starting with a failed Redis connection:
-        raise Exception(error_message)
+    # --- Check Storage Connection ---
+    health = storage_health()
+    if health['ok']:
+        print(f"Successfully connected to the {health['backend']} storage backend!")
+    else:
+        # Start anyway: reads fall back to the local snapshot files (flagged stale) until Redis is back
+        print(f"Could not connect to the {health['backend']} storage backend, "
+              f"serving local snapshots until it is back: {health['error']}")
 
     # --- Register Blueprints ---
     app.register_blueprint(bp)
@@ -110,17 +107,7 @@ def create_app():
     # Import tasks here, inside the factory, to ensure the app context is available
     # and to avoid circular imports.
     with app.app_context():
-        from app.tasks import update_weather_data_job, update_water_data_job, update_forecast_scores_job, update_short_term_forecast_job, update_noaa_stageflow_job, update_extended_weather_data_job, update_extended_forecast_scores_job
-
-        # Run data population jobs immediately on startup to refresh Redis cache
-        update_weather_data_job()
-        update_water_data_job()
-        update_forecast_scores_job()
-        # Optionally, run other update jobs as needed
-        # update_short_term_forecast_job()
-        # update_noaa_stageflow_job()
-        # update_extended_weather_data_job()
-        # update_extended_forecast_scores_job()
+        from app.tasks import JOB_SCHEDULE, refresh_core_data
 
         if not scheduler.running:
             scheduler.init_app(app) # Initialize scheduler with the app
@@ -130,56 +117,15 @@ def create_app():
         scheduler.remove_all_jobs()
         
         # Add new jobs
-        scheduler.add_job(
-            id='Update Weather Data',
-            func=update_weather_data_job,
-            trigger='interval',
-            minutes=10  # Reduced frequency for API rate limiting
-        )
-        scheduler.add_job(
-            id='Update Water Data',
-            func=update_water_data_job,
-            trigger='interval',
-            minutes=15  # Reduced frequency for API rate limiting
-        )
-        scheduler.add_job(
-            id='Update Forecast Scores',
-            func=update_forecast_scores_job,
-            trigger='interval',
-            minutes=10  # Calculate forecast scores after data updates
-        )
-        scheduler.add_job(
-            id='Update Short-term Forecast',
-            func=update_short_term_forecast_job,
-            trigger='interval',
-            minutes=5  # Update 15-minute forecast more frequently
-        )
-        scheduler.add_job(
-            id='Update NOAA Stageflow Data',
-            func=update_noaa_stageflow_job,
-            trigger='interval',
-            minutes=30  # NOAA data updates less frequently
-        )
-        scheduler.add_job(
-            id='Update Extended Weather Data',
-            func=update_extended_weather_data_job,
-            trigger='interval',
-            minutes=60  # Extended weather data updates hourly
-        )
-        scheduler.add_job(
-            id='Update Extended Forecast Scores',
-            func=update_extended_forecast_scores_job,
-            trigger='interval',
-            minutes=30  # Calculate extended forecast scores after NOAA updates
-        )
-        # Run initial data fetch and forecasting immediately
-        # TODO: Temporarily disabled to allow server to start - these jobs should run in background
-        # update_weather_data_job()
-        # update_water_data_job()
-        # update_noaa_stageflow_job()
-        # update_extended_weather_data_job()
-        # update_forecast_scores_job()
-        # update_extended_forecast_scores_job()
-        # update_short_term_forecast_job()
+        for job in JOB_SCHEDULE:
+            scheduler.add_job(
+                id=job['id'],
+                func=job['func'],
+                trigger='interval',
+                minutes=job['minutes']
+            )
+        # Refresh the core data right away, in the background, so the app starts serving at
+        # once: from the last published snapshots (or the local snapshot files) until it is done
+        scheduler.add_job(id='Refresh Core Data', func=refresh_core_data, trigger='date', run_date=datetime.now())
 
     return app
\ No newline at end of file
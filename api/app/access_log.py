@@ -0,0 +1,62 @@
+# app/access_log.py
+
+import json
+import logging
+import os
+import random
+import time
+from flask import g, request
+
+logger = logging.getLogger('rowcast.access')
+
+# Fraction of successful requests written to the access log (0 disables, 1 logs every one).
+# Server errors and slow requests are always logged.
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv('ACCESS_LOG_SAMPLE_RATE', '0.1'))
+# Requests slower than this many milliseconds are always logged
+ACCESS_LOG_SLOW_MS = float(os.getenv('ACCESS_LOG_SLOW_MS', '1000'))
+# Debug only: also log request headers and bodies and response bodies
+ACCESS_LOG_PAYLOADS = os.getenv('ACCESS_LOG_PAYLOADS', '').lower() in ('1', 'true', 'yes')
+# Logged bodies are cut to this many bytes, so large responses (e.g. /api/complete/extended) stay out of the log
+ACCESS_LOG_PAYLOAD_MAX_BYTES = int(os.getenv('ACCESS_LOG_PAYLOAD_MAX_BYTES', '4096'))
+
+
+def _payload(body):
+    """Returns a request or response body for the log, cut to ACCESS_LOG_PAYLOAD_MAX_BYTES."""
+    if len(body) <= ACCESS_LOG_PAYLOAD_MAX_BYTES:
+        return body.decode('utf-8', 'replace')
+    return f"{body[:ACCESS_LOG_PAYLOAD_MAX_BYTES].decode('utf-8', 'replace')}... ({len(body)} bytes)"
+
+
+def init_access_log(app):
+    """Registers hooks writing one structured JSON line per (sampled) request."""
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        started = g.get('request_started')
+        latency_ms = (time.perf_counter() - started) * 1000 if started is not None else None
+        sampled = random.random() < ACCESS_LOG_SAMPLE_RATE
+        if not (sampled or response.status_code >= 500 or (latency_ms or 0) >= ACCESS_LOG_SLOW_MS):
+            return response
+
+        entry = {
+            'method': request.method,
+            'route': request.url_rule.rule if request.url_rule else None,
+            'path': request.path,
+            'status': response.status_code,
+            # Streamed responses (e.g. /api/stream) have no length up front
+            'bytes': response.content_length,
+            'latencyMs': round(latency_ms, 2) if latency_ms is not None else None,
+            'encoding': response.headers.get('Content-Encoding'),
+            'sampleRate': ACCESS_LOG_SAMPLE_RATE,
+        }
+        if ACCESS_LOG_PAYLOADS:
+            entry['requestHeaders'] = dict(request.headers)
+            entry['requestBody'] = _payload(request.get_data())
+            if not response.is_streamed and not response.headers.get('Content-Encoding'):
+                entry['responseBody'] = _payload(response.get_data())
+        logger.info(json.dumps(entry))
+        return response
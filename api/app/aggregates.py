@@ -0,0 +1,75 @@
+# app/aggregates.py
+
+import os
+from collections import Counter
+from datetime import datetime
+from app.utils import EST, to_epoch
+
+# Scores an hour must reach to count towards a day's "hours above" tallies,
+# e.g. ROWCAST_DAILY_THRESHOLDS="5,7,8".
+DAILY_THRESHOLDS = tuple(
+    float(value) for value in os.getenv('ROWCAST_DAILY_THRESHOLDS', '5,7,8').split(',') if value.strip()
+)
+
+# Bucket edges of the per-day score histogram: [0,2), [2,4), [4,6), [6,8), [8,10]
+HISTOGRAM_EDGES = (2, 4, 6, 8)
+
+
+def _percentile(ordered, fraction):
+    """Linear-interpolated percentile of an already sorted list."""
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _limiting_factor(factors):
+    """Returns the name of the lowest-scoring factor of an hour, or None."""
+    scored = {name: value for name, value in (factors or {}).items() if isinstance(value, (int, float))}
+    return min(scored, key=scored.get) if scored else None
+
+
+def _summarize_day(day, hours, thresholds):
+    scores = sorted(score for _, score, _ in hours)
+    best = max(hours, key=lambda hour: hour[1])
+    worst = min(hours, key=lambda hour: hour[1])
+    histogram = [0] * (len(HISTOGRAM_EDGES) + 1)
+    for score in scores:
+        histogram[sum(score >= edge for edge in HISTOGRAM_EDGES)] += 1
+    limiting = Counter(factor for _, _, factor in hours if factor)
+    dominant = limiting.most_common(1)[0] if limiting else None
+    return {
+        'date': day,
+        'hours': len(scores),
+        'min': round(scores[0], 2),
+        'max': round(scores[-1], 2),
+        'mean': round(sum(scores) / len(scores), 2),
+        'median': round(_percentile(scores, 0.5), 2),
+        'p25': round(_percentile(scores, 0.25), 2),
+        'p75': round(_percentile(scores, 0.75), 2),
+        'histogram': histogram,
+        'bestHour': {'timestamp': best[0], 'score': best[1]},
+        'worstHour': {'timestamp': worst[0], 'score': worst[1]},
+        'hoursAbove': {f"{threshold:g}": sum(score >= threshold for score in scores) for threshold in thresholds},
+        'limitingFactor': {'factor': dominant[0], 'hours': dominant[1]} if dominant else None
+    }
+
+
+def build_daily_summary(rows, thresholds=DAILY_THRESHOLDS):
+    """
+    Aggregates hourly forecast score rows into one entry per America/New_York calendar day:
+    score distribution, best and worst hour, hours at or above each threshold and the factor
+    that most often limits the score.
+    """
+    days = {}
+    for row in rows:
+        score = row.get('score')
+        if not row.get('timestamp') or not isinstance(score, dict) or score.get('score') is None:
+            continue
+        day = datetime.fromtimestamp(to_epoch(row['timestamp']), EST).date().isoformat()
+        days.setdefault(day, []).append((row['timestamp'], score['score'], _limiting_factor(score.get('factors'))))
+    return {
+        'thresholds': list(thresholds),
+        'histogramEdges': [0, *HISTOGRAM_EDGES, 10],
+        'days': [_summarize_day(day, hours, thresholds) for day, hours in sorted(days.items())]
+    }
@@ -0,0 +1,90 @@
+# app/events.py
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from app.extensions import redis_client
+
+logger = logging.getLogger(__name__)
+
+# Redis pub/sub channel the publishing jobs announce updates on
+EVENTS_CHANNEL = 'rowcast:events'
+# Events kept per connection; a client that falls further behind loses the oldest ones
+CONNECTION_BUFFER_SIZE = 64
+
+
+def publish_event(event_type, data):
+    """Announces an update to every worker's stream subscribers through Redis pub/sub."""
+    redis_client.publish(EVENTS_CHANNEL, json.dumps({'type': event_type, 'data': data, 'time': time.time()}))
+
+
+class EventSubscription:
+    """A bounded buffer of events for one stream connection."""
+
+    def __init__(self, size=CONNECTION_BUFFER_SIZE):
+        self._events = deque(maxlen=size)
+        self._ready = threading.Condition()
+
+    def push(self, event):
+        with self._ready:
+            self._events.append(event)
+            self._ready.notify()
+
+    def next(self, timeout):
+        """Returns the oldest buffered event, or None if none arrives within timeout seconds."""
+        with self._ready:
+            if not self._events:
+                self._ready.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+
+class EventBroker:
+    """
+    Fans out events from the Redis channel to the stream connections of this worker.
+    A single listener thread per worker holds the only pub/sub connection.
+    """
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='EventBroker', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(EVENTS_CHANNEL)
+                while True:
+                    # Polled rather than listen()ed, so the client's socket timeout does not fire between events
+                    message = pubsub.get_message(timeout=1)
+                    if message is None:
+                        continue
+                    with self._lock:
+                        subscriptions = list(self._subscriptions)
+                    for subscription in subscriptions:
+                        subscription.push(message['data'])
+            except Exception as e:
+                logger.warning(f"Event listener lost its Redis subscription, reconnecting: {e}")
+                time.sleep(1)
+
+    def subscribe(self):
+        self._ensure_listener()
+        subscription = EventSubscription()
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+
+event_broker = EventBroker()
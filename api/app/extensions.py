@@ -1,9 +1,99 @@
 # app/extensions.py
 
+import os
+import time
 from flask_apscheduler import APScheduler
+import fakeredis
 import redis
 
+# --- Storage backend ---
+# 'redis': a Redis server, shared by every worker and node (the default).
+# 'memory': an in-process stand-in for Redis (the fakeredis package); nothing is shared
+#   between workers or kept across restarts.
+# 'file': 'memory' for locks, metrics and events, with snapshot generations in memory-mapped
+#   files that every worker of the node reads and that survive restarts (see app.snapshots).
+# With 'memory' and 'file', refresh locks, metrics, score history and /api/stream events stay
+# in the process that wrote them, so both are for a single worker only: development, tests and
+# benchmarks without a Redis server. Starting them with more than one worker, or under a
+# gunicorn whose worker count is unknown, is refused.
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'redis')
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+# Connections per client; a call waits up to REDIS_POOL_TIMEOUT seconds for a free one
+REDIS_MAX_CONNECTIONS = int(os.getenv('REDIS_MAX_CONNECTIONS', '32'))
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', '2'))
+# Seconds to wait for a connection to open, and for a reply to each command
+REDIS_CONNECT_TIMEOUT = float(os.getenv('REDIS_CONNECT_TIMEOUT', '1'))
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '2'))
+# Pooled connections idle for longer than this many seconds are PINGed before reuse
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv('REDIS_HEALTH_CHECK_INTERVAL', '30'))
+
+
+def _redis_client(decode_responses):
+    pool = redis.BlockingConnectionPool.from_url(
+        REDIS_URL,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        retry_on_timeout=True,
+        decode_responses=decode_responses
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+def _worker_count():
+    """
+    Returns the number of worker processes the server was started with. Under gunicorn, this is
+    the count gunicorn.conf.py recorded from the server's own settings, or None if gunicorn was
+    started without that file; elsewhere it is what the environment tells, 1 by default.
+    """
+    if os.getenv('SERVER_SOFTWARE', '').startswith('gunicorn/'):
+        value = os.getenv('GUNICORN_SERVER_WORKERS', '')
+        return int(value) if value.isdigit() else None
+    for name in ('GUNICORN_WORKERS', 'WEB_CONCURRENCY'):
+        value = os.getenv(name, '')
+        if value.isdigit():
+            return int(value)
+    return 1
+
+
+def _create_clients():
+    """Returns (client decoding replies to str, client returning raw bytes) for STORAGE_BACKEND."""
+    if STORAGE_BACKEND == 'redis':
+        return _redis_client(True), _redis_client(False)
+    if STORAGE_BACKEND in ('memory', 'file'):
+        workers = _worker_count()
+        if workers is None:
+            raise RuntimeError(f"STORAGE_BACKEND={STORAGE_BACKEND} runs a single worker only, and gunicorn was started "
+                               f"without api/gunicorn.conf.py, so its number of workers is unknown; start it with "
+                               f"-c gunicorn.conf.py")
+        if workers > 1:
+            raise RuntimeError(f"STORAGE_BACKEND={STORAGE_BACKEND} keeps locks, metrics, history and events "
+                               f"per process and cannot run {workers} workers; use STORAGE_BACKEND=redis "
+                               f"or a single worker")
+        server = fakeredis.FakeServer()
+        return fakeredis.FakeRedis(server=server, decode_responses=True), fakeredis.FakeRedis(server=server)
+    raise ValueError(f"STORAGE_BACKEND must be one of redis, memory, file, not {STORAGE_BACKEND!r}")
+
+
+def storage_health():
+    """PINGs the storage backend; returns its status, round-trip time and pool settings."""
+    health = {'backend': STORAGE_BACKEND}
+    if STORAGE_BACKEND == 'redis':
+        health['pool'] = {'maxConnections': REDIS_MAX_CONNECTIONS, 'socketTimeout': REDIS_SOCKET_TIMEOUT,
+                          'connectTimeout': REDIS_CONNECT_TIMEOUT}
+    started = time.perf_counter()
+    try:
+        redis_client.ping()
+    except redis.exceptions.RedisError as e:
+        return dict(health, ok=False, error=str(e))
+    return dict(health, ok=True, latencyMs=round((time.perf_counter() - started) * 1000, 3))
+
+
 # --- Initialize Extensions ---
 # Create the extension instances here, but don't initialize them with the app yet.
-redis_client = redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
-scheduler = APScheduler()
\ No newline at end of file
+# Pre-rendered (and compressed) response bodies are raw bytes, so they are read through redis_binary_client.
+redis_client, redis_binary_client = _create_clients()
+scheduler = APScheduler()
@@ -6,6 +6,8 @@ import os
 from datetime import datetime, timedelta
 import logging
 from app.utils import fmt, deg_to_cardinal
+from app.upstream import upstream_get
+from app.tracing import traced
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,6 +15,7 @@ logger = logging.getLogger(__name__)
 
 # The file cache logic has been removed and is now handled by Redis.
 
+@traced()
 def fetch_weather_data():
     """Fetches current and forecast weather data from the Open-Meteo API."""
     logger.info("FETCHER: Calling Open-Meteo API...")
@@ -28,7 +31,7 @@ def fetch_weather_data():
     )
     
     try:
-        response = requests.get(url, timeout=30)
+        response = upstream_get(url, timeout=30)
         response.raise_for_status()
         data = response.json()
     except requests.exceptions.RequestException as e:
@@ -97,12 +100,13 @@ def fetch_weather_data():
         logger.error(f"Failed to process weather data: {e}")
         raise Exception(f"Weather data processing failed: {e}")
 
+@traced()
 def fetch_weather_alerts(lat, lon):
     """Fetch active weather alerts from NWS API for the given coordinates."""
     try:
         # Get the NWS grid point for the coordinates
         grid_url = f"https://api.weather.gov/points/{lat},{lon}"
-        grid_response = requests.get(grid_url, timeout=10)
+        grid_response = upstream_get(grid_url, timeout=10)
         grid_response.raise_for_status()
         grid_data = grid_response.json()
         
@@ -116,7 +120,7 @@ def fetch_weather_alerts(lat, lon):
         if zone:
             zone_alerts_url = f"https://api.weather.gov/alerts/active/zone/{zone}"
             try:
-                zone_response = requests.get(zone_alerts_url, timeout=10)
+                zone_response = upstream_get(zone_alerts_url, timeout=10)
                 zone_response.raise_for_status()
                 zone_data = zone_response.json()
                 
@@ -136,13 +140,34 @@ def fetch_weather_alerts(lat, lon):
                     alerts.append(alert)
             except Exception as e:
                 logger.warning(f"Failed to fetch zone alerts: {e}")
+                return last_known_alerts()
         
         return alerts
         
     except Exception as e:
         logger.warning(f"Failed to fetch weather alerts: {e}")
-        return []
+        return last_known_alerts()
 
+
+def last_known_alerts():
+    """
+    The alerts of the last published weather snapshot that have not expired yet. Used while
+    NWS is unreachable (or its circuit breaker is open), so an outage does not clear alerts.
+    """
+    from app.snapshots import snapshot_cache
+    weather_data = snapshot_cache.get('weather_data') or {}
+    now = datetime.now().astimezone()
+    alerts = []
+    for alert in weather_data.get('alerts', []):
+        try:
+            if alert.get('expires') and datetime.fromisoformat(alert['expires']) <= now:
+                continue
+        except (TypeError, ValueError):
+            pass
+        alerts.append(alert)
+    return alerts
+
+@traced()
 def fetch_water_data_with_history():
     """Fetches current and historical water data from the USGS API for trend analysis."""
     logger.info("FETCHER: Calling USGS Water Services API with historical data...")
@@ -152,7 +177,7 @@ def fetch_water_data_with_history():
     try:
         # Get current data
         current_url = f"https://waterservices.usgs.gov/nwis/iv/?sites={site_id}&parameterCd={params}&format=json"
-        current_response = requests.get(current_url, timeout=30)
+        current_response = upstream_get(current_url, timeout=30)
         current_response.raise_for_status()
         current_data = current_response.json()
         
@@ -166,7 +191,7 @@ def fetch_water_data_with_history():
         
         historical_data = None
         try:
-            historical_response = requests.get(historical_url, timeout=30)
+            historical_response = upstream_get(historical_url, timeout=30)
             historical_response.raise_for_status()
             historical_data = historical_response.json()
         except requests.exceptions.RequestException as e:
@@ -282,6 +307,7 @@ def predict_water_data(historical_data):
                 'discharge': None, 'gaugeHeight': None, 'waterTemp': None} 
                 for h in range(1, 25)]
 
+@traced()
 def fetch_water_data():
     """Fetches the latest water data from the USGS API (legacy function for compatibility)."""
     logger.info("FETCHER: Calling USGS Water Services API...")
@@ -290,7 +316,7 @@ def fetch_water_data():
     
     try:
         url = f"https://waterservices.usgs.gov/nwis/iv/?sites={site_id}&parameterCd={params}&format=json"
-        response = requests.get(url, timeout=30)
+        response = upstream_get(url, timeout=30)
         response.raise_for_status()
         data = response.json()
     except requests.exceptions.RequestException as e:
@@ -323,6 +349,7 @@ def fetch_water_data():
         logger.error(f"Failed to process water data: {e}")
         raise Exception(f"Water data processing failed: {e}")
 
+@traced()
 def fetch_short_term_forecast():
     """Fetches 15-minute interval weather data for the next 3 hours."""
     logger.info("FETCHER: Calling Open-Meteo API for 15-minute forecast...")
@@ -336,7 +363,7 @@ def fetch_short_term_forecast():
     )
     
     try:
-        response = requests.get(url, timeout=30)
+        response = upstream_get(url, timeout=30)
         response.raise_for_status()
         data = response.json()
     except requests.exceptions.RequestException as e:
@@ -348,9 +375,8 @@ def fetch_short_term_forecast():
     
     try:
         # Get current water data for the short-term projections
-        from app.extensions import redis_client
-        water_data_str = redis_client.get('water_data')
-        water_data = json.loads(water_data_str) if water_data_str else {}
+        from app.snapshots import snapshot_cache
+        water_data = snapshot_cache.get('water_data') or {}
         current_water = water_data.get('current', {})
         
         # 15-minute forecast data
@@ -393,13 +419,14 @@ def fetch_short_term_forecast():
         logger.error(f"Failed to process 15-minute forecast data: {e}")
         raise Exception(f"15-minute forecast data processing failed: {e}")
 
+@traced()
 def fetch_noaa_stageflow_forecast():
     """Fetches stage and flow forecast data from NOAA NWPS API with interpolation for hourly intervals."""
     logger.info("FETCHER: Calling NOAA NWPS API for stageflow forecast...")
     
     try:
         url = "https://api.water.noaa.gov/nwps/v1/gauges/padp1/stageflow"
-        response = requests.get(url, timeout=30)
+        response = upstream_get(url, timeout=30)
         response.raise_for_status()
         data = response.json()
         
@@ -548,6 +575,7 @@ def interpolate_forecast_values(forecast_data, target_time):
         logger.warning(f"Failed to interpolate forecast values: {e}")
         return None
 
+@traced()
 def fetch_extended_weather_forecast():
     """Fetches extended weather forecast to match NOAA stageflow forecast duration."""
     logger.info("FETCHER: Calling Open-Meteo API for extended forecast...")
@@ -568,7 +596,7 @@ def fetch_extended_weather_forecast():
     )
     
     try:
-        response = requests.get(url, timeout=30)
+        response = upstream_get(url, timeout=30)
         response.raise_for_status()
         data = response.json()
     except requests.exceptions.RequestException as e:
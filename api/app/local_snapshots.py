@@ -0,0 +1,142 @@
+# app/local_snapshots.py
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Directory keeping a copy of the last published snapshot of every key, one file per key,
+# served when Redis is unreachable or comes back empty after a restart. Empty disables it.
+LOCAL_SNAPSHOT_DIR = os.getenv('LOCAL_SNAPSHOT_DIR', os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'snapshots'))
+
+# File layout: MAGIC, the header length as little-endian uint32, the JSON header, then the
+# stored values back to back. The header indexes each value as [offset, length, 's' (text) or 'b' (bytes)].
+MAGIC = b'RCSNAP1\n'
+_LENGTH = struct.Struct('<I')
+
+
+class LocalSnapshot:
+    """One key's snapshot file, memory-mapped; values are sliced out of the map on demand."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a snapshot file")
+        start = len(MAGIC) + _LENGTH.size
+        (header_length,) = _LENGTH.unpack_from(self._map, len(MAGIC))
+        header = json.loads(self._map[start:start + header_length])
+        self._data_start = start + header_length
+        self._values = header['values']
+        self.version = header['version']
+        self.updated_at = header['updatedAt']
+        self.freshness = header['freshness']
+        self._indexes = {}
+
+    def get(self, name):
+        """Returns the value stored under a Redis key name (str or bytes, as Redis would), or None."""
+        if name not in self._values:
+            return None
+        offset, length, kind = self._values[name]
+        value = self._map[self._data_start + offset:self._data_start + offset + length]
+        return value.decode('utf-8') if kind == 's' else value
+
+    def index(self, name):
+        """Returns a stored sorted-set index as (epochs, members) in score order, parsed once per file, or None."""
+        if name not in self._indexes:
+            pairs = self.get(name)
+            pairs = json.loads(pairs) if pairs is not None else None
+            self._indexes[name] = ([epoch for _, epoch in pairs], [member for member, _ in pairs]) if pairs else None
+        return self._indexes[name]
+
+
+def write_snapshot_file(path, header, values):
+    """
+    Writes {name: str or bytes} as a snapshot file with header (version, updatedAt,
+    freshness) through a temporary file, so readers only ever see complete files.
+    """
+    index = {}
+    blobs = []
+    offset = 0
+    for name, value in values.items():
+        kind = 'b' if isinstance(value, bytes) else 's'
+        blob = value if kind == 'b' else value.encode('utf-8')
+        index[name] = [offset, len(blob), kind]
+        blobs.append(blob)
+        offset += len(blob)
+    header = json.dumps(dict(header, values=index)).encode('utf-8')
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_LENGTH.pack(len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(temporary, path)
+
+
+class LocalSnapshotStore:
+    """
+    Keeps the last published snapshot of each key on local disk. Files are replaced
+    atomically on every publish and reopened by readers when they change, so a restarted
+    worker serves the last data within milliseconds, without Redis.
+    """
+
+    def __init__(self, directory=LOCAL_SNAPSHOT_DIR):
+        self.directory = directory
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.snap")
+
+    def write(self, key, version, updated_at, freshness, values):
+        """Writes {redis key name: value} of one snapshot generation as the key's snapshot file."""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        write_snapshot_file(self.path(key), {'version': version, 'updatedAt': updated_at, 'freshness': freshness},
+                            values)
+
+    def latest_version(self):
+        """Returns the highest snapshot generation of any local snapshot file, or 0 if there is none."""
+        if not self.directory or not os.path.isdir(self.directory):
+            return 0
+        versions = [0]
+        for name in os.listdir(self.directory):
+            if not name.endswith('.snap'):
+                continue
+            snapshot = self.load(name[:-len('.snap')])
+            if snapshot is not None and str(snapshot.version).isdigit():
+                versions.append(int(snapshot.version))
+        return max(versions)
+
+    def load(self, key):
+        """Returns the LocalSnapshot of key, or None if there is no (readable) file for it."""
+        if not self.directory:
+            return None
+        try:
+            stat = os.stat(self.path(key))
+        except OSError:
+            return None
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._open.get(key)
+            if cached and cached[0] == identity:
+                return cached[1]
+            try:
+                snapshot = LocalSnapshot(self.path(key))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read local snapshot of {key}: {e}")
+                return None
+            self._open[key] = (identity, snapshot)
+            return snapshot
+
+
+local_snapshots = LocalSnapshotStore()
@@ -0,0 +1,233 @@
+# app/metrics.py
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from flask import g, request
+from redis.exceptions import RedisError
+from app.extensions import redis_client
+from app.snapshots import KEY_LIFETIMES, get_versions
+from app.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Seconds between flushes of a worker's buffered samples into the shared Redis registry
+METRICS_FLUSH_INTERVAL = 5
+# Redis hash holding each metric's samples, aggregated across workers: metrics:<name>
+METRICS_KEY_PREFIX = 'metrics:'
+# When set, /metrics answers only requests sending "Authorization: Bearer <token>" (set it in the scrape config)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+JOB_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Every exported metric: (type, help text, histogram buckets)
+METRICS = {
+    'rowcast_job_duration_seconds': ('histogram', 'Run time of scheduled jobs.', JOB_BUCKETS),
+    'rowcast_job_runs_total': ('counter', 'Scheduled job runs by outcome.', None),
+    'rowcast_job_last_success_timestamp_seconds': ('gauge', 'Unix time of the last successful run of each job.', None),
+    'rowcast_upstream_request_duration_seconds': ('histogram', 'Latency of requests to upstream APIs.', LATENCY_BUCKETS),
+    'rowcast_upstream_responses_total': ('counter', 'Upstream API responses by status code (error = no response).', None),
+    'rowcast_background_refreshes_total': ('counter', 'On-demand refreshes of missing or expired data started, by job or view.', None),
+    'rowcast_http_request_duration_seconds': ('histogram', 'Latency of API requests by route.', LATENCY_BUCKETS),
+    'rowcast_http_response_size_bytes': ('histogram', 'Size of API response bodies by route.', SIZE_BUCKETS),
+}
+
+
+def _label_text(labels):
+    """Renders labels in exposition format: key="value",... (sorted by key)."""
+    return ','.join(f'{name}="{str(value)}"' for name, value in sorted(labels.items()))
+
+
+class MetricsRegistry:
+    """
+    Buffers counter increments, histogram observations and gauge values in-process and
+    flushes them every METRICS_FLUSH_INTERVAL seconds into one Redis hash per metric, so
+    /metrics on any worker reports totals across all gunicorn workers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._increments = defaultdict(float)
+        self._gauges = {}
+        self._flusher = None
+
+    def _ensure_flusher(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_periodically, name='MetricsFlusher', daemon=True)
+            self._flusher.start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Could not flush metrics to Redis: {e}")
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            self._increments[(name, _label_text(labels))] += amount
+            self._ensure_flusher()
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        label_text = _label_text(labels)
+        bucket = next((f"{bound:g}" for bound in buckets if value <= bound), '+Inf')
+        with self._lock:
+            self._increments[(name, f"{label_text}|{bucket}")] += 1
+            self._increments[(name, f"{label_text}|sum")] += value
+            self._ensure_flusher()
+
+    def set_gauge(self, name, labels, value):
+        with self._lock:
+            self._gauges[(name, _label_text(labels))] = value
+            self._ensure_flusher()
+
+    def flush(self):
+        """Adds this worker's buffered samples to the shared registry in one round trip."""
+        with self._lock:
+            increments, self._increments = self._increments, defaultdict(float)
+            gauges, self._gauges = self._gauges, {}
+        if not increments and not gauges:
+            return
+        pipe = redis_client.pipeline(transaction=False)
+        for (name, field), amount in increments.items():
+            pipe.hincrbyfloat(METRICS_KEY_PREFIX + name, field, amount)
+        for (name, field), value in gauges.items():
+            pipe.hset(METRICS_KEY_PREFIX + name, field, value)
+        try:
+            pipe.execute()
+        except RedisError:
+            # Put the samples back for the next flush; gauges set since then are newer
+            with self._lock:
+                for sample, amount in increments.items():
+                    self._increments[sample] += amount
+                gauges.update(self._gauges)
+                self._gauges = gauges
+            raise
+
+    def _buffered_samples(self):
+        """Returns this worker's unflushed samples as {metric name: {field: value}}, shaped like the Redis hashes."""
+        samples = {name: {} for name in METRICS}
+        with self._lock:
+            for (name, field), value in list(self._increments.items()) + list(self._gauges.items()):
+                samples[name][field] = value
+        return [samples[name] for name in METRICS]
+
+    def render(self):
+        """
+        Returns all metrics, plus the age and version of every data key and the breaker state
+        of every upstream, in Prometheus text format.
+        """
+        # app.upstream records its calls here, so it is imported late
+        from app.upstream import BREAKERS_KEY, breaker_states
+        try:
+            self.flush()
+            pipe = redis_client.pipeline(transaction=False)
+            for name in METRICS:
+                pipe.hgetall(METRICS_KEY_PREFIX + name)
+            pipe.hgetall(BREAKERS_KEY)
+            *samples, breakers = pipe.execute()
+            breakers = {name: json.loads(state) for name, state in breakers.items()}
+            aggregated = True
+        except RedisError as e:
+            # Without the shared registry, report what this worker has not flushed yet
+            logger.warning(f"Could not read metrics from Redis, rendering this worker's samples: {e}")
+            samples = self._buffered_samples()
+            breakers = breaker_states()
+            aggregated = False
+        # Every key the jobs publish, from whichever snapshot store is configured
+        states = {key: state for key, state in get_versions(sorted(KEY_LIFETIMES)).items() if state.version is not None}
+
+        lines = []
+        for (name, (kind, help_text, buckets)), fields in zip(METRICS.items(), samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind != 'histogram':
+                lines.extend(f"{name}{{{labels}}} {float(value)}" for labels, value in sorted(fields.items()))
+                continue
+            series = defaultdict(dict)
+            for field, value in fields.items():
+                labels, bucket = field.rsplit('|', 1)
+                series[labels][bucket] = float(value)
+            for labels, counts in sorted(series.items()):
+                prefix = f"{labels}," if labels else ''
+                cumulative = 0
+                for bound in [f"{bound:g}" for bound in buckets] + ['+Inf']:
+                    cumulative += counts.get(bound, 0)
+                    lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {counts.get('sum', 0)}")
+                lines.append(f"{name}_count{{{labels}}} {cumulative}")
+
+        now = time.time()
+        lines.append("# HELP rowcast_data_age_seconds Seconds since each Redis data key was last published.")
+        lines.append("# TYPE rowcast_data_age_seconds gauge")
+        lines.extend(f'rowcast_data_age_seconds{{key="{key}"}} {now - state.updated_at:.3f}'
+                     for key, state in states.items())
+        lines.append("# HELP rowcast_data_version Current snapshot generation of each Redis data key.")
+        lines.append("# TYPE rowcast_data_version gauge")
+        lines.extend(f'rowcast_data_version{{key="{key}"}} {state.version}' for key, state in states.items())
+        lines.append("# HELP rowcast_upstream_breaker_open Whether each upstream's circuit breaker is open (1) or half-open/closed (0).")
+        lines.append("# TYPE rowcast_upstream_breaker_open gauge")
+        lines.extend(f'rowcast_upstream_breaker_open{{upstream="{name}"}} {int(state["state"] == "open")}'
+                     for name, state in sorted(breakers.items()))
+        lines.append("# HELP rowcast_metrics_aggregated Whether these metrics are totals across workers (1) or, while Redis is unreachable, this worker's unflushed samples only (0).")
+        lines.append("# TYPE rowcast_metrics_aggregated gauge")
+        lines.append(f"rowcast_metrics_aggregated {int(aggregated)}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+def instrumented_job(job):
+    """
+    Decorator for scheduled jobs: records run time, the outcome and the time of the last
+    success, and traces the run as a new trace whose id is the run id. A job fails if it
+    raises or returns False.
+    """
+    name = job.__name__
+
+    @wraps(job)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        result = False
+        try:
+            with span(f"job {name}", new_trace=True) as run:
+                result = job(*args, **kwargs)
+                run['outcome'] = 'failure' if result is False else 'success'
+            return result
+        finally:
+            outcome = 'failure' if result is False else 'success'
+            metrics.observe('rowcast_job_duration_seconds', {'job': name}, time.perf_counter() - started)
+            metrics.inc('rowcast_job_runs_total', {'job': name, 'outcome': outcome})
+            if outcome == 'success':
+                metrics.set_gauge('rowcast_job_last_success_timestamp_seconds', {'job': name}, time.time())
+    return wrapper
+
+
+def init_route_metrics(app):
+    """Registers hooks recording latency and response size of every API request by route."""
+
+    @app.before_request
+    def start_metrics_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_route_metrics(response):
+        started = g.get('metrics_started')
+        if started is None or not request.path.startswith('/api'):
+            return response
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('rowcast_http_request_duration_seconds',
+                        {'route': route, 'method': request.method, 'status': response.status_code},
+                        time.perf_counter() - started)
+        if response.content_length is not None:
+            metrics.observe('rowcast_http_response_size_bytes', {'route': route}, response.content_length)
+        return response
@@ -0,0 +1,116 @@
+# app/refresh.py
+
+import logging
+import os
+import threading
+import time
+from app.extensions import redis_client
+from app.events import event_broker
+from app.metrics import metrics
+from app.snapshots import get_versions, has_bodies, needs_refresh
+from app.tasks import COMPOSITE_VIEWS, KEY_PRODUCERS, update_composite_views
+
+logger = logging.getLogger(__name__)
+
+# Redis lock taken by the one worker that refreshes a job in the background: refresh_lock:<name>
+REFRESH_LOCK_PREFIX = 'refresh_lock:'
+# Seconds a refresh lock is held. It is not released when the run ends, so across all
+# workers a job is refreshed on demand at most once per period, even while its upstream is down.
+REFRESH_LOCK_SECONDS = int(os.getenv('REFRESH_LOCK_SECONDS', '60'))
+# Seconds a request for data that was never published waits for its on-demand refresh (0 = no waiting)
+FILL_WAIT_SECONDS = float(os.getenv('FILL_WAIT_SECONDS', '5'))
+
+
+def refresh_targets(states, now=None):
+    """
+    Returns {lock name: callable} bringing every missing or expired key in {key: SnapshotState}
+    up to date: the producing job of a data key, the producing jobs of a composite view's
+    missing or expired inputs, or a rebuild of the view when its inputs are current.
+    """
+    now = now or time.time()
+    targets = {}
+    for key, state in states.items():
+        if not needs_refresh(state, now):
+            continue
+        if key in COMPOSITE_VIEWS:
+            inputs = COMPOSITE_VIEWS[key]['inputs']
+            input_states = get_versions(list(inputs))
+            stale_inputs = [name for name in inputs if needs_refresh(input_states[name], now)]
+            if not stale_inputs:
+                targets[f"view {key}"] = lambda inputs=inputs: update_composite_views(inputs)
+                continue
+            jobs = [KEY_PRODUCERS[name] for name in stale_inputs]
+        else:
+            jobs = [KEY_PRODUCERS[key]] if key in KEY_PRODUCERS else []
+        targets.update({job['id']: job['func'] for job in jobs})
+    return targets
+
+
+def _run_refresh(name, refresh):
+    try:
+        refresh()
+    except Exception as e:
+        logger.warning(f"Background refresh of {name} failed: {e}")
+    finally:
+        # Keep the lock until it expires, but let waiters know the run is over
+        try:
+            remaining = redis_client.ttl(REFRESH_LOCK_PREFIX + name)
+            if remaining > 0:
+                redis_client.set(REFRESH_LOCK_PREFIX + name, 'done', ex=remaining, xx=True)
+        except Exception as e:
+            logger.warning(f"Could not mark background refresh of {name} as done: {e}")
+
+
+def running_refreshes(names):
+    """Returns those of names whose refresh is still running on some worker."""
+    if not names:
+        return []
+    locks = redis_client.mget([REFRESH_LOCK_PREFIX + name for name in names])
+    return [name for name, lock in zip(names, locks) if lock == 'running']
+
+
+def request_refresh(states):
+    """
+    Starts a background refresh for every missing or expired key in {key: SnapshotState},
+    single-flight across the cluster: only the worker that takes a target's Redis lock runs
+    it, and everyone keeps serving the last published data meanwhile. Returns the names of
+    the refreshes now running for these keys, whether this call or another worker started them.
+    """
+    started = []
+    others = []
+    try:
+        for name, refresh in refresh_targets(states).items():
+            if not redis_client.set(REFRESH_LOCK_PREFIX + name, 'running', nx=True, ex=REFRESH_LOCK_SECONDS):
+                others.append(name)
+                continue
+            metrics.inc('rowcast_background_refreshes_total', {'target': name})
+            threading.Thread(target=_run_refresh, args=(name, refresh), name=f"Refresh {name}", daemon=True).start()
+            started.append(name)
+        return started + running_refreshes(others)
+    except Exception as e:
+        logger.warning(f"Could not start background refresh: {e}")
+        return started
+
+
+def await_published(keys, refreshes, timeout=FILL_WAIT_SECONDS):
+    """
+    Waits up to timeout seconds for every one of keys to be published by the refreshes in
+    flight for them, so concurrent requests for cold data share one upstream fetch instead
+    of failing. Wakes on the version events publishers announce and re-checks at least every
+    second in case one was missed. Returns {key: SnapshotState} as of the last check.
+    """
+    subscription = event_broker.subscribe()
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            states = get_versions(list(keys))
+            remaining = deadline - time.monotonic()
+            # A version alone is not enough: the key must have a body the request can serve
+            if remaining <= 0 or has_bodies(states):
+                return states
+            # A finished run that published nothing (e.g. its upstream is down) will not publish later
+            if not running_refreshes(refreshes):
+                return states
+            subscription.next(min(1, remaining))
+    finally:
+        event_broker.unsubscribe(subscription)
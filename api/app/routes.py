@@ -1,14 +1,29 @@
 # app/routes.py
 
-from flask import Blueprint, jsonify, request, render_template, redirect, send_from_directory
+from flask import Blueprint, Response, g, jsonify, make_response, request, render_template, render_template_string, redirect, send_from_directory
+import hashlib
+import hmac
 import json
+import math
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+import time
 import pytz
-import logging
-# Import the redis_client instance from the extensions file
-from app.extensions import redis_client
-from app.rowcast import compute_rowcast, merge_params
+from app.extensions import scheduler, storage_health
+from app.events import event_broker
+from app.metrics import METRICS_TOKEN, metrics
+from app.tracing import DEBUG_TRACES_ENABLED, exporter as tracing_exporter, group_traces
+from app.upstream import breaker_states
+from app.refresh import FILL_WAIT_SECONDS, await_published, request_refresh
+from app.rowcast import compute_rowcast
+from app.timeline import auto_resolution, thin_rows, timeline_point, timeline_samples
+from app.utils import to_epoch
+from app.windows import best_windows, window_cache
+from app.series import diff_digests, select_rows, select_rows_at
+from app.snapshots import (BODY_ENCODINGS, BODY_VARIANTS, DELTA_SERIES, get_versions, iso_time, load_body, load_history,
+                           load_msgpack_body, load_neighbours, load_range, needs_refresh, render_msgpack, snapshot_cache)
+from app.tasks import COMPOSITE_VIEWS, KEY_PRODUCERS
 
 # EST timezone
 EST = pytz.timezone('America/New_York')
@@ -25,110 +40,354 @@ def after_request(response):
 
 
 
+def resolve_versions(keys):
+    """
+    Returns {key: SnapshotState}, resolving each key's version pointer at most once
+    per request so that everything the request reads comes from the same generations.
+    """
+    resolved = g.setdefault('snapshot_versions', {})
+    missing = [key for key in keys if key not in resolved]
+    if missing:
+        resolved.update(get_versions(missing))
+    return {key: resolved[key] for key in keys}
+
+def current_version(key):
+    """Returns the snapshot generation this request reads key at, or None if unpublished."""
+    return resolve_versions([key])[key].version
+
 def get_data_from_redis(key):
-    """Helper function to get and decode data from Redis."""
-    data_str = redis_client.get(key)
-    if data_str:
-        return json.loads(data_str)
-    return None
-
-def find_forecast_by_time(forecast_data, target_time):
-    """Helper function to find forecast data for a specific time."""
-    if not forecast_data:
+    """Helper function to get decoded data from Redis, served from the per-worker snapshot cache."""
+    return get_many_from_redis([key])[key]
+
+def get_many_from_redis(keys):
+    """Helper function to get decoded data for several keys in one pipelined round trip."""
+    versions = {key: state.version for key, state in resolve_versions(keys).items()}
+    return snapshot_cache.get_many(list(keys), versions)
+
+def with_snapshots(*keys):
+    """
+    Decorator for composite views: declares the Redis keys the view needs, fetches them
+    all in one round trip and passes them in as keyword arguments named after the keys.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            kwargs.update(get_many_from_redis(keys))
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# Media types that select the MessagePack representation of a data endpoint
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+def wants_msgpack():
+    """True when the client prefers MessagePack over JSON (JSON wins ties and */*)."""
+    if 'msgpack' not in BODY_VARIANTS:
+        return False
+    return request.accept_mimetypes.best_match(('application/json',) + MSGPACK_MIMETYPES) in MSGPACK_MIMETYPES
+
+def respond(data):
+    """Serializes a dynamically built response as JSON or, if negotiated, MessagePack."""
+    if wants_msgpack():
+        response = Response(render_msgpack(data), mimetype='application/msgpack')
+    else:
+        response = jsonify(data)
+    response.vary.add('Accept')
+    return response
+
+def accepted_encodings():
+    """Returns the Content-Encodings the client accepts; identity is always acceptable."""
+    return {encoding for encoding in ('br', 'gzip') if request.accept_encodings[encoding]} | {'identity'}
+
+def negotiated_encoding():
+    """Returns the Content-Encoding a pre-rendered JSON body is served in for this request (see load_body)."""
+    accepted = accepted_encodings()
+    return next((encoding for encoding in BODY_ENCODINGS if encoding in accepted), 'identity')
+
+def serve_snapshot(key, error, view=None):
+    """Streams the response body pre-rendered by the publishing job, with no JSON work on the read path."""
+    if wants_msgpack():
+        body = load_msgpack_body(key, current_version(key), view)
+        if body is not None:
+            response = Response(body, mimetype='application/msgpack')
+            response.vary.add('Accept')
+            return response
+
+    body, encoding = load_body(key, current_version(key), view, accepted_encodings())
+    if body is None:
+        return jsonify({"error": error}), 404
+    response = Response(body, mimetype='application/json')
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    return response
+
+# Query parameters that turn a series endpoint into a range / projection query
+SERIES_QUERY_ARGS = ('from', 'to', 'limit', 'fields')
+
+def parse_time_arg(value):
+    """
+    Parses a from/to query value given as epoch seconds or an ISO timestamp (naive = America/New_York).
+    Raises ValueError for anything else, including non-finite numbers such as 'inf' or '1e400'.
+    """
+    try:
+        epoch = float(value)
+    except ValueError:
+        return to_epoch(value)
+    if not math.isfinite(epoch):
+        raise ValueError(f"{value!r} is not a finite time")
+    return int(epoch)
+
+def serve_series(key, error, view=None):
+    """
+    Serves a forecast series endpoint. Without query parameters this is the pre-rendered body;
+    with from/to/limit/fields only the requested rows are read from the series' sorted-set
+    time index, projected onto the requested fields and serialized.
+    """
+    if 'since' in request.args and key in DELTA_SERIES:
+        return serve_delta(key, error)
+    if not any(arg in request.args for arg in SERIES_QUERY_ARGS):
+        return serve_snapshot(key, error, view=view)
+
+    try:
+        start = parse_time_arg(request.args['from']) if 'from' in request.args else None
+        end = parse_time_arg(request.args['to']) if 'to' in request.args else None
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+        if limit is not None and limit < 0:
+            raise ValueError("limit must not be negative")
+    except ValueError:
+        return jsonify({"error": "Invalid query parameters. Use ISO timestamps or epoch seconds for 'from'/'to' and a non-negative integer for 'limit'."}), 400
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()] or None
+
+    rows = load_range(key, current_version(key), start, end, limit, fields)
+    if rows is None:
+        return jsonify({"error": error}), 404
+    return respond(rows)
+
+def serve_delta(key, error):
+    """
+    Answers ?since=<version> on a forecast series: only the rows whose score or conditions
+    changed or that were added since that version, plus the removed timestamps. Falls back
+    to the full series (full: true) when the version is no longer in the bounded history.
+    """
+    try:
+        since = int(request.args['since'])
+    except ValueError:
+        return jsonify({"error": "Invalid 'since' parameter. Use a version number from a previous response."}), 400
+
+    version = current_version(key)
+    series = get_data_from_redis(key)
+    if version is None or series is None:
+        return jsonify({"error": error}), 404
+    version = int(version)
+
+    if since == version:
+        return respond({'version': version, 'since': since, 'full': False, 'changed': [], 'added': [], 'removed': []})
+    history = load_history(key, [since, version])
+    if since not in history or version not in history:
+        return respond({'version': version, 'since': since, 'full': True, 'rows': select_rows(series)})
+
+    changed, added, removed = diff_digests(history[since], history[version])
+    positions = {timestamp: i for i, timestamp in enumerate(series['columns'].get('timestamp', []))}
+    return respond({
+        'version': version,
+        'since': since,
+        'full': False,
+        'changed': select_rows_at(series, [positions[timestamp] for timestamp in changed if timestamp in positions]),
+        'added': select_rows_at(series, [positions[timestamp] for timestamp in added if timestamp in positions]),
+        'removed': removed
+    })
+
+def cache_control(versions, max_age_cap=None):
+    """
+    Builds a Cache-Control value from when each key was last written and when its
+    producing job next runs, so browsers and the CDN keep a response exactly until
+    newer data can exist and may serve it stale for one refresh interval after that.
+    """
+    next_writes = []
+    intervals = []
+    for key, state in versions.items():
+        updated_at = state.updated_at
+        if updated_at is None:
+            continue
+        # Composite views are rebuilt whenever any of their inputs is republished
+        inputs = COMPOSITE_VIEWS[key]['inputs'] if key in COMPOSITE_VIEWS else (key,)
+        jobs = {KEY_PRODUCERS[name]['id']: KEY_PRODUCERS[name] for name in inputs}
+        for job in jobs.values():
+            interval = job['minutes'] * 60
+            scheduled = scheduler.get_job(job['id']) if scheduler.running else None
+            if scheduled and scheduled.next_run_time:
+                next_writes.append(scheduled.next_run_time.timestamp())
+            else:
+                next_writes.append(updated_at + interval)
+            intervals.append(interval)
+    if not next_writes:
         return None
-    
-    target_dt = datetime.fromisoformat(target_time.replace('Z', '+00:00'))
-    
-    closest_forecast = None
-    min_diff = float('inf')
-    
-    for forecast in forecast_data:
-        forecast_dt = datetime.fromisoformat(forecast['timestamp'].replace('Z', '+00:00'))
-        diff = abs((target_dt - forecast_dt).total_seconds())
-        if diff < min_diff:
-            min_diff = diff
-            closest_forecast = forecast
-    
-    return closest_forecast
+
+    max_age = max(0, int(min(next_writes) - time.time()))
+    if max_age_cap is not None:
+        max_age = min(max_age, max_age_cap)
+    return f"public, max-age={max_age}, stale-while-revalidate={min(intervals)}"
+
+def staleness(versions):
+    """
+    Returns (stale, unavailable upstreams) for the keys behind a response. Data is stale when
+    an upstream it comes from has a circuit breaker that is not closed, or when it is past
+    its expiry; clients are then being served the last good data.
+    """
+    states = breaker_states()
+    now = time.time()
+    stale = False
+    unavailable = set()
+    for key, state in versions.items():
+        if state.version is None:
+            continue
+        stale = stale or needs_refresh(state, now)
+        inputs = COMPOSITE_VIEWS[key]['inputs'] if key in COMPOSITE_VIEWS else (key,)
+        for job in {KEY_PRODUCERS[name]['id']: KEY_PRODUCERS[name] for name in inputs}.values():
+            unavailable.update(upstream for upstream in job['upstreams']
+                               if states.get(upstream, {}).get('state', 'closed') != 'closed')
+    return stale or bool(unavailable), sorted(unavailable)
+
+def conditional(*keys, extra=None):
+    """
+    Decorator for data routes: emits a strong ETag derived from the data versions of keys
+    plus Last-Modified, Cache-Control, freshness and staleness headers, and answers conditional
+    requests with 304 before the view loads or serializes anything. Missing or expired keys
+    get a single-flight background refresh while the last published data is served; data
+    never published yet is waited for, up to FILL_WAIT_SECONDS.
+    extra is an optional callable whose result is mixed into the ETag for views whose output
+    also depends on the current time.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = resolve_versions(keys)
+            now = time.time()
+            refreshes = []
+            if any(needs_refresh(state, now) for state in versions.values()):
+                refreshes = request_refresh(versions)
+                missing = [key for key, state in versions.items() if state.version is None]
+                if missing and refreshes and FILL_WAIT_SECONDS > 0:
+                    g.snapshot_versions.update(await_published(missing, refreshes))
+                    versions = resolve_versions(keys)
+            updated = [state.updated_at for state in versions.values() if state.updated_at is not None]
+            if not updated:
+                # Nothing published yet; let the view answer (usually with a 404)
+                response = make_response(view(*args, **kwargs))
+                if refreshes and response.status_code != 200:
+                    response.headers['Retry-After'] = str(int(FILL_WAIT_SECONDS) or 1)
+                return response
+
+            # The publish time tells apart data published under a reused version (e.g. after
+            # Redis was flushed), and every representation (MessagePack, each Content-Encoding)
+            # gets its own tag, since a strong ETag names exact bytes
+            tag_source = '|'.join(f"{key}:{versions[key].version}:{versions[key].updated_at}" for key in keys)
+            if extra:
+                tag_source += f"|{extra()}"
+            tag_source += "|msgpack" if wants_msgpack() else f"|{negotiated_encoding()}"
+            etag = hashlib.sha1(tag_source.encode('utf-8')).hexdigest()[:20]
+            last_modified = datetime.fromtimestamp(int(max(updated)), tz=timezone.utc)
+
+            not_modified = False
+            if request.if_none_match:
+                # If-None-Match uses the weak comparison (RFC 9110 13.1.2), so tags a proxy weakened still match
+                not_modified = request.if_none_match.contains_weak(etag)
+            elif request.if_modified_since and not extra:
+                not_modified = request.if_modified_since >= last_modified
+
+            if not_modified:
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            # A 304 must carry the Vary of the response it stands for
+            response.vary.update(('Accept', 'Accept-Encoding'))
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            if len(keys) == 1:
+                response.headers['X-Data-Version'] = versions[keys[0]].version
+            # A response is as fresh as its oldest data and expires with the first of it. These
+            # headers are the freshness contract for every data response; list bodies (the
+            # forecast series) carry it only here, object bodies also in their 'freshness' field.
+            fetched = [state.fetched_at for state in versions.values() if state.fetched_at is not None]
+            expires = [state.expires_at for state in versions.values() if state.expires_at is not None]
+            if fetched:
+                response.headers['X-Data-Fetched-At'] = iso_time(min(fetched))
+            if expires:
+                response.headers['X-Data-Expires-At'] = iso_time(min(expires))
+            stale, unavailable = staleness(versions)
+            response.headers['X-Data-Stale'] = 'true' if stale else 'false'
+            if unavailable:
+                response.headers['X-Upstream-Unavailable'] = ', '.join(unavailable)
+            # Time-dependent views change every minute even when the data does not
+            cache_control_value = cache_control(versions, max_age_cap=60 if extra else None)
+            if cache_control_value:
+                response.headers['Cache-Control'] = cache_control_value
+            return response
+        return wrapper
+    return decorator
 
 @bp.route("/api/weather")
+@conditional('weather_data')
 def weather():
-    data = get_data_from_redis('weather_data')
-    if data:
-        return jsonify(data)
-    return jsonify({"error": "Weather data not available yet."}), 404
+    return serve_snapshot('weather_data', "Weather data not available yet.")
 
 @bp.route("/api/weather/current")
+@conditional('weather_data')
 def current_weather():
-    data = get_data_from_redis('weather_data')
-    if data and 'current' in data:
-        return jsonify(data['current'])
-    return jsonify({"error": "Current weather data not available yet."}), 404
+    return serve_snapshot('weather_data', "Current weather data not available yet.", view='current')
 
 @bp.route("/api/weather/forecast")
+@conditional('weather_data')
 def weather_forecast():
-    data = get_data_from_redis('weather_data')
-    if data and 'forecast' in data:
-        return jsonify(data['forecast'])
-    return jsonify({"error": "Weather forecast data not available yet."}), 404
+    return serve_series('weather_data', "Weather forecast data not available yet.", view='forecast')
 
 @bp.route("/api/water")
+@conditional('water_data')
 def water():
-    data = get_data_from_redis('water_data')
-    if data:
-        return jsonify(data)
-    return jsonify({"error": "Water data not available yet."}), 404
+    return serve_snapshot('water_data', "Water data not available yet.")
 
 @bp.route("/api/water/current")
+@conditional('water_data')
 def current_water():
-    data = get_data_from_redis('water_data')
-    if data and 'current' in data:
-        return jsonify(data['current'])
-    return jsonify({"error": "Current water data not available yet."}), 404
+    return serve_snapshot('water_data', "Current water data not available yet.", view='current')
 
 @bp.route("/api/water/predictions")
+@conditional('water_data')
 def water_predictions():
-    data = get_data_from_redis('water_data')
-    if data and 'predictions' in data:
-        return jsonify(data['predictions'])
-    return jsonify({"error": "Water prediction data not available yet."}), 404
+    return serve_snapshot('water_data', "Water prediction data not available yet.", view='predictions')
 
 @bp.route("/api/rowcast")
+@conditional('rowcast_current')
 def rowcast():
-    # Always fetch the latest data from Redis
-    weather_data = get_data_from_redis('weather_data')
-    water_data = get_data_from_redis('water_data')
-    
-    if not weather_data or not water_data:
-        return jsonify({"error": "Data not available yet, please try again shortly."}), 404
-
-    # Use current data for current rowcast score
-    current_weather = weather_data.get('current', {})
-    current_water = water_data.get('current', {})
-    # Defensive: if current_weather or current_water is empty, force a fresh fetch (if possible)
-    if not current_weather or not current_water:
-        return jsonify({"error": "Current weather or water data not available yet. Please try again shortly."}), 404
-    
-    params = merge_params(current_weather, current_water)
-    result = compute_rowcast(params)
-    return jsonify({ "rowcastScore": result['score'], "factors": result['factors'], "params": params })
+    return serve_snapshot('rowcast_current', "Data not available yet, please try again shortly.")
 
 @bp.route("/api/rowcast/forecast")
+@conditional('forecast_scores')
 def rowcast_forecast():
-    forecast_scores = get_data_from_redis('forecast_scores')
-    if forecast_scores:
-        return jsonify(forecast_scores)
-    return jsonify({"error": "Forecast scores not available yet."}), 404
+    return serve_series('forecast_scores', "Forecast scores not available yet.")
 
 @bp.route("/api/rowcast/forecast/simple")
+@conditional('forecast_scores_simple')
 def rowcast_forecast_simple():
     """Get simplified rowcast forecast with just timestamps and scores"""
-    simple_scores = get_data_from_redis('forecast_scores_simple')
-    if simple_scores:
-        return jsonify(simple_scores)
-    return jsonify({"error": "Simple forecast scores not available yet."}), 404
+    return serve_series('forecast_scores_simple', "Simple forecast scores not available yet.")
+
+def timeline_response(target_epoch):
+    """Answers a point query on the score timeline, interpolated when ?interpolate=true."""
+    before, after = load_neighbours('score_timeline', current_version('score_timeline'), target_epoch)
+    if before is None and after is None:
+        return jsonify({"error": "Forecast scores not available yet."}), 404
+    interpolate = request.args.get('interpolate', '').lower() in ('1', 'true', 'yes')
+    point = timeline_point(before, after, target_epoch, interpolate)
+    if point:
+        return respond(point)
+    return jsonify({"error": "No forecast data available for requested time"}), 404
 
 @bp.route("/api/rowcast/forecast/<time_offset>")
+@conditional('score_timeline', extra=lambda: datetime.now(EST).strftime('%Y%m%d%H%M'))
 def rowcast_forecast_offset(time_offset):
     """Get rowcast score for a specific time offset (e.g., '2h', '30m', '1d')"""
     try:
@@ -145,241 +404,283 @@ def rowcast_forecast_offset(time_offset):
             target_time = now_est + timedelta(days=days)
         else:
             return jsonify({"error": "Invalid time format. Use format like '2h', '30m', '1d'"}), 400
-        
-        forecast_scores = get_data_from_redis('forecast_scores')
-        if not forecast_scores:
-            return jsonify({"error": "Forecast scores not available yet."}), 404
-        
-        # Find closest forecast to target time
-        closest_forecast = find_forecast_by_time(forecast_scores, target_time.isoformat())
-        
-        if closest_forecast:
-            return jsonify(closest_forecast)
-        else:
-            return jsonify({"error": "No forecast data available for requested time"}), 404
-            
     except ValueError:
         return jsonify({"error": "Invalid time format. Use format like '2h', '30m', '1d'"}), 400
 
+    return timeline_response(int(target_time.timestamp()))
+
 @bp.route("/api/rowcast/at/<timestamp>")
+@conditional('score_timeline')
 def rowcast_at_time(timestamp):
     """Get rowcast score for a specific timestamp"""
     try:
-        forecast_scores = get_data_from_redis('forecast_scores')
-        if not forecast_scores:
-            return jsonify({"error": "Forecast scores not available yet."}), 404
-        
-        # Find closest forecast to specified timestamp
-        closest_forecast = find_forecast_by_time(forecast_scores, timestamp)
-        
-        if closest_forecast:
-            return jsonify(closest_forecast)
-        else:
-            return jsonify({"error": "No forecast data available for requested time"}), 404
-            
+        target_epoch = to_epoch(timestamp)
     except Exception as e:
         return jsonify({"error": f"Invalid timestamp format: {str(e)}"}), 400
 
+    return timeline_response(target_epoch)
+
+@bp.route("/api/rowcast/timeline")
+@conditional('score_timeline')
+def rowcast_timeline():
+    """
+    The merged score timeline: 15-minute samples for the next 3 hours, hourly to 48 hours and
+    extended after that. Range queries (from/to/limit/fields) are thinned to a resolution
+    picked from the span they cover, or the one given as ?resolution=<minutes>.
+    """
+    if not any(arg in request.args for arg in SERIES_QUERY_ARGS + ('resolution',)):
+        return serve_snapshot('score_timeline', "Forecast timeline not available yet.")
+
+    try:
+        start = parse_time_arg(request.args['from']) if 'from' in request.args else None
+        end = parse_time_arg(request.args['to']) if 'to' in request.args else None
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+        resolution = request.args.get('resolution', 'auto')
+        if (limit is not None and limit < 0) or (resolution != 'auto' and int(resolution) <= 0):
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "Invalid query parameters. Use ISO timestamps or epoch seconds for 'from'/'to', a non-negative integer for 'limit' and minutes or 'auto' for 'resolution'."}), 400
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()] or None
+
+    rows = load_range('score_timeline', current_version('score_timeline'), start, end, fields=fields)
+    if rows is None:
+        return jsonify({"error": "Forecast timeline not available yet."}), 404
+    if resolution == 'auto':
+        # Open ends of the range stop at the ends of the timeline
+        first = to_epoch(rows[0]['timestamp']) if rows else 0
+        last = to_epoch(rows[-1]['timestamp']) if rows else 0
+        resolution = auto_resolution(first if start is None else start, last if end is None else end)
+    else:
+        resolution = int(resolution) * 60
+    rows = thin_rows(rows, resolution)
+    if limit is not None:
+        rows = rows[:limit]
+    response = respond(rows)
+    response.headers['X-Timeline-Resolution'] = str(resolution // 60)
+    return response
+
 @bp.route("/api/complete")
+@conditional('complete_view')
 def complete_data():
     """Get all current data, forecasts, and scores in one response"""
-    weather_data = get_data_from_redis('weather_data')
-    water_data = get_data_from_redis('water_data')
-    forecast_scores = get_data_from_redis('forecast_scores')
-    
-    # Calculate current rowcast score
-    current_rowcast = None
-    if weather_data and water_data:
-        current_weather = weather_data.get('current', {})
-        current_water = water_data.get('current', {})
-        params = merge_params(current_weather, current_water)
-        current_rowcast = compute_rowcast(params)
-    
-    response = {
-        "current": {
-            "weather": weather_data.get('current') if weather_data else None,
-            "water": water_data.get('current') if water_data else None,
-            "rowcast": current_rowcast
-        },
-        "forecast": {
-            "weather": weather_data.get('forecast') if weather_data else None,
-            "water": water_data.get('predictions') if water_data else None,
-            "rowcastScores": forecast_scores
-        },
-        "lastUpdated": datetime.now().isoformat()
-    }
-    
-    return jsonify(response)
+    return serve_snapshot('complete_view', "Complete data not available yet.")
 
 @bp.route("/api/rowcast/forecast/short-term")
+@conditional('short_term_forecast')
 def rowcast_short_term_forecast():
     """Get 15-minute interval rowcast forecast for the next 3 hours"""
-    short_term_scores = get_data_from_redis('short_term_forecast')
-    if short_term_scores:
-        return jsonify(short_term_scores)
-    return jsonify({"error": "Short-term forecast scores not available yet."}), 404
+    return serve_series('short_term_forecast', "Short-term forecast scores not available yet.")
 
 @bp.route("/api/rowcast/forecast/short-term/simple")
+@conditional('short_term_forecast_simple')
 def rowcast_short_term_forecast_simple():
     """Get simplified 15-minute interval rowcast forecast with just timestamps and scores"""
-    simple_short_term = get_data_from_redis('short_term_forecast_simple')
-    if simple_short_term:
-        return jsonify(simple_short_term)
-    return jsonify({"error": "Simple short-term forecast scores not available yet."}), 404
+    return serve_series('short_term_forecast_simple', "Simple short-term forecast scores not available yet.")
 
 @bp.route("/api/noaa/stageflow")
+@conditional('noaa_stageflow_data')
 def noaa_stageflow():
     """Returns NOAA NWPS stageflow forecast data."""
-    data = get_data_from_redis('noaa_stageflow_data')
-    if data:
-        return jsonify(data)
-    return jsonify({"error": "NOAA stageflow data not available yet."}), 404
+    return serve_snapshot('noaa_stageflow_data', "NOAA stageflow data not available yet.")
 
 @bp.route("/api/noaa/stageflow/current")
+@conditional('noaa_stageflow_data')
 def noaa_stageflow_current():
     """Returns current observed NOAA stageflow data."""
-    data = get_data_from_redis('noaa_stageflow_data')
-    if data and data.get('current'):
-        return jsonify(data['current'])
-    return jsonify({"error": "Current NOAA stageflow data not available yet."}), 404
+    return serve_snapshot('noaa_stageflow_data', "Current NOAA stageflow data not available yet.", view='current')
 
 @bp.route("/api/noaa/stageflow/forecast")
+@conditional('noaa_stageflow_data')
 def noaa_stageflow_forecast():
     """Returns NOAA stageflow forecast data only."""
-    data = get_data_from_redis('noaa_stageflow_data')
-    if data and data.get('forecast'):
-        return jsonify(data['forecast'])
-    return jsonify({"error": "NOAA stageflow forecast data not available yet."}), 404
+    return serve_snapshot('noaa_stageflow_data', "NOAA stageflow forecast data not available yet.", view='forecast')
 
 @bp.route("/api/weather/extended")
+@conditional('extended_weather_data')
 def weather_extended():
     """Returns extended weather forecast data (7 days)."""
-    data = get_data_from_redis('extended_weather_data')
-    if data:
-        return jsonify(data)
-    return jsonify({"error": "Extended weather data not available yet."}), 404
+    return serve_series('extended_weather_data', "Extended weather data not available yet.")
 
 @bp.route("/api/rowcast/forecast/extended")
+@conditional('extended_forecast_scores')
 def rowcast_forecast_extended():
     """Returns extended RowCast forecast scores (up to 7 days) using NOAA stageflow data."""
-    data = get_data_from_redis('extended_forecast_scores')
-    if data:
-        return jsonify(data)
-    return jsonify({"error": "Extended forecast scores not available yet."}), 404
+    return serve_series('extended_forecast_scores', "Extended forecast scores not available yet.")
 
 @bp.route("/api/rowcast/forecast/extended/simple")
+@conditional('extended_forecast_scores_simple')
 def rowcast_forecast_extended_simple():
     """Returns simplified extended RowCast forecast scores (timestamp and score only)."""
-    data = get_data_from_redis('extended_forecast_scores_simple')
-    if data:
-        return jsonify(data)
-    return jsonify({"error": "Extended forecast scores not available yet."}), 404
+    return serve_series('extended_forecast_scores_simple', "Extended forecast scores not available yet.")
+
+@bp.route("/api/rowcast/forecast/daily")
+@conditional('daily_forecast_summary')
+def rowcast_forecast_daily():
+    """Returns per-day aggregates of the extended RowCast forecast (America/New_York days)."""
+    return serve_snapshot('daily_forecast_summary', "Daily forecast summary not available yet.")
 
 @bp.route("/api/complete/extended")
+@conditional('complete_extended_view')
 def complete_extended():
     """Returns all data including extended forecasts for comprehensive dashboard."""
+    return serve_snapshot('complete_extended_view', "Complete extended data not available yet.")
+
+@bp.route("/api/rowcast/windows")
+@conditional('score_timeline', extra=lambda: int(time.time() // 900))
+@with_snapshots('score_timeline')
+def rowcast_windows(score_timeline):
+    """
+    Best rowing windows: the top-k non-overlapping windows of a given duration whose minimum
+    (or mean) score clears a threshold, over the merged score timeline (the same samples
+    /api/rowcast/timeline serves).
+    """
     try:
-        logging.info("Attempting to fetch complete extended data.")
-        # Get all data sources
-        weather_data = get_data_from_redis('weather_data')
-        logging.info(f"Weather data fetched: {'found' if weather_data else 'not found'}")
-        
-        extended_weather_data = get_data_from_redis('extended_weather_data')
-        logging.info(f"Extended weather data fetched: {'found' if extended_weather_data else 'not found'}")
-        
-        water_data = get_data_from_redis('water_data')
-        logging.info(f"Water data fetched: {'found' if water_data else 'not found'}")
-        
-        noaa_stageflow_data = get_data_from_redis('noaa_stageflow_data')
-        logging.info(f"NOAA stageflow data fetched: {'found' if noaa_stageflow_data else 'not found'}")
-        
-        forecast_scores = get_data_from_redis('forecast_scores')
-        logging.info(f"Forecast scores fetched: {'found' if forecast_scores else 'not found'}")
-        
-        extended_forecast_scores = get_data_from_redis('extended_forecast_scores')
-        logging.info(f"Extended forecast scores fetched: {'found' if extended_forecast_scores else 'not found'}")
-        
-        short_term_forecast = get_data_from_redis('short_term_forecast')
-        logging.info(f"Short term forecast fetched: {'found' if short_term_forecast else 'not found'}")
-        
-        response = {
-            'weather': {
-                'current': weather_data.get('current') if weather_data else None,
-                'forecast': weather_data.get('forecast') if weather_data else [],
-                'extended': extended_weather_data.get('forecast') if extended_weather_data else [],
-                'alerts': weather_data.get('alerts') if weather_data else []
-            },
-            'water': {
-                'current': water_data.get('current') if water_data else None,
-                'historical': water_data.get('historical') if water_data else {}
-            },
-            'noaa': {
-                'current': noaa_stageflow_data.get('current') if noaa_stageflow_data else None,
-                'observed': noaa_stageflow_data.get('observed') if noaa_stageflow_data else [],
-                'forecast': noaa_stageflow_data.get('forecast') if noaa_stageflow_data else [],
-                'metadata': noaa_stageflow_data.get('metadata') if noaa_stageflow_data else {}
-            },
-            'rowcast': {
-                'current': None,
-                'forecast': forecast_scores or [],
-                'extendedForecast': extended_forecast_scores or [],
-                'shortTerm': short_term_forecast or []
-            },
-            'metadata': {
-                'lastUpdated': datetime.now(EST).isoformat(),
-                'timezone': 'America/New_York',
-                'dataAvailability': {
-                    'weather': weather_data is not None,
-                    'extendedWeather': extended_weather_data is not None,
-                    'water': water_data is not None,
-                    'noaaStageflow': noaa_stageflow_data is not None,
-                    'forecast': forecast_scores is not None,
-                    'extendedForecast': extended_forecast_scores is not None,
-                    'shortTermForecast': short_term_forecast is not None
-                }
-            }
-        }
-        
-        # Calculate current rowcast if we have current data
-        if weather_data and weather_data.get('current'):
-            logging.info("Calculating current rowcast.")
-            current_water = water_data.get('current') if water_data else {}
-            noaa_current = noaa_stageflow_data.get('current') if noaa_stageflow_data else {}
-            
-            # Use NOAA data if available, otherwise use current water data
-            current_params = {
-                'windSpeed': weather_data['current'].get('windSpeed'),
-                'windGust': weather_data['current'].get('windGust'),
-                'apparentTemp': weather_data['current'].get('apparentTemp'),
-                'uvIndex': weather_data['current'].get('uvIndex'),
-                'precipitation': weather_data['current'].get('precipitation'),
-                'discharge': noaa_current.get('discharge') or current_water.get('discharge'),
-                'waterTemp': current_water.get('waterTemp'),  # NOAA doesn't provide water temp
-                'gaugeHeight': noaa_current.get('gaugeHeight') or current_water.get('gaugeHeight'),
-                'weatherAlerts': weather_data['current'].get('weatherAlerts', []),
-                'visibility': weather_data['current'].get('visibility'),
-                'lightningPotential': 0,  # Not available in current weather
-                'precipitationProbability': 0  # Not available in current weather
-            }
-            
-            current_rowcast = compute_rowcast(current_params)
-            response['rowcast']['current'] = {
-                'score': current_rowcast['score'],
-                'factors': current_rowcast['factors'],
-                'conditions': current_params,
-                'timestamp': weather_data['current'].get('timestamp'),
-                'noaaDataUsed': noaa_current.get('discharge') is not None or noaa_current.get('gaugeHeight') is not None
-            }
-            logging.info("Current rowcast calculated successfully.")
-        else:
-            logging.warning("Could not calculate current rowcast due to missing current weather data.")
-        
-        logging.info("Successfully compiled extended data response.")
-        return jsonify(response)
-        
-    except Exception as e:
-        logging.error(f"Error in /api/complete/extended: {str(e)}", exc_info=True)
-        return jsonify({"error": f"Failed to compile extended data: {str(e)}"}), 500
+        duration = int(request.args.get('duration', 90))
+        threshold = float(request.args.get('threshold', 6))
+        k = int(request.args.get('k', 3))
+        mode = request.args.get('mode', 'min')
+        # Also rejects nan and inf, which would otherwise be echoed back as invalid JSON
+        if duration <= 0 or k <= 0 or mode not in ('min', 'mean') or not 0 <= threshold <= 10:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "Invalid parameters. Use duration (minutes) > 0, threshold (0-10), k > 0 and mode 'min' or 'mean'."}), 400
+
+    if not score_timeline:
+        return jsonify({"error": "Forecast scores not available yet."}), 404
+
+    # Results stay valid until the timeline is republished or its start moves on
+    now_bucket = int(time.time() // 900)
+    cache_key = (current_version('score_timeline'), now_bucket, duration, threshold, k, mode)
+    windows = window_cache.get(cache_key)
+    if windows is None:
+        samples = timeline_samples(score_timeline, now=now_bucket * 900)
+        windows = best_windows(samples, duration * 60, threshold, k, mode)
+        window_cache.put(cache_key, windows)
+
+    return respond({
+        'duration': duration,
+        'threshold': threshold,
+        'mode': mode,
+        'windows': windows
+    })
+
+# Seconds between keep-alive comments on an idle event stream
+STREAM_HEARTBEAT_SECONDS = 15
+
+@bp.route("/api/stream")
+def event_stream():
+    """
+    Server-Sent Events stream: pushes 'score' (current score changed), 'version' (a data key,
+    e.g. a forecast, was republished) and 'alerts' (weather alerts appeared, changed or cleared)
+    events as soon as the publishing job writes them.
+    """
+    subscription = event_broker.subscribe()
+    current = get_data_from_redis('rowcast_current')
+
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            if current:
+                yield f"event: score\ndata: {json.dumps({'rowcastScore': current['rowcastScore'], 'factors': current['factors']})}\n\n"
+            while True:
+                event = subscription.next(timeout=STREAM_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                payload = json.loads(event)
+                yield f"event: {payload['type']}\ndata: {json.dumps(payload['data'])}\n\n"
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Keep nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@bp.route("/metrics")
+def prometheus_metrics():
+    """Prometheus metrics for jobs, upstream APIs, routes and data freshness, totalled across workers."""
+    if METRICS_TOKEN and not hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {METRICS_TOKEN}"):
+        return jsonify({"error": "Unauthorized"}), 401
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# Waterfall view of recent traces for /debug/traces
+TRACES_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>RowCast Traces</title>
+    <style>
+        body { font-family: Arial, sans-serif; background-color: #0a0a0a; color: #ffffff; margin: 0; padding: 20px; }
+        h1 { color: #66b3ff; }
+        details { background: #1a1a1a; border-radius: 8px; margin-bottom: 8px; padding: 8px 12px; }
+        summary { cursor: pointer; font-family: monospace; }
+        .error { color: #ff6b6b; }
+        table { width: 100%; border-collapse: collapse; font-family: monospace; font-size: 12px; margin-top: 8px; }
+        td { padding: 2px 6px; white-space: nowrap; }
+        .bar-cell { width: 50%; }
+        .bar { background: #66b3ff; height: 10px; min-width: 1px; }
+        .bar.error { background: #ff6b6b; }
+    </style>
+</head>
+<body>
+    <h1>Recent traces</h1>
+    {% for trace in traces %}
+    <details>
+        <summary class="{{ 'error' if trace.errors else '' }}">
+            {{ trace.start | int }} &middot; {{ trace.name }} &middot; {{ trace.durationMs }} ms &middot; {{ trace.spans | length }} spans{{ ' &middot; %d errors' % trace.errors if trace.errors else '' }} &middot; run {{ trace.traceId }}
+        </summary>
+        <table>
+            {% for s in trace.spans %}
+            {% set offset = ((s.start - trace.start) * 1000 / (trace.durationMs or 1) * 100) %}
+            {% set width = (s.durationMs / (trace.durationMs or 1) * 100) %}
+            <tr title="{{ s.attributes | tojson }}{{ ' ' ~ s.error if s.error else '' }}">
+                <td style="padding-left: {{ 6 + s.depth * 16 }}px" class="{{ 'error' if s.status == 'error' else '' }}">{{ s.name }}</td>
+                <td>{{ s.durationMs }} ms</td>
+                <td class="bar-cell"><div class="bar {{ 'error' if s.status == 'error' else '' }}" style="margin-left: {{ offset }}%; width: {{ width }}%"></div></td>
+            </tr>
+            {% endfor %}
+        </table>
+    </details>
+    {% else %}
+    <p>No spans recorded yet.</p>
+    {% endfor %}
+</body>
+</html>"""
+
+@bp.route("/debug/traces")
+def debug_traces():
+    """
+    Recent traces (job runs and API requests) as a waterfall of their spans, or as JSON with
+    ?format=json. ?name= keeps only traces whose root span name contains the given text.
+    Only served with DEBUG_TRACES_ENABLED.
+    """
+    if not DEBUG_TRACES_ENABLED:
+        return jsonify({"error": "Not found"}), 404
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({"error": "Invalid 'limit' parameter."}), 400
+    traces = group_traces(tracing_exporter.spans())
+    name = request.args.get('name')
+    if name:
+        traces = [trace for trace in traces if name in trace['name']]
+    traces = traces[:limit]
+    if request.args.get('format') == 'json':
+        return jsonify(traces)
+    return render_template_string(TRACES_TEMPLATE, traces=traces)
+
+@bp.route("/api/cache/stats")
+def cache_stats():
+    """Returns hit ratios of this worker's decoded snapshot cache for monitoring."""
+    return jsonify(snapshot_cache.stats())
+
+@bp.route("/api/health")
+def health():
+    """Storage backend health for load balancers: 200 when it answers a PING, else 503."""
+    status = storage_health()
+    return jsonify(status), 200 if status['ok'] else 503
 
 @bp.route("/api")
 @bp.route("/docs")
@@ -409,6 +710,7 @@ def api_documentation():
                 "/api/rowcast/forecast/simple": "Simple rowcast forecast - timestamps and scores only",
                 "/api/rowcast/forecast/extended": "Extended RowCast forecast using NOAA data (up to 7 days)",
                 "/api/rowcast/forecast/extended/simple": "Simple extended RowCast forecast - timestamps and scores only",
+                "/api/rowcast/forecast/daily": "Per-day score distribution, best/worst hour, hours above thresholds and dominant limiting factor",
                 "/api/rowcast/forecast/short-term": "Detailed 15-minute forecast (3 hours)",
                 "/api/rowcast/forecast/short-term/simple": "Simple 15-minute forecast - timestamps and scores only"
             },
@@ -417,6 +719,23 @@ def api_documentation():
                 "/api/noaa/stageflow/current": "Current observed stageflow from NOAA",
                 "/api/noaa/stageflow/forecast": "NOAA stageflow forecast data only"
             },
+            "range_queries": {
+                "description": "Forecast and weather series endpoints accept optional range / projection parameters and then return only the matching rows",
+                "parameters": {
+                    "from": "Earliest timestamp (ISO 8601, naive = America/New_York, or epoch seconds)",
+                    "to": "Latest timestamp, inclusive",
+                    "limit": "Maximum number of rows",
+                    "fields": "Comma-separated field paths to include, e.g. 'score.score,conditions.windSpeed'"
+                },
+                "example": "/api/rowcast/forecast/extended?from=2025-07-01T06:00&limit=6&fields=score.score"
+            },
+            "delta_updates": {
+                "description": "Detailed forecast endpoints (forecast, short-term, extended) return only the changes since a version; the current version is sent in the X-Data-Version header",
+                "parameters": {
+                    "since": "Version the client already has; the response lists changed and added rows and removed timestamps"
+                },
+                "example": "/api/rowcast/forecast/extended?since=42"
+            },
             "time_based_queries": {
                 "/api/rowcast/forecast/<time_offset>": {
                     "description": "Get forecast for specific time offset from now",
@@ -430,12 +749,51 @@ def api_documentation():
                     "description": "Get forecast for specific timestamp",
                     "format": "YYYY-MM-DDTHH:MM",
                     "example": "/api/rowcast/at/2025-07-01T16:00"
+                },
+                "?interpolate=true": "Point queries blend the two samples either side of the requested time instead of snapping to the nearest",
+                "/api/rowcast/timeline": {
+                    "description": "Merged timeline: 15-minute resolution for 3 hours, hourly to 48 hours, extended after that",
+                    "parameters": {
+                        "from/to/limit/fields": "Range and projection, as on the series endpoints",
+                        "resolution": "Sample spacing in minutes, or 'auto' (default) to pick it from the span of the range"
+                    },
+                    "example": "/api/rowcast/timeline?from=2025-07-01T06:00&to=2025-07-03T06:00"
+                }
+            },
+            "planning": {
+                "/api/rowcast/windows": {
+                    "description": "Top-k non-overlapping rowing windows whose minimum (or mean) score clears a threshold, over the merged score timeline",
+                    "parameters": {
+                        "duration": "Window length in minutes (default 90)",
+                        "threshold": "Minimum acceptable score (default 6)",
+                        "k": "Number of windows (default 3)",
+                        "mode": "'min' (every sample must clear the threshold, default) or 'mean'"
+                    },
+                    "example": "/api/rowcast/windows?duration=90&threshold=7&k=3"
                 }
             },
             "complete_data": {
                 "/api/complete": "All current data, forecasts, and scores in one response",
                 "/api/complete/extended": "All data including extended forecasts and NOAA stageflow for comprehensive dashboard"
             },
+            "freshness": {
+                "description": "Every data response says how fresh its data is in headers; JSON object bodies also carry them as a 'freshness' field ({fetchedAt, expiresAt}), list bodies such as the forecast series only in the headers",
+                "headers": {
+                    "X-Data-Fetched-At": "When the oldest data behind the response was fetched upstream (ISO 8601)",
+                    "X-Data-Expires-At": "When it stops being current; a refresh is started on the first request after that",
+                    "X-Data-Stale": "'true' while the data is past its expiry or an upstream it comes from is unavailable, else 'false'",
+                    "X-Upstream-Unavailable": "Upstream APIs whose circuit breaker is open, when there are any"
+                }
+            },
+            "live_updates": {
+                "/api/stream": "Server-Sent Events stream of 'score', 'version' and 'alerts' events"
+            },
+            "monitoring": {
+                "/api/cache/stats": "Snapshot cache hit ratios for the worker serving the request",
+                "/api/health": "Storage backend status and PING latency (503 when it is unreachable)",
+                "/debug/traces": "Waterfall of recent job-run and request traces (?format=json, ?name=job to show only job runs); only with DEBUG_TRACES_ENABLED=1",
+                "/metrics": "Prometheus metrics: job durations/outcomes/last success, data age per key, upstream latency and status codes, route latency and payload sizes; needs 'Authorization: Bearer <METRICS_TOKEN>' when a token is configured"
+            },
             "dashboard": {
                 "/dashboard": "Visual dashboard showing all data in easy-to-read format",
                 "/data": "Alternative URL for the visual dashboard"
@@ -461,7 +819,8 @@ def api_documentation():
         },
         "response_formats": {
             "detailed": "Includes all conditions and parameters used in scoring",
-            "simple": "Timestamps and scores only for lightweight applications"
+            "simple": "Timestamps and scores only for lightweight applications",
+            "msgpack": "Send 'Accept: application/msgpack' on any data endpoint for MessagePack; forecast rows arrive as columns, with epochs as int64 and numeric columns as float64 little-endian arrays"
         }
     }
     
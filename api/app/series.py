@@ -0,0 +1,174 @@
+# app/series.py
+
+import json
+from bisect import bisect_left, bisect_right
+from app.utils import to_epoch
+
+# Snapshots holding a forecast time series, and the field the rows live under
+# (None when the snapshot itself is the list of rows).
+SERIES_SOURCES = {
+    'forecast_scores': None,
+    'forecast_scores_simple': None,
+    'short_term_forecast': None,
+    'short_term_forecast_simple': None,
+    'extended_forecast_scores': None,
+    'extended_forecast_scores_simple': None,
+    'weather_data': 'forecast',
+    'extended_weather_data': 'forecast',
+    'score_timeline': None,
+}
+
+# Row fields holding the list of active NWS alerts. Every hour carries the same few
+# alerts, so they are stored once per series and rows reference them by id.
+ALERT_FIELDS = ('weatherAlerts', 'conditions.weatherAlerts')
+
+
+def stored_as_columns(key):
+    """
+    Forecast score series are stored only in their normalized columnar form. Other series
+    (weather snapshots with rows under a field) keep their snapshot as it is.
+    """
+    return key in SERIES_SOURCES and SERIES_SOURCES[key] is None
+
+
+def index_key(key):
+    """Returns the Redis sorted set indexing the rows of a series by epoch second."""
+    return f"index:{key}"
+
+
+def series_rows(key, data):
+    """Returns the list of timestamped rows inside a series snapshot."""
+    field = SERIES_SOURCES[key]
+    rows = data.get(field) if field and isinstance(data, dict) else data
+    return rows if isinstance(rows, list) else []
+
+
+def _flatten(row, prefix=''):
+    """Yields (dotted path, value) for every leaf of a nested row; lists are leaves."""
+    for name, value in row.items():
+        path = f"{prefix}{name}"
+        if isinstance(value, dict) and value:
+            yield from _flatten(value, f"{path}.")
+        else:
+            yield path, value
+
+
+def _wants(path, fields):
+    """True when a dotted path is selected by fields (a field selects itself and everything under it)."""
+    return not fields or path == 'timestamp' or any(path == f or path.startswith(f"{f}.") for f in fields)
+
+
+def encode_columns(rows):
+    """
+    Converts a list of timestamped rows into a normalized columnar series: a sorted epoch
+    index, one value array per dotted field path (e.g. 'score.factors.wind'), and the
+    distinct alerts, which alert columns reference by id.
+    """
+    rows = sorted((row for row in rows if row.get('timestamp')), key=lambda row: to_epoch(row['timestamp']))
+    columns = {}
+    for i, row in enumerate(rows):
+        for path, value in _flatten(row):
+            columns.setdefault(path, [None] * len(rows))[i] = value
+
+    alerts = []
+    alert_ids = {}
+    for path in ALERT_FIELDS:
+        if path not in columns:
+            continue
+        column = columns[path]
+        for i, hour_alerts in enumerate(column):
+            if hour_alerts is None:
+                continue
+            ids = []
+            for alert in hour_alerts:
+                identity = json.dumps(alert, sort_keys=True)
+                if identity not in alert_ids:
+                    alert_ids[identity] = len(alerts)
+                    alerts.append(alert)
+                ids.append(alert_ids[identity])
+            column[i] = ids
+
+    return {
+        'epochs': [to_epoch(row['timestamp']) for row in rows],
+        'columns': columns,
+        'alerts': alerts
+    }
+
+
+def select_rows(series, start=None, end=None, limit=None, fields=None):
+    """
+    Rebuilds only the requested rows of a columnar series: those with start <= epoch <= end
+    (both optional), at most limit of them, and only the field paths named in fields
+    (a field selects itself and everything nested under it; timestamp is always kept).
+    """
+    epochs = series['epochs']
+    lo = bisect_left(epochs, start) if start is not None else 0
+    hi = bisect_right(epochs, end) if end is not None else len(epochs)
+    if limit is not None:
+        hi = min(hi, lo + limit)
+    return select_rows_at(series, range(lo, hi), fields)
+
+
+def select_rows_at(series, indices, fields=None):
+    """Rebuilds the rows at the given positions of a columnar series, projected onto fields."""
+    paths = [path for path in series['columns'] if _wants(path, fields)]
+    split_paths = [(path.split('.'), series['columns'][path], path in ALERT_FIELDS) for path in paths]
+    alerts = series.get('alerts', [])
+
+    rows = []
+    for i in indices:
+        row = {}
+        for parts, values, is_alerts in split_paths:
+            target = row
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            value = values[i]
+            if is_alerts and value is not None:
+                value = [alerts[alert_id] for alert_id in value]
+            target[parts[-1]] = value
+        rows.append(row)
+    return rows
+
+
+def index_members(epochs):
+    """
+    Encodes the members of a series' sorted-set index: {row position: epoch} for every row
+    with a time. Positions point into the series as stored (the columnar series, or the
+    snapshot's list of rows), which the rows are read back from (see rows_at).
+    """
+    return {str(position): epoch for position, epoch in enumerate(epochs) if epoch is not None}
+
+
+def row_epochs(rows):
+    """Returns the epoch of every row of a list, None for rows without a timestamp."""
+    return [to_epoch(row['timestamp']) if row.get('timestamp') else None for row in rows]
+
+
+def project_row(row, fields=None):
+    """Returns a copy of a row with only the field paths named in fields (see select_rows)."""
+    projected = {}
+    for path, value in _flatten(row):
+        if not _wants(path, fields):
+            continue
+        *parents, name = path.split('.')
+        target = projected
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[name] = value
+    return projected
+
+
+def rows_at(key, data, positions, fields=None):
+    """Rebuilds the rows at index positions of a stored series snapshot, projected onto fields."""
+    if stored_as_columns(key):
+        return select_rows_at(data, positions, fields)
+    rows = series_rows(key, data)
+    return [project_row(rows[position], fields) for position in positions]
+
+
+def diff_digests(old, new):
+    """Compares two {timestamp: digest} maps; returns (changed, added, removed) timestamps."""
+    changed = [timestamp for timestamp, digest in new.items() if timestamp in old and old[timestamp] != digest]
+    added = [timestamp for timestamp in new if timestamp not in old]
+    removed = [timestamp for timestamp in old if timestamp not in new]
+    return changed, added, removed
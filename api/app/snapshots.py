@@ -0,0 +1,808 @@
+# app/snapshots.py
+
+import fcntl
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from redis.exceptions import RedisError, WatchError
+from app.extensions import STORAGE_BACKEND, redis_client, redis_binary_client
+from app.events import publish_event
+from app.local_snapshots import LocalSnapshot, local_snapshots, write_snapshot_file
+from app.tracing import span, traced
+from app.series import (SERIES_SOURCES, encode_columns, index_key, index_members, row_epochs, rows_at, series_rows,
+                        stored_as_columns)
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; clients then get gzip instead
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; clients then get JSON instead
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+# Redis hashes holding the current version and the last write time (epoch seconds)
+# of every published data key. A key's version is the snapshot generation it was last
+# published in and points readers at that generation's namespace (<key>@<version>).
+VERSIONS_KEY = 'data_versions'
+UPDATED_AT_KEY = 'data_updated_at'
+# Redis hash holding the freshness of every published key as JSON {fetchedAt, expiresAt} (epoch seconds)
+FRESHNESS_KEY = 'data_freshness'
+# Seconds after publishing at which each key expires unless republished; filled in by
+# app.tasks from its job schedule. Keys without a lifetime never expire.
+KEY_LIFETIMES = {}
+# Counter handing out snapshot generations, one per publishing run
+GENERATION_KEY = 'snapshot_generation'
+# Seconds a superseded generation stays readable for requests that resolved it just before the swap
+SUPERSEDED_TTL = 300
+
+# Where snapshot generations live: 'redis' (shared by every node) or 'shared' (memory-mapped
+# files in SHARED_SNAPSHOT_DIR, shared by the workers of a single node). The file storage
+# backend implies 'shared'.
+SNAPSHOT_STORE = os.getenv('SNAPSHOT_STORE', 'shared' if STORAGE_BACKEND == 'file' else 'redis')
+SHARED_SNAPSHOT_DIR = os.getenv('SHARED_SNAPSHOT_DIR', '/dev/shm/rowcast-snapshots')
+
+# Sub-documents of a snapshot that are served by their own endpoint
+# (e.g. /api/weather/current) and therefore get their own pre-rendered body.
+SNAPSHOT_VIEWS = {
+    'weather_data': ('current', 'forecast'),
+    'water_data': ('current', 'predictions'),
+    'noaa_stageflow_data': ('current', 'forecast'),
+}
+
+# Forecast series that keep a bounded history of per-hour digests, so clients can ask
+# for only the hours that changed since a version they already have (?since=).
+DELTA_SERIES = ('forecast_scores', 'short_term_forecast', 'extended_forecast_scores')
+DELTA_HISTORY_LENGTH = 48
+
+# Content-Encodings stored for every body, in order of preference. Only compressed
+# bodies are kept; the rare client without gzip support gets the gzip body inflated.
+BODY_ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+# Every stored body variant: the JSON encodings plus the MessagePack representation.
+BODY_VARIANTS = BODY_ENCODINGS + (('msgpack',) if msgpack else ())
+
+
+# What get_versions reports per key; every field is None for unpublished keys. local marks
+# keys only available from the local snapshot file (Redis is down or lost them).
+SnapshotState = namedtuple('SnapshotState', ('version', 'updated_at', 'fetched_at', 'expires_at', 'local'),
+                           defaults=(False,))
+
+
+def versioned(name, version):
+    """Returns the Redis key of name in the namespace of snapshot generation version."""
+    return f"{name}@{version}"
+
+
+def body_key(key, view, encoding, version):
+    """Returns the Redis key of a pre-rendered response body at a snapshot generation."""
+    name = f"body:{key}.{view}" if view else f"body:{key}"
+    return f"{versioned(name, version)}:{encoding}"
+
+
+def generation_names(key, version):
+    """Returns every Redis key a snapshot may have written under a generation."""
+    names = [versioned(key, version), versioned(index_key(key), version)]
+    for view in (None,) + SNAPSHOT_VIEWS.get(key, ()):
+        names.extend(body_key(key, view, variant, version) for variant in BODY_VARIANTS)
+    return names
+
+
+def _typed_array(typecode, values):
+    """Packs numbers into a little-endian typed array ('d' = float64, 'q' = int64)."""
+    packed = array(typecode, values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _packable(data):
+    """
+    Prepares data for MessagePack: every list of timestamped rows becomes a columnar series
+    whose int64 epoch index and all-numeric columns (scores, factors, most conditions) are
+    binary typed arrays, with null values as NaN.
+    """
+    if isinstance(data, dict):
+        return {name: _packable(value) for name, value in data.items()}
+    if not isinstance(data, list):
+        return data
+    if not data or not all(isinstance(row, dict) and isinstance(row.get('timestamp'), str) and row['timestamp']
+                           for row in data):
+        return [_packable(value) for value in data]
+
+    try:
+        series = encode_columns(data)
+    except (ValueError, TypeError):  # Unparseable timestamps or alert fields; keep the rows as they are
+        return [_packable(value) for value in data]
+    columns = {}
+    for path, values in series['columns'].items():
+        numeric = all(value is None or (isinstance(value, (int, float)) and not isinstance(value, bool))
+                      for value in values)
+        if numeric and any(value is not None for value in values):
+            columns[path] = _typed_array('d', (float('nan') if value is None else value for value in values))
+        else:
+            columns[path] = values
+    return {
+        'epochs': _typed_array('q', series['epochs']),
+        'columns': columns,
+        'alerts': series['alerts']
+    }
+
+
+def render_msgpack(data):
+    """Encodes data as MessagePack with timestamped row lists packed into typed columnar arrays."""
+    return msgpack.packb(_packable(data), use_bin_type=True)
+
+
+def render_bodies(data):
+    """Serializes data once into the compressed variants of its JSON response body and its MessagePack body."""
+    body = json.dumps(data, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    bodies = {'gzip': gzip.compress(body, compresslevel=9)}
+    if brotli:
+        bodies['br'] = brotli.compress(body, quality=11)
+    if msgpack:
+        bodies['msgpack'] = render_msgpack(data)
+    return bodies
+
+
+def history_key(key):
+    """Returns the Redis sorted set holding the digest history of a forecast series."""
+    return f"history:{key}"
+
+
+def row_digests(rows):
+    """Returns {timestamp: digest} of every row, covering its score and conditions."""
+    return {
+        row['timestamp']: hashlib.blake2b(json.dumps(row, sort_keys=True).encode('utf-8'), digest_size=8).hexdigest()
+        for row in rows if row.get('timestamp')
+    }
+
+
+@traced('redis record_history')
+def _record_history(key, version, rows):
+    """Adds a version's row digests to the series history and drops the oldest entries beyond the bound."""
+    entry = json.dumps({'version': version, 'rows': row_digests(rows)})
+    pipe = redis_client.pipeline()
+    pipe.zadd(history_key(key), {entry: version})
+    pipe.zremrangebyrank(history_key(key), 0, -(DELTA_HISTORY_LENGTH + 1))
+    pipe.execute()
+
+
+@traced('redis load_history')
+def load_history(key, versions):
+    """Returns {version: {timestamp: digest}} for those of versions still in the series history."""
+    pipe = redis_client.pipeline(transaction=False)
+    for version in versions:
+        pipe.zrangebyscore(history_key(key), version, version)
+    try:
+        results = pipe.execute()
+    except RedisError as e:
+        # Not kept locally; callers fall back to full responses
+        logger.warning(f"Redis history read of {key} failed: {e}")
+        return {}
+    history = {}
+    for version, entries in zip(versions, results):
+        if entries:
+            history[version] = json.loads(entries[0])['rows']
+    return history
+
+
+def iso_time(epoch):
+    """Formats epoch seconds as an ISO 8601 UTC timestamp, or None."""
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat(timespec='seconds') if epoch is not None else None
+
+
+def _render_snapshot(key, data, generation, freshness):
+    """
+    Renders everything a snapshot stores under a generation. Object bodies carry the
+    snapshot's freshness as a 'freshness' field; list bodies (the forecast series) stay
+    plain lists, so their freshness is only sent in the X-Data-* headers of the response.
+    Returns ({redis key: value}, sorted-set index members or None, rows or None).
+    """
+    values = {}
+    for view in (None,) + SNAPSHOT_VIEWS.get(key, ()):
+        document = data if view is None else (data.get(view) if isinstance(data, dict) else None)
+        # Missing views get no body, so their endpoint answers 404 instead of serving an old one
+        if document:
+            if isinstance(document, dict):
+                document = dict(document, freshness={'fetchedAt': iso_time(freshness['fetchedAt']),
+                                                     'expiresAt': iso_time(freshness['expiresAt'])})
+            for variant, body in render_bodies(document).items():
+                values[body_key(key, view, variant, generation)] = body
+    rows = series_rows(key, data) if key in SERIES_SOURCES else None
+    members = None
+    if stored_as_columns(key):
+        data = encode_columns(rows)
+        members = index_members(data['epochs'])
+    elif rows is not None:
+        members = index_members(row_epochs(rows))
+    values[versioned(key, generation)] = json.dumps(data)
+    return values, members, rows
+
+
+def _file_values(key, generation, values, members):
+    """The values of a rendered snapshot as stored in a snapshot file, with the index as [member, epoch] pairs."""
+    if not members:
+        return values
+    ordered = sorted(members.items(), key=lambda member: (member[1], member[0]))
+    return dict(values, **{versioned(index_key(key), generation): json.dumps(ordered)})
+
+
+def _slice_index(index, start=None, end=None, limit=None):
+    """Returns the members of an (epochs, members) index with start <= epoch <= end, at most limit of them."""
+    epochs, members = index
+    low = 0 if start is None else bisect_left(epochs, start)
+    high = len(epochs) if end is None else bisect_right(epochs, end)
+    return members[low:high][:limit]
+
+
+def _index_neighbours(index, epoch):
+    """Returns ([member at or before epoch], [member after epoch]) of an (epochs, members) index; either may be empty."""
+    epochs, members = index
+    position = bisect_right(epochs, epoch)
+    return members[max(0, position - 1):position], members[position:position + 1]
+
+
+def _local_value(key, version, name):
+    """Returns a value of key's generation version from the local snapshot file, or None."""
+    snapshot = local_snapshots.load(key)
+    if snapshot is None or snapshot.version != str(version):
+        return None
+    return snapshot.get(name)
+
+
+def _local_index(key, version):
+    """Returns the (epochs, members) index of a series from the local snapshot file, or None."""
+    snapshot = local_snapshots.load(key)
+    if snapshot is None or snapshot.version != str(version):
+        return None
+    return snapshot.index(versioned(index_key(key), version)) or ([], [])
+
+
+def _generation_floor(versions=()):
+    """
+    Returns the generation a fresh counter continues above: the highest of versions, of the
+    local snapshot files and of the current epoch millisecond. The clock keeps generations
+    unique even when a flushed or restarted store lost its counter and this node has no
+    snapshot files, as long as fewer than a thousand runs publish per second on average;
+    otherwise a reused version (and a ?since= built on it) could name different data.
+    """
+    return max([int(time.time() * 1000), local_snapshots.latest_version()] + [int(version) for version in versions])
+
+
+class RedisSnapshotStore:
+    """
+    Snapshot generations in Redis, shared by every node. Every publish also writes each key
+    to a local snapshot file, which serves whatever Redis cannot: while it is unreachable
+    or after it restarted empty.
+    """
+
+    def next_generation(self):
+        """Takes the next snapshot generation, never lower than a version already handed out."""
+        with redis_client.pipeline() as pipe:
+            while True:
+                try:
+                    # A missing counter (first run, or Redis was flushed or restarted empty) is seeded
+                    # above every version that may have been handed out before, in the same MULTI as the
+                    # INCR; retried if another worker seeded it (or Redis was flushed) in between
+                    pipe.watch(GENERATION_KEY)
+                    floor = None if pipe.exists(GENERATION_KEY) else _generation_floor(pipe.hvals(VERSIONS_KEY))
+                    pipe.multi()
+                    if floor is not None:
+                        pipe.set(GENERATION_KEY, floor)
+                    pipe.incr(GENERATION_KEY)
+                    return pipe.execute()[-1]
+                except WatchError:
+                    continue
+
+    def swap(self, generation, rendered, freshness, published_at, inputs=None):
+        """
+        Writes rendered {key: (values, index members, rows)} under generation and swaps every
+        key's version pointer to it in one MULTI/EXEC; the replaced generations expire after
+        SUPERSEDED_TTL seconds. Returns False, writing nothing, if any of inputs {key: version}
+        is no longer current (None: still unpublished) or a key already points at a newer
+        generation, so versions only ever increase.
+        """
+        keys = list(rendered)
+        inputs = inputs or {}
+        expected = [str(version) if version is not None else None for version in inputs.values()]
+        with span('redis swap generation', keys=keys, generation=generation), redis_client.pipeline() as pipe:
+            while True:
+                try:
+                    # Retried if another run swaps pointers in between, so no replaced generation is left behind
+                    pipe.watch(VERSIONS_KEY)
+                    previous = pipe.hmget(VERSIONS_KEY, keys)
+                    if any(version is not None and int(version) > generation for version in previous):
+                        return False
+                    if inputs and pipe.hmget(VERSIONS_KEY, list(inputs)) != expected:
+                        return False
+                    pipe.multi()
+                    for key, (values, members, _) in rendered.items():
+                        pipe.mset(values)
+                        if members:
+                            pipe.zadd(versioned(index_key(key), generation), members)
+                    for key, version in zip(keys, previous):
+                        if version is not None:
+                            for name in generation_names(key, version):
+                                pipe.expire(name, SUPERSEDED_TTL)
+                    pipe.hset(UPDATED_AT_KEY, mapping={key: published_at for key in keys})
+                    pipe.hset(FRESHNESS_KEY, mapping={key: json.dumps(freshness[key]) for key in keys})
+                    pipe.hset(VERSIONS_KEY, mapping={key: generation for key in keys})
+                    pipe.execute()
+                    break
+                except WatchError:
+                    continue
+
+        with span('write local snapshots', keys=keys, generation=generation):
+            for key, (values, members, _) in rendered.items():
+                try:
+                    local_snapshots.write(key, str(generation), published_at, freshness[key],
+                                          _file_values(key, generation, values, members))
+                except OSError as e:
+                    logger.warning(f"Could not write local snapshot of {key}: {e}")
+        return True
+
+    def versions(self, keys):
+        """Returns {key: current version or None} with one HMGET."""
+        try:
+            versions = dict(zip(keys, redis_client.hmget(VERSIONS_KEY, keys)))
+        except RedisError as e:
+            logger.warning(f"Redis version lookup failed, using local snapshots: {e}")
+            versions = dict.fromkeys(keys)
+        for key in keys:
+            local = local_snapshots.load(key) if versions[key] is None else None
+            if local is not None:
+                versions[key] = local.version
+        return versions
+
+    def states(self, keys):
+        """Returns {key: SnapshotState} in one round trip."""
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hmget(VERSIONS_KEY, keys)
+        pipe.hmget(UPDATED_AT_KEY, keys)
+        pipe.hmget(FRESHNESS_KEY, keys)
+        try:
+            versions, updated, freshness = pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Redis version lookup failed, using local snapshots: {e}")
+            versions = updated = freshness = [None] * len(keys)
+        states = {}
+        for key, version, updated_at, key_freshness in zip(keys, versions, updated, freshness):
+            if version is None:
+                local = local_snapshots.load(key)
+                if local is not None:
+                    states[key] = SnapshotState(local.version, local.updated_at, local.freshness.get('fetchedAt'),
+                                                local.freshness.get('expiresAt'), local=True)
+                    continue
+            key_freshness = json.loads(key_freshness) if key_freshness else {}
+            states[key] = SnapshotState(version, float(updated_at) if updated_at is not None else None,
+                                        key_freshness.get('fetchedAt'), key_freshness.get('expiresAt'))
+        return states
+
+    def get(self, items, binary=False):
+        """Returns the values of [(key, version, name)] with one MGET (bytes if binary, else str)."""
+        client = redis_binary_client if binary else redis_client
+        try:
+            values = client.mget([name for _, _, name in items])
+        except RedisError as e:
+            logger.warning(f"Redis read failed, using local snapshots: {e}")
+            values = [None] * len(items)
+        return [value if value is not None else _local_value(key, version, name)
+                for (key, version, name), value in zip(items, values)]
+
+    def range(self, key, version, start=None, end=None, limit=None):
+        """Returns the index members (row positions) of a series version with start <= epoch <= end, with ZRANGEBYSCORE."""
+        paging = {'start': 0, 'num': limit} if limit is not None else {}
+        try:
+            members = redis_client.zrangebyscore(versioned(index_key(key), version), '-inf' if start is None else start,
+                                                 '+inf' if end is None else end, **paging)
+        except RedisError as e:
+            logger.warning(f"Redis range read of {key} failed, using the local snapshot: {e}")
+            members = []
+        # An empty answer may also mean Redis lost the index
+        local = _local_index(key, version) if not members else None
+        return _slice_index(local, start, end, limit) if local is not None else members
+
+    def neighbours(self, key, version, epoch):
+        """Returns ([member at or before epoch], [member after epoch]); two O(log n) lookups in one round trip."""
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.zrevrangebyscore(versioned(index_key(key), version), epoch, '-inf', start=0, num=1)
+        pipe.zrangebyscore(versioned(index_key(key), version), f"({epoch}", '+inf', start=0, num=1)
+        try:
+            before, after = pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Redis read of {key} failed, using the local snapshot: {e}")
+            before, after = [], []
+        local = _local_index(key, version) if not before and not after else None
+        if local is not None:
+            before, after = _index_neighbours(local, epoch)
+        return before, after
+
+
+class SharedMemorySnapshotStore:
+    """
+    Snapshot generations in memory-mapped files on one node (by default in /dev/shm). The
+    publisher writes each key's generation once, as an immutable file in the snapshot file
+    format, and swaps a manifest of current versions with an atomic rename. Every worker
+    maps the same pages read-only, so no worker holds its own copy of the bodies and
+    reads cost no network round trip.
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, directory=SHARED_SNAPSHOT_DIR):
+        self.directory = directory
+        self._manifest = (None, {'generation': 0, 'keys': {}})
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _file_name(self, key, version):
+        return f"{versioned(key, version)}.snap"
+
+    @contextmanager
+    def _publishing(self):
+        """Serializes publishers in all processes on an exclusive lock file."""
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path('.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_manifest(self):
+        """Returns the current manifest, re-read only when the file was replaced."""
+        try:
+            stat = os.stat(self._path(self.MANIFEST))
+        except OSError:
+            return {'generation': 0, 'keys': {}}
+        identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if self._manifest[0] != identity:
+                with open(self._path(self.MANIFEST)) as f:
+                    self._manifest = (identity, json.load(f))
+                # Generations no longer current are reopened on demand while their files last
+                current = {(key, entry['version']) for key, entry in self._manifest[1]['keys'].items()}
+                self._snapshots = {name: snapshot for name, snapshot in self._snapshots.items() if name in current}
+            return self._manifest[1]
+
+    def _write_manifest(self, manifest):
+        temporary = self._path(f"{self.MANIFEST}.{os.getpid()}.tmp")
+        with open(temporary, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(temporary, self._path(self.MANIFEST))
+
+    def _snapshot(self, key, version):
+        """Returns the mapped file of key's generation version, or None if it is gone."""
+        with self._lock:
+            snapshot = self._snapshots.get((key, str(version)))
+        if snapshot is not None:
+            return snapshot
+        try:
+            snapshot = LocalSnapshot(self._path(self._file_name(key, version)))
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            self._snapshots[(key, str(version))] = snapshot
+        return snapshot
+
+    def next_generation(self):
+        with self._publishing():
+            manifest = dict(self._read_manifest())
+            if not manifest['generation']:
+                # A new directory (first run, or /dev/shm was cleared by a reboot)
+                manifest['generation'] = _generation_floor()
+            manifest['generation'] += 1
+            self._write_manifest(manifest)
+        return manifest['generation']
+
+    def swap(self, generation, rendered, freshness, published_at, inputs=None):
+        """
+        Writes one file per key of rendered {key: (values, index members, rows)}, then points
+        the manifest at all of them in one rename. The manifest records when each replaced
+        generation was superseded; its file is deleted SUPERSEDED_TTL seconds after that.
+        Returns False, leaving the manifest as it is, if any of inputs {key: version} is no
+        longer current (None: still unpublished) or a key already points at a newer generation.
+        """
+        with span('shared memory swap generation', keys=list(rendered), generation=generation):
+            os.makedirs(self.directory, exist_ok=True)
+            for key, (values, members, _) in rendered.items():
+                write_snapshot_file(self._path(self._file_name(key, generation)),
+                                    {'version': str(generation), 'updatedAt': published_at, 'freshness': freshness[key]},
+                                    _file_values(key, generation, values, members))
+            with self._publishing():
+                manifest = self._read_manifest()
+                keys = dict(manifest['keys'])
+                newer = any(key in keys and int(keys[key]['version']) > generation for key in rendered)
+                changed = any(keys.get(key, {}).get('version') != (str(version) if version is not None else None)
+                              for key, version in (inputs or {}).items())
+                if newer or changed:
+                    for key in rendered:
+                        os.remove(self._path(self._file_name(key, generation)))
+                    return False
+                now = time.time()
+                # {file name: when it stopped being current}
+                superseded = dict(manifest.get('superseded', {}))
+                superseded.update({self._file_name(key, keys[key]['version']): now for key in rendered if key in keys})
+                keys.update({key: {'version': str(generation), 'updatedAt': published_at, 'freshness': freshness[key]}
+                             for key in rendered})
+
+                current = {self._file_name(key, entry['version']) for key, entry in keys.items()}
+                files = {name for name in os.listdir(self.directory) if name.endswith('.snap') and name not in current}
+                for name in files:
+                    # Files never in the manifest (their publisher failed before its swap) age from
+                    # their write time; files of other publishers still writing are seconds old
+                    since = superseded.get(name) or os.path.getmtime(self._path(name))
+                    if now - since > SUPERSEDED_TTL:
+                        os.remove(self._path(name))
+                        superseded.pop(name, None)
+                superseded = {name: at for name, at in superseded.items() if name in files}
+                self._write_manifest({'generation': max(manifest['generation'], generation), 'keys': keys,
+                                      'superseded': superseded})
+        return True
+
+    def versions(self, keys):
+        entries = self._read_manifest()['keys']
+        return {key: entries[key]['version'] if key in entries else None for key in keys}
+
+    def states(self, keys):
+        entries = self._read_manifest()['keys']
+        states = {}
+        for key in keys:
+            entry = entries.get(key)
+            if entry is None:
+                states[key] = SnapshotState(None, None, None, None)
+                continue
+            states[key] = SnapshotState(entry['version'], entry['updatedAt'], entry['freshness'].get('fetchedAt'),
+                                        entry['freshness'].get('expiresAt'))
+        return states
+
+    def get(self, items, binary=False):
+        values = []
+        for key, version, name in items:
+            snapshot = self._snapshot(key, version)
+            values.append(snapshot.get(name) if snapshot is not None else None)
+        return values
+
+    def _index(self, key, version):
+        snapshot = self._snapshot(key, version)
+        return (snapshot.index(versioned(index_key(key), version)) if snapshot is not None else None) or ([], [])
+
+    def range(self, key, version, start=None, end=None, limit=None):
+        return _slice_index(self._index(key, version), start, end, limit)
+
+    def neighbours(self, key, version, epoch):
+        return _index_neighbours(self._index(key, version), epoch)
+
+
+SNAPSHOT_STORES = {'redis': RedisSnapshotStore, 'shared': SharedMemorySnapshotStore}
+if SNAPSHOT_STORE not in SNAPSHOT_STORES:
+    raise ValueError(f"SNAPSHOT_STORE must be one of {', '.join(SNAPSHOT_STORES)}, not {SNAPSHOT_STORE!r}")
+snapshot_store = SNAPSHOT_STORES[SNAPSHOT_STORE]()
+
+
+@traced('publish snapshots')
+def publish_snapshots(snapshots, freshness=None, inputs=None):
+    """
+    Publishes {key: data} as one snapshot generation. Documents, response bodies and time
+    indexes are written under the new generation's namespace and every key's version pointer
+    swaps to it at once (MULTI/EXEC in Redis, a manifest rename in shared memory), so a
+    reader resolving the pointers sees either all of the run's snapshots or none of them.
+    Forecast score series are stored in normalized columnar form, and every series gets a
+    sorted time index. The generations replaced expire after SUPERSEDED_TTL seconds.
+
+    freshness optionally gives {key: {'fetchedAt': ..., 'expiresAt': ...}} for data derived
+    from older inputs; by default a key was fetched now and expires after its KEY_LIFETIMES entry.
+    inputs optionally gives {key: version} of the data the snapshots were derived from; if
+    any of them was republished meanwhile nothing is published. Nothing is published either
+    if a run that started later already swapped in one of the keys, so a key's version never
+    goes backwards. Returns the generation, or None when the publish was abandoned.
+    """
+    generation = snapshot_store.next_generation()
+    published_at = time.time()
+    freshness = {
+        key: (freshness or {}).get(key) or {
+            'fetchedAt': published_at,
+            'expiresAt': published_at + KEY_LIFETIMES[key] if key in KEY_LIFETIMES else None
+        }
+        for key in snapshots
+    }
+    with span('render snapshots', keys=list(snapshots), generation=generation):
+        rendered = {key: _render_snapshot(key, data, generation, freshness[key]) for key, data in snapshots.items()}
+
+    if not snapshot_store.swap(generation, rendered, freshness, published_at, inputs):
+        logger.info(f"Publish of generation {generation} abandoned, newer data was published meanwhile: {', '.join(snapshots)}")
+        return None
+
+    for key, (_, _, rows) in rendered.items():
+        if key in DELTA_SERIES:
+            _record_history(key, generation, rows)
+        publish_event('version', {'key': key, 'version': generation})
+    return generation
+
+
+def publish_snapshot(key, data, freshness=None):
+    """Publishes a single snapshot as its own generation (see publish_snapshots)."""
+    return publish_snapshots({key: data}, {key: freshness} if freshness else None)
+
+
+@traced('store load_range')
+def load_range(key, version, start=None, end=None, limit=None, fields=None):
+    """
+    Reads the row positions of a series version with start <= epoch <= end (both optional),
+    at most limit of them, from its time index and rebuilds those rows from the snapshot
+    (decoded once per worker and version), projected onto fields. Returns None if the series
+    is not published at that version.
+    """
+    series = snapshot_cache.get_many([key], {key: version})[key] if version is not None else None
+    if series is None:
+        return None
+    if limit == 0:
+        return []
+    positions = snapshot_store.range(key, version, start, end, limit)
+    return rows_at(key, series, [int(position) for position in positions], fields)
+
+
+@traced('store load_neighbours')
+def load_neighbours(key, version, epoch):
+    """
+    Returns (at_or_before, after): the rows of a series version either side of epoch, found
+    in its time index, each None past an end of the series.
+    """
+    series = snapshot_cache.get_many([key], {key: version})[key] if version is not None else None
+    if series is None:
+        return None, None
+    return tuple(rows_at(key, series, [int(members[0])])[0] if members else None
+                 for members in snapshot_store.neighbours(key, version, epoch))
+
+
+@traced('store load_msgpack_body')
+def load_msgpack_body(key, version, view=None):
+    """Returns the pre-encoded MessagePack body for key and view at version, or None."""
+    if not msgpack or version is None:
+        return None
+    return snapshot_store.get([(key, version, body_key(key, view, 'msgpack', version))], binary=True)[0]
+
+
+@traced('store get_versions')
+def get_versions(keys):
+    """
+    Returns {key: SnapshotState} with the version, write time and freshness of keys in one
+    lookup. With the Redis store, keys Redis does not have (or all keys, while it is
+    unreachable) are taken from the local snapshot files if there are any.
+    """
+    return snapshot_store.states(list(keys))
+
+
+@traced('store has_bodies')
+def has_bodies(states):
+    """True if every key of {key: SnapshotState} is published and has a response body at its version."""
+    if any(state.version is None for state in states.values()):
+        return False
+    bodies = snapshot_store.get([(key, state.version, body_key(key, None, 'gzip', state.version))
+                                 for key, state in states.items()], binary=True)
+    return all(body is not None for body in bodies)
+
+
+def needs_refresh(state, now=None):
+    """True if a key is unpublished, past its expiry or only available from the local snapshot file."""
+    if state.version is None or state.local:
+        return True
+    return state.expires_at is not None and (now or time.time()) >= state.expires_at
+
+
+@traced('store load_body')
+def load_body(key, version, view=None, accepted_encodings=('identity',)):
+    """
+    Returns (body, encoding) for the most preferred stored encoding the client accepts,
+    or (None, None) if nothing has been published for this key and view at version.
+    """
+    if version is None:
+        return None, None
+    encodings = [encoding for encoding in BODY_ENCODINGS if encoding in accepted_encodings]
+    if 'gzip' not in encodings:
+        encodings.append('gzip')
+    bodies = snapshot_store.get([(key, version, body_key(key, view, encoding, version)) for encoding in encodings],
+                                binary=True)
+    for encoding, body in zip(encodings, bodies):
+        if body is None:
+            continue
+        if encoding not in accepted_encodings:
+            return gzip.decompress(body), 'identity'
+        return body, encoding
+    return None, None
+
+
+class SnapshotCache:
+    """
+    Per-worker cache of decoded snapshots.
+
+    Each entry is tagged with the snapshot generation it was decoded at. A read costs one
+    version lookup (an HMGET on the small versions hash, or a manifest check in shared
+    memory); payloads are only fetched and decoded again when the publishing job has
+    swapped their version pointer to a new generation.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _record(self, key, outcome):
+        with self._lock:
+            key_stats = self._stats.setdefault(key, {'hits': 0, 'misses': 0})
+            key_stats[outcome] += 1
+
+    def get(self, key):
+        return self.get_many([key])[key]
+
+    def get_many(self, keys, versions=None):
+        """
+        Returns {key: decoded data or None} at the given {key: version}, or by default at the
+        current versions, which costs one lookup. Only if some entries are stale, one read
+        then fetches all of the stale payloads from their generations.
+        """
+        if versions is None:
+            with span('store lookup versions', keys=keys):
+                versions = snapshot_store.versions(keys)
+        results = {}
+        stale = []
+        for key in keys:
+            entry = self._entries.get(key)
+            if versions[key] is not None and entry is not None and entry[0] == versions[key]:
+                self._record(key, 'hits')
+                results[key] = entry[1]
+            else:
+                self._record(key, 'misses')
+                if versions[key] is None:
+                    results[key] = None
+                else:
+                    stale.append(key)
+
+        if stale:
+            with span('store read snapshots', keys=stale):
+                payloads = snapshot_store.get([(key, versions[key], versioned(key, versions[key])) for key in stale])
+            for key, data_str in zip(stale, payloads):
+                if not data_str:
+                    results[key] = None
+                    continue
+                data = json.loads(data_str)
+                self._entries[key] = (versions[key], data)
+                results[key] = data
+        return results
+
+    def stats(self):
+        """Returns hit/miss counters and hit ratios, overall and per key."""
+        with self._lock:
+            per_key = {key: dict(counts) for key, counts in self._stats.items()}
+        hits = sum(counts['hits'] for counts in per_key.values())
+        misses = sum(counts['misses'] for counts in per_key.values())
+        for counts in per_key.values():
+            total = counts['hits'] + counts['misses']
+            counts['hitRatio'] = round(counts['hits'] / total, 4) if total else None
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hitRatio': round(hits / total, 4) if total else None,
+            'cachedKeys': len(self._entries),
+            'keys': per_key
+        }
+
+
+snapshot_cache = SnapshotCache()
@@ -1,13 +1,21 @@
 # app/tasks.py
 import logging
-import json
 from datetime import datetime, timedelta
 from app.fetchers import fetch_weather_data, fetch_water_data_with_history, fetch_noaa_stageflow_forecast, fetch_extended_weather_forecast
 from app.rowcast import compute_rowcast, merge_params
-# Import the redis_client instance from the extensions file
-from app.extensions import redis_client
+from app.aggregates import build_daily_summary
+from app.timeline import build_score_timeline
+from app.events import publish_event
+from app.metrics import instrumented_job
+from app.tracing import traced
+from app.series import select_rows, stored_as_columns
+from app.snapshots import KEY_LIFETIMES, get_versions, publish_snapshot, publish_snapshots, snapshot_cache
 
 from datetime import datetime
+import pytz
+
+# EST timezone
+EST = pytz.timezone('America/New_York')
 
 logger = logging.getLogger(__name__)
 
@@ -40,16 +48,25 @@ def extrapolate(historical_list, current_value, target_dt):
         logging.exception("Error extrapolating data")
         raise
 
+@instrumented_job
 def update_weather_data_job():
     """Fetches new weather data and stores it in Redis."""
     print("SCHEDULER JOB: Running weather data update...")
     try:
         data = fetch_weather_data()
-        redis_client.set('weather_data', json.dumps(data))
+        previous = snapshot_cache.get('weather_data')
+        publish_snapshot('weather_data', data)
+        update_composite_views(('weather_data',))
+        # Push safety alerts to stream subscribers as soon as they appear, change or clear
+        previous_alerts = previous.get('alerts', []) if previous else []
+        if data.get('alerts', []) != previous_alerts:
+            publish_event('alerts', {'alerts': data.get('alerts', []), 'previousCount': len(previous_alerts)})
         print("SCHEDULER JOB: Weather data updated successfully.")
     except Exception as e:
         print(f"SCHEDULER JOB: Failed to update weather data. Error: {e}")
+        return False
 
+@instrumented_job
 def update_water_data_job():
     """Fetches new water data with historical data and stores it in Redis."""
     print("SCHEDULER JOB: Running water data update...")
@@ -61,27 +78,229 @@ def update_water_data_job():
             'historical': data['historical']
         }
         
-        redis_client.set('water_data', json.dumps(water_data))
+        publish_snapshot('water_data', water_data)
+        update_composite_views(('water_data',))
         print("SCHEDULER JOB: Water data updated successfully.")
     except Exception as e:
         print(f"SCHEDULER JOB: Failed to update water data. Error: {e}")
+        return False
+
+@traced('score forecast_scores')
+def score_forecast_hours(weather_data, water_data, noaa_forecast_lookup):
+    """Scores every hour of the weather forecast, using NOAA predictions for the water where they match."""
+    forecast_scores = []
+
+    # Calculate scores for each forecast hour
+    for forecast_hour in weather_data.get('forecast', []):
+        timestamp = forecast_hour.get('timestamp')
+        target_dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        current_water = water_data.get('current', {})
+        hist = water_data.get('historical', {})
+
+        # Try to get NOAA stageflow data for this timestamp
+        # Handle timezone differences in timestamp matching
+        noaa_data = None
+        try:
+            # Parse weather timestamp (no timezone)
+            weather_dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            if weather_dt.tzinfo:
+                weather_dt = weather_dt.replace(tzinfo=None)
+
+            # Try exact match first
+            lookup_key = weather_dt.isoformat()
+            noaa_data = noaa_forecast_lookup.get(lookup_key)
+
+            # If no exact match, find closest timestamp within 1 hour
+            if not noaa_data:
+                closest_diff = float('inf')
+                for noaa_key, noaa_point in noaa_forecast_lookup.items():
+                    try:
+                        noaa_dt = datetime.fromisoformat(noaa_key)
+                        diff = abs((weather_dt - noaa_dt).total_seconds())
+                        if diff < closest_diff and diff <= 3600:  # Within 1 hour
+                            closest_diff = diff
+                            noaa_data = noaa_point
+                    except Exception:
+                        continue
+        except Exception:
+            # Fallback to direct lookup
+            noaa_data = noaa_forecast_lookup.get(timestamp)
+
+        # Use NOAA data if available, otherwise fall back to extrapolation
+        if noaa_data:
+            discharge_pred = noaa_data.get('discharge')
+            gauge_pred = noaa_data.get('gaugeHeight')
+            # Water temp not available from NOAA, extrapolate
+            temp_pred = extrapolate(hist.get('waterTemp', []), current_water.get('waterTemp'), target_dt)
+            noaa_used = True
+        else:
+            # Extrapolate each water metric
+            discharge_pred = extrapolate(hist.get('discharge', []), current_water.get('discharge'), target_dt)
+            gauge_pred = extrapolate(hist.get('gaugeHeight', []), current_water.get('gaugeHeight'), target_dt)
+            temp_pred = extrapolate(hist.get('waterTemp', []), current_water.get('waterTemp'), target_dt)
+            noaa_used = False
+
+        forecast_params = {
+            'windSpeed': forecast_hour.get('windSpeed'),
+            'windGust': forecast_hour.get('windGust'),
+            'apparentTemp': forecast_hour.get('apparentTemp'),
+            'uvIndex': forecast_hour.get('uvIndex'),
+            'precipitation': forecast_hour.get('precipitation'),
+            # Use NOAA data or dynamic projections for water
+            'discharge': discharge_pred,
+            'waterTemp': temp_pred,
+            'gaugeHeight': gauge_pred,
+            # Add safety parameters
+            'weatherAlerts': forecast_hour.get('weatherAlerts', []),
+            'visibility': forecast_hour.get('visibility'),
+            'lightningPotential': forecast_hour.get('lightningPotential'),
+            'precipitationProbability': forecast_hour.get('precipitationProbability')
+        }
+
+        score = compute_rowcast(forecast_params)
+
+        forecast_scores.append({
+            'timestamp': forecast_hour.get('timestamp'),
+            'score': score,
+            'conditions': forecast_params,
+            'noaaDataUsed': noaa_used
+        })
+    return forecast_scores
+
+@traced('score short_term_forecast')
+def score_short_term_intervals(short_term_data):
+    """Scores every 15-minute interval of the short-term forecast."""
+    short_term_scores = []
+
+    # Calculate scores for each 15-minute interval
+    for interval in short_term_data.get('forecast', []):
+        forecast_params = {
+            'windSpeed': interval.get('windSpeed'),
+            'windGust': interval.get('windGust'),
+            'apparentTemp': interval.get('apparentTemp'),
+            'uvIndex': interval.get('uvIndex', 0),  # Default to 0 for short-term
+            'precipitation': interval.get('precipitation'),
+            'discharge': interval.get('discharge'),
+            'waterTemp': interval.get('waterTemp'),
+            'gaugeHeight': interval.get('gaugeHeight'),
+            'weatherAlerts': interval.get('weatherAlerts', []),
+            'visibility': interval.get('visibility'),
+            'lightningPotential': interval.get('lightningPotential', 0),
+            'precipitationProbability': interval.get('precipitationProbability')
+        }
+
+        score = compute_rowcast(forecast_params)
+
+        short_term_scores.append({
+            'timestamp': interval.get('timestamp'),
+            'score': score,
+            'conditions': forecast_params
+        })
+    return short_term_scores
+
+@traced('score extended_forecast_scores')
+def score_extended_forecast_hours(extended_weather, water_data, noaa_forecast_lookup):
+    """Scores every hour of the extended forecast, using NOAA predictions for the water where they match."""
+    extended_forecast_scores = []
+
+    # Calculate scores for each extended forecast hour
+    for forecast_hour in extended_weather.get('forecast', []):
+        timestamp = forecast_hour.get('timestamp')
+
+        # Try to get NOAA stageflow data for this timestamp
+        # Handle timezone differences in timestamp matching
+        noaa_data = None
+        try:
+            # Parse weather timestamp (no timezone)
+            weather_dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            if weather_dt.tzinfo:
+                weather_dt = weather_dt.replace(tzinfo=None)
+
+            # Try exact match first
+            lookup_key = weather_dt.isoformat()
+            noaa_data = noaa_forecast_lookup.get(lookup_key)
+
+            # If no exact match, find closest timestamp within 1 hour
+            if not noaa_data:
+                closest_diff = float('inf')
+                for noaa_key, noaa_point in noaa_forecast_lookup.items():
+                    try:
+                        noaa_dt = datetime.fromisoformat(noaa_key)
+                        diff = abs((weather_dt - noaa_dt).total_seconds())
+                        if diff < closest_diff and diff <= 3600:  # Within 1 hour
+                            closest_diff = diff
+                            noaa_data = noaa_point
+                    except Exception:
+                        continue
+        except Exception:
+            # Fallback to direct lookup
+            noaa_data = noaa_forecast_lookup.get(timestamp)
+
+        # Use NOAA data if available, otherwise fall back to extrapolation
+        if noaa_data:
+            discharge = noaa_data.get('discharge')
+            gauge_height = noaa_data.get('gaugeHeight')
+            water_temp = None  # NOAA doesn't provide water temp, we'll need to extrapolate
+
+            # For water temp, extrapolate from current water data if available
+            if water_data:
+                target_dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                current_water = water_data.get('current', {})
+                hist = water_data.get('historical', {})
+                water_temp = extrapolate(hist.get('waterTemp', []), current_water.get('waterTemp'), target_dt)
+        else:
+            # Fall back to extrapolation if no NOAA data
+            if water_data:
+                target_dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                current_water = water_data.get('current', {})
+                hist = water_data.get('historical', {})
+                discharge = extrapolate(hist.get('discharge', []), current_water.get('discharge'), target_dt)
+                gauge_height = extrapolate(hist.get('gaugeHeight', []), current_water.get('gaugeHeight'), target_dt)
+                water_temp = extrapolate(hist.get('waterTemp', []), current_water.get('waterTemp'), target_dt)
+            else:
+                discharge = None
+                gauge_height = None
+                water_temp = None
+
+        forecast_params = {
+            'windSpeed': forecast_hour.get('windSpeed'),
+            'windGust': forecast_hour.get('windGust'),
+            'apparentTemp': forecast_hour.get('apparentTemp'),
+            'uvIndex': forecast_hour.get('uvIndex'),
+            'precipitation': forecast_hour.get('precipitation'),
+            'discharge': discharge,
+            'waterTemp': water_temp,
+            'gaugeHeight': gauge_height,
+            'weatherAlerts': forecast_hour.get('weatherAlerts', []),
+            'visibility': forecast_hour.get('visibility'),
+            'lightningPotential': forecast_hour.get('lightningPotential'),
+            'precipitationProbability': forecast_hour.get('precipitationProbability')
+        }
+
+        score = compute_rowcast(forecast_params)
 
+        extended_forecast_scores.append({
+            'timestamp': forecast_hour.get('timestamp'),
+            'score': score,
+            'conditions': forecast_params,
+            'noaaDataUsed': noaa_data is not None
+        })
+    return extended_forecast_scores
+
+@instrumented_job
 def update_forecast_scores_job():
     """Calculates rowcast scores for weather forecast periods, using NOAA data when available."""
     print("SCHEDULER JOB: Running forecast scores update...")
     try:
         # Get weather and water data
-        weather_data_str = redis_client.get('weather_data')
-        water_data_str = redis_client.get('water_data')
-        noaa_stageflow_str = redis_client.get('noaa_stageflow_data')
+        inputs = snapshot_cache.get_many(['weather_data', 'water_data', 'noaa_stageflow_data'])
+        weather_data = inputs['weather_data']
+        water_data = inputs['water_data']
+        noaa_stageflow = inputs['noaa_stageflow_data']
         
-        if not weather_data_str or not water_data_str:
+        if not weather_data or not water_data:
             print("SCHEDULER JOB: Missing weather or water data for forecast calculation")
-            return
-            
-        weather_data = json.loads(weather_data_str)
-        water_data = json.loads(water_data_str)
-        noaa_stageflow = json.loads(noaa_stageflow_str) if noaa_stageflow_str else None
+            return False
         
         # Create a lookup dictionary for NOAA stageflow forecast data by timestamp
         # Handle timezone differences and find closest matches
@@ -101,83 +320,7 @@ def update_forecast_scores_job():
                         # Fallback to direct timestamp matching
                         noaa_forecast_lookup[timestamp] = noaa_point
         
-        forecast_scores = []
-        
-        # Calculate scores for each forecast hour
-        for forecast_hour in weather_data.get('forecast', []):
-            timestamp = forecast_hour.get('timestamp')
-            target_dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            current_water = water_data.get('current', {})
-            hist = water_data.get('historical', {})
-            
-            # Try to get NOAA stageflow data for this timestamp
-            # Handle timezone differences in timestamp matching
-            noaa_data = None
-            try:
-                # Parse weather timestamp (no timezone)
-                weather_dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                if weather_dt.tzinfo:
-                    weather_dt = weather_dt.replace(tzinfo=None)
-                
-                # Try exact match first
-                lookup_key = weather_dt.isoformat()
-                noaa_data = noaa_forecast_lookup.get(lookup_key)
-                
-                # If no exact match, find closest timestamp within 1 hour
-                if not noaa_data:
-                    closest_diff = float('inf')
-                    for noaa_key, noaa_point in noaa_forecast_lookup.items():
-                        try:
-                            noaa_dt = datetime.fromisoformat(noaa_key)
-                            diff = abs((weather_dt - noaa_dt).total_seconds())
-                            if diff < closest_diff and diff <= 3600:  # Within 1 hour
-                                closest_diff = diff
-                                noaa_data = noaa_point
-                        except Exception:
-                            continue
-            except Exception:
-                # Fallback to direct lookup
-                noaa_data = noaa_forecast_lookup.get(timestamp)
-            
-            # Use NOAA data if available, otherwise fall back to extrapolation
-            if noaa_data:
-                discharge_pred = noaa_data.get('discharge')
-                gauge_pred = noaa_data.get('gaugeHeight')
-                # Water temp not available from NOAA, extrapolate
-                temp_pred = extrapolate(hist.get('waterTemp', []), current_water.get('waterTemp'), target_dt)
-                noaa_used = True
-            else:
-                # Extrapolate each water metric
-                discharge_pred = extrapolate(hist.get('discharge', []), current_water.get('discharge'), target_dt)
-                gauge_pred = extrapolate(hist.get('gaugeHeight', []), current_water.get('gaugeHeight'), target_dt)
-                temp_pred = extrapolate(hist.get('waterTemp', []), current_water.get('waterTemp'), target_dt)
-                noaa_used = False
-            
-            forecast_params = {
-                'windSpeed': forecast_hour.get('windSpeed'),
-                'windGust': forecast_hour.get('windGust'),
-                'apparentTemp': forecast_hour.get('apparentTemp'),
-                'uvIndex': forecast_hour.get('uvIndex'),
-                'precipitation': forecast_hour.get('precipitation'),
-                # Use NOAA data or dynamic projections for water
-                'discharge': discharge_pred,
-                'waterTemp': temp_pred,
-                'gaugeHeight': gauge_pred,
-                # Add safety parameters
-                'weatherAlerts': forecast_hour.get('weatherAlerts', []),
-                'visibility': forecast_hour.get('visibility'),
-                'lightningPotential': forecast_hour.get('lightningPotential'),
-                'precipitationProbability': forecast_hour.get('precipitationProbability')
-            }
-            
-            score = compute_rowcast(forecast_params)
-            
-            forecast_scores.append({
-                'timestamp': forecast_hour.get('timestamp'),
-                'score': score,
-                'conditions': forecast_params,
-                'noaaDataUsed': noaa_used
-            })
+        forecast_scores = score_forecast_hours(weather_data, water_data, noaa_forecast_lookup)
         
         # Create simplified scores array with just timestamps and scores
         simple_scores = [
@@ -189,15 +332,17 @@ def update_forecast_scores_job():
             for score in forecast_scores
         ]
         
-        redis_client.set('forecast_scores', json.dumps(forecast_scores))
-        redis_client.set('forecast_scores_simple', json.dumps(simple_scores))
+        publish_snapshots({'forecast_scores': forecast_scores, 'forecast_scores_simple': simple_scores})
+        update_composite_views(('forecast_scores',))
         
         noaa_count = sum(1 for score in forecast_scores if score.get('noaaDataUsed'))
         print(f"SCHEDULER JOB: Forecast scores updated successfully with {len(forecast_scores)} hours ({noaa_count} using NOAA data).")
         
     except Exception as e:
         print(f"SCHEDULER JOB: Failed to update forecast scores. Error: {e}")
+        return False
 
+@instrumented_job
 def update_short_term_forecast_job():
     """Calculates rowcast scores for 15-minute intervals over the next 3 hours."""
     print("SCHEDULER JOB: Running short-term forecast scores update...")
@@ -207,32 +352,7 @@ def update_short_term_forecast_job():
         # Get 15-minute forecast data
         short_term_data = fetch_short_term_forecast()
         
-        short_term_scores = []
-        
-        # Calculate scores for each 15-minute interval
-        for interval in short_term_data.get('forecast', []):
-            forecast_params = {
-                'windSpeed': interval.get('windSpeed'),
-                'windGust': interval.get('windGust'),
-                'apparentTemp': interval.get('apparentTemp'),
-                'uvIndex': interval.get('uvIndex', 0),  # Default to 0 for short-term
-                'precipitation': interval.get('precipitation'),
-                'discharge': interval.get('discharge'),
-                'waterTemp': interval.get('waterTemp'),
-                'gaugeHeight': interval.get('gaugeHeight'),
-                'weatherAlerts': interval.get('weatherAlerts', []),
-                'visibility': interval.get('visibility'),
-                'lightningPotential': interval.get('lightningPotential', 0),
-                'precipitationProbability': interval.get('precipitationProbability')
-            }
-            
-            score = compute_rowcast(forecast_params)
-            
-            short_term_scores.append({
-                'timestamp': interval.get('timestamp'),
-                'score': score,
-                'conditions': forecast_params
-            })
+        short_term_scores = score_short_term_intervals(short_term_data)
         
         # Create simplified scores for short-term
         simple_short_term = [
@@ -243,47 +363,53 @@ def update_short_term_forecast_job():
             for score in short_term_scores
         ]
         
-        redis_client.set('short_term_forecast', json.dumps(short_term_scores))
-        redis_client.set('short_term_forecast_simple', json.dumps(simple_short_term))
+        publish_snapshots({'short_term_forecast': short_term_scores, 'short_term_forecast_simple': simple_short_term})
+        update_composite_views(('short_term_forecast',))
         print(f"SCHEDULER JOB: Short-term forecast scores updated successfully with {len(short_term_scores)} intervals.")
         
     except Exception as e:
         print(f"SCHEDULER JOB: Failed to update short-term forecast scores. Error: {e}")
+        return False
 
+@instrumented_job
 def update_noaa_stageflow_job():
     """Fetches NOAA NWPS stageflow forecast data and stores it in Redis."""
     print("SCHEDULER JOB: Running NOAA stageflow data update...")
     try:
         data = fetch_noaa_stageflow_forecast()
-        redis_client.set('noaa_stageflow_data', json.dumps(data))
+        publish_snapshot('noaa_stageflow_data', data)
+        update_composite_views(('noaa_stageflow_data',))
         print(f"SCHEDULER JOB: NOAA stageflow data updated successfully with {len(data.get('forecast', []))} forecast hours.")
     except Exception as e:
         print(f"SCHEDULER JOB: Failed to update NOAA stageflow data. Error: {e}")
+        return False
 
+@instrumented_job
 def update_extended_weather_data_job():
     """Fetches extended weather forecast data (7 days) and stores it in Redis."""
     print("SCHEDULER JOB: Running extended weather data update...")
     try:
         data = fetch_extended_weather_forecast()
-        redis_client.set('extended_weather_data', json.dumps(data))
+        publish_snapshot('extended_weather_data', data)
+        update_composite_views(('extended_weather_data',))
         print(f"SCHEDULER JOB: Extended weather data updated successfully with {len(data.get('forecast', []))} forecast hours.")
     except Exception as e:
         print(f"SCHEDULER JOB: Failed to update extended weather data. Error: {e}")
+        return False
 
+@instrumented_job
 def update_extended_forecast_scores_job():
     """Calculates rowcast scores for extended forecast periods using NOAA stageflow and extended weather data."""
     print("SCHEDULER JOB: Running extended forecast scores update...")
     try:
         # Get extended weather and NOAA stageflow data
-        extended_weather_str = redis_client.get('extended_weather_data')
-        noaa_stageflow_str = redis_client.get('noaa_stageflow_data')
+        inputs = snapshot_cache.get_many(['extended_weather_data', 'noaa_stageflow_data', 'water_data'])
+        extended_weather = inputs['extended_weather_data']
+        noaa_stageflow = inputs['noaa_stageflow_data']
         
-        if not extended_weather_str:
+        if not extended_weather:
             print("SCHEDULER JOB: Missing extended weather data for extended forecast calculation")
-            return
-            
-        extended_weather = json.loads(extended_weather_str)
-        noaa_stageflow = json.loads(noaa_stageflow_str) if noaa_stageflow_str else None
+            return False
         
         # Create a lookup dictionary for NOAA stageflow forecast data by timestamp
         # Handle timezone differences and find closest matches
@@ -303,94 +429,7 @@ def update_extended_forecast_scores_job():
                         # Fallback to direct timestamp matching
                         noaa_forecast_lookup[timestamp] = noaa_point
         
-        extended_forecast_scores = []
-        
-        # Calculate scores for each extended forecast hour
-        for forecast_hour in extended_weather.get('forecast', []):
-            timestamp = forecast_hour.get('timestamp')
-            
-            # Try to get NOAA stageflow data for this timestamp
-            # Handle timezone differences in timestamp matching
-            noaa_data = None
-            try:
-                # Parse weather timestamp (no timezone)
-                weather_dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                if weather_dt.tzinfo:
-                    weather_dt = weather_dt.replace(tzinfo=None)
-                
-                # Try exact match first
-                lookup_key = weather_dt.isoformat()
-                noaa_data = noaa_forecast_lookup.get(lookup_key)
-                
-                # If no exact match, find closest timestamp within 1 hour
-                if not noaa_data:
-                    closest_diff = float('inf')
-                    for noaa_key, noaa_point in noaa_forecast_lookup.items():
-                        try:
-                            noaa_dt = datetime.fromisoformat(noaa_key)
-                            diff = abs((weather_dt - noaa_dt).total_seconds())
-                            if diff < closest_diff and diff <= 3600:  # Within 1 hour
-                                closest_diff = diff
-                                noaa_data = noaa_point
-                        except Exception:
-                            continue
-            except Exception:
-                # Fallback to direct lookup
-                noaa_data = noaa_forecast_lookup.get(timestamp)
-            
-            # Use NOAA data if available, otherwise fall back to extrapolation
-            if noaa_data:
-                discharge = noaa_data.get('discharge')
-                gauge_height = noaa_data.get('gaugeHeight')
-                water_temp = None  # NOAA doesn't provide water temp, we'll need to extrapolate
-                
-                # For water temp, extrapolate from current water data if available
-                water_data_str = redis_client.get('water_data')
-                if water_data_str:
-                    water_data = json.loads(water_data_str)
-                    target_dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    current_water = water_data.get('current', {})
-                    hist = water_data.get('historical', {})
-                    water_temp = extrapolate(hist.get('waterTemp', []), current_water.get('waterTemp'), target_dt)
-            else:
-                # Fall back to extrapolation if no NOAA data
-                water_data_str = redis_client.get('water_data')
-                if water_data_str:
-                    water_data = json.loads(water_data_str)
-                    target_dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                    current_water = water_data.get('current', {})
-                    hist = water_data.get('historical', {})
-                    discharge = extrapolate(hist.get('discharge', []), current_water.get('discharge'), target_dt)
-                    gauge_height = extrapolate(hist.get('gaugeHeight', []), current_water.get('gaugeHeight'), target_dt)
-                    water_temp = extrapolate(hist.get('waterTemp', []), current_water.get('waterTemp'), target_dt)
-                else:
-                    discharge = None
-                    gauge_height = None
-                    water_temp = None
-            
-            forecast_params = {
-                'windSpeed': forecast_hour.get('windSpeed'),
-                'windGust': forecast_hour.get('windGust'),
-                'apparentTemp': forecast_hour.get('apparentTemp'),
-                'uvIndex': forecast_hour.get('uvIndex'),
-                'precipitation': forecast_hour.get('precipitation'),
-                'discharge': discharge,
-                'waterTemp': water_temp,
-                'gaugeHeight': gauge_height,
-                'weatherAlerts': forecast_hour.get('weatherAlerts', []),
-                'visibility': forecast_hour.get('visibility'),
-                'lightningPotential': forecast_hour.get('lightningPotential'),
-                'precipitationProbability': forecast_hour.get('precipitationProbability')
-            }
-            
-            score = compute_rowcast(forecast_params)
-            
-            extended_forecast_scores.append({
-                'timestamp': forecast_hour.get('timestamp'),
-                'score': score,
-                'conditions': forecast_params,
-                'noaaDataUsed': noaa_data is not None
-            })
+        extended_forecast_scores = score_extended_forecast_hours(extended_weather, inputs['water_data'], noaa_forecast_lookup)
         
         # Create simplified scores array with just timestamps and scores
         simple_extended_scores = [
@@ -402,11 +441,225 @@ def update_extended_forecast_scores_job():
             for score in extended_forecast_scores
         ]
         
-        redis_client.set('extended_forecast_scores', json.dumps(extended_forecast_scores))
-        redis_client.set('extended_forecast_scores_simple', json.dumps(simple_extended_scores))
+        publish_snapshots({
+            'extended_forecast_scores': extended_forecast_scores,
+            'extended_forecast_scores_simple': simple_extended_scores,
+            # Per-day aggregates for the week view, materialized once per scoring run
+            'daily_forecast_summary': build_daily_summary(extended_forecast_scores)
+        })
+        update_composite_views(('extended_forecast_scores',))
         
         noaa_count = sum(1 for score in extended_forecast_scores if score.get('noaaDataUsed'))
         print(f"SCHEDULER JOB: Extended forecast scores updated successfully with {len(extended_forecast_scores)} hours ({noaa_count} using NOAA data).")
         
     except Exception as e:
         print(f"SCHEDULER JOB: Failed to update extended forecast scores. Error: {e}")
+        return False
+
+def build_rowcast_view(weather_data, water_data):
+    """Builds the /api/rowcast response: the current score from current weather and water data."""
+    if not weather_data or not water_data:
+        return None
+    current_weather = weather_data.get('current', {})
+    current_water = water_data.get('current', {})
+    if not current_weather or not current_water:
+        return None
+
+    params = merge_params(current_weather, current_water)
+    result = compute_rowcast(params)
+    return { "rowcastScore": result['score'], "factors": result['factors'], "params": params }
+
+def build_complete_view(weather_data, water_data, forecast_scores):
+    """Builds the /api/complete response: all current data, forecasts, and scores."""
+    # Calculate current rowcast score
+    current_rowcast = None
+    if weather_data and water_data:
+        current_weather = weather_data.get('current', {})
+        current_water = water_data.get('current', {})
+        params = merge_params(current_weather, current_water)
+        current_rowcast = compute_rowcast(params)
+    
+    return {
+        "current": {
+            "weather": weather_data.get('current') if weather_data else None,
+            "water": water_data.get('current') if water_data else None,
+            "rowcast": current_rowcast
+        },
+        "forecast": {
+            "weather": weather_data.get('forecast') if weather_data else None,
+            "water": water_data.get('predictions') if water_data else None,
+            "rowcastScores": forecast_scores
+        },
+        "lastUpdated": datetime.now().isoformat()
+    }
+
+def build_complete_extended_view(weather_data, extended_weather_data, water_data, noaa_stageflow_data,
+                                 forecast_scores, extended_forecast_scores, short_term_forecast):
+    """Builds the /api/complete/extended response: all data including extended forecasts for the dashboard."""
+    response = {
+        'weather': {
+            'current': weather_data.get('current') if weather_data else None,
+            'forecast': weather_data.get('forecast') if weather_data else [],
+            'extended': extended_weather_data.get('forecast') if extended_weather_data else [],
+            'alerts': weather_data.get('alerts') if weather_data else []
+        },
+        'water': {
+            'current': water_data.get('current') if water_data else None,
+            'historical': water_data.get('historical') if water_data else {}
+        },
+        'noaa': {
+            'current': noaa_stageflow_data.get('current') if noaa_stageflow_data else None,
+            'observed': noaa_stageflow_data.get('observed') if noaa_stageflow_data else [],
+            'forecast': noaa_stageflow_data.get('forecast') if noaa_stageflow_data else [],
+            'metadata': noaa_stageflow_data.get('metadata') if noaa_stageflow_data else {}
+        },
+        'rowcast': {
+            'current': None,
+            'forecast': forecast_scores or [],
+            'extendedForecast': extended_forecast_scores or [],
+            'shortTerm': short_term_forecast or []
+        },
+        'metadata': {
+            'lastUpdated': datetime.now(EST).isoformat(),
+            'timezone': 'America/New_York',
+            'dataAvailability': {
+                'weather': weather_data is not None,
+                'extendedWeather': extended_weather_data is not None,
+                'water': water_data is not None,
+                'noaaStageflow': noaa_stageflow_data is not None,
+                'forecast': forecast_scores is not None,
+                'extendedForecast': extended_forecast_scores is not None,
+                'shortTermForecast': short_term_forecast is not None
+            }
+        }
+    }
+    
+    # Calculate current rowcast if we have current data
+    if weather_data and weather_data.get('current'):
+        current_water = water_data.get('current') if water_data else {}
+        noaa_current = noaa_stageflow_data.get('current') if noaa_stageflow_data else {}
+        
+        # Use NOAA data if available, otherwise use current water data
+        current_params = {
+            'windSpeed': weather_data['current'].get('windSpeed'),
+            'windGust': weather_data['current'].get('windGust'),
+            'apparentTemp': weather_data['current'].get('apparentTemp'),
+            'uvIndex': weather_data['current'].get('uvIndex'),
+            'precipitation': weather_data['current'].get('precipitation'),
+            'discharge': noaa_current.get('discharge') or current_water.get('discharge'),
+            'waterTemp': current_water.get('waterTemp'),  # NOAA doesn't provide water temp
+            'gaugeHeight': noaa_current.get('gaugeHeight') or current_water.get('gaugeHeight'),
+            'weatherAlerts': weather_data['current'].get('weatherAlerts', []),
+            'visibility': weather_data['current'].get('visibility'),
+            'lightningPotential': 0,  # Not available in current weather
+            'precipitationProbability': 0  # Not available in current weather
+        }
+        
+        current_rowcast = compute_rowcast(current_params)
+        response['rowcast']['current'] = {
+            'score': current_rowcast['score'],
+            'factors': current_rowcast['factors'],
+            'conditions': current_params,
+            'timestamp': weather_data['current'].get('timestamp'),
+            'noaaDataUsed': noaa_current.get('discharge') is not None or noaa_current.get('gaugeHeight') is not None
+        }
+    else:
+        logger.warning("Could not calculate current rowcast due to missing current weather data.")
+    
+    return response
+
+# Composite views served as-is by the routes, with the builder and the Redis keys it reads.
+COMPOSITE_VIEWS = {
+    'rowcast_current': {'build': build_rowcast_view, 'inputs': ('weather_data', 'water_data')},
+    'complete_view': {'build': build_complete_view, 'inputs': ('weather_data', 'water_data', 'forecast_scores')},
+    'complete_extended_view': {'build': build_complete_extended_view, 'inputs': (
+        'weather_data', 'extended_weather_data', 'water_data', 'noaa_stageflow_data',
+        'forecast_scores', 'extended_forecast_scores', 'short_term_forecast')},
+    'score_timeline': {'build': build_score_timeline, 'inputs': (
+        'short_term_forecast', 'forecast_scores', 'extended_forecast_scores')},
+}
+
+@traced()
+def update_composite_views(changed_keys):
+    """Rebuilds and publishes every composite view that reads one of the changed keys."""
+    views = {name: view for name, view in COMPOSITE_VIEWS.items() if set(view['inputs']) & set(changed_keys)}
+    if not views:
+        return
+    try:
+        # The views are built from these versions of their inputs, and only published if they
+        # are still current then: a rebuild that read older inputs must not replace a newer one
+        states = get_versions(sorted({key for view in views.values() for key in view['inputs']}))
+        inputs = snapshot_cache.get_many(list(states), {key: state.version for key, state in states.items()})
+        # Views embed forecast scores in their row format
+        inputs = {key: select_rows(data) if data is not None and stored_as_columns(key) else data
+                  for key, data in inputs.items()}
+        documents = {name: view['build'](*(inputs[key] for key in view['inputs'])) for name, view in views.items()}
+        # Views with nothing to show yet (e.g. rowcast_current before the first water data)
+        # stay unpublished, so requests keep waiting for them and refreshing their inputs
+        documents = {name: document for name, document in documents.items() if document}
+        if not documents:
+            print(f"SCHEDULER JOB: Composite views not built yet, inputs missing: {', '.join(views)}.")
+            return
+        # A view is as fresh as its oldest input and expires with the first of them
+        freshness = {}
+        for name in documents:
+            view = views[name]
+            fetched = [states[key].fetched_at for key in view['inputs'] if states[key].fetched_at is not None]
+            expires = [states[key].expires_at for key in view['inputs'] if states[key].expires_at is not None]
+            if fetched:
+                freshness[name] = {'fetchedAt': min(fetched), 'expiresAt': min(expires) if expires else None}
+        previous = snapshot_cache.get('rowcast_current') if 'rowcast_current' in documents else None
+        # All views built from these inputs swap in together
+        # (data only in the local snapshot files is unpublished as far as the store is concerned)
+        read_versions = {key: None if state.local else state.version for key, state in states.items()}
+        if publish_snapshots(documents, freshness, inputs=read_versions) is None:
+            print(f"SCHEDULER JOB: Composite views not published, their inputs changed while building: {', '.join(documents)}.")
+            return
+        current = documents.get('rowcast_current')
+        if current and (not previous or previous['rowcastScore'] != current['rowcastScore']):
+            publish_event('score', {'rowcastScore': current['rowcastScore'], 'factors': current['factors']})
+        print(f"SCHEDULER JOB: Rebuilt composite views: {', '.join(documents)}.")
+    except Exception as e:
+        print(f"SCHEDULER JOB: Failed to rebuild composite views. Error: {e}")
+
+def refresh_core_data():
+    """Runs the weather, water and forecast score jobs in order; the scores are computed from the first two."""
+    update_weather_data_job()
+    update_water_data_job()
+    update_forecast_scores_job()
+
+# Scheduled jobs: refresh interval in minutes, the Redis keys each job publishes and the
+# upstream hosts its data comes from (directly or through the keys it scores). create_app() schedules from this table, the routes
+# derive Cache-Control and staleness from it and app.refresh finds the job to rerun for an expired key.
+JOB_SCHEDULE = [
+    # Reduced frequency for API rate limiting
+    {'id': 'Update Weather Data', 'func': update_weather_data_job, 'minutes': 10, 'keys': ('weather_data',),
+     'upstreams': ('api.open-meteo.com', 'api.weather.gov')},
+    # Reduced frequency for API rate limiting
+    {'id': 'Update Water Data', 'func': update_water_data_job, 'minutes': 15, 'keys': ('water_data',),
+     'upstreams': ('waterservices.usgs.gov',)},
+    # Calculate forecast scores after data updates
+    {'id': 'Update Forecast Scores', 'func': update_forecast_scores_job, 'minutes': 10, 'keys': ('forecast_scores', 'forecast_scores_simple'),
+     'upstreams': ('api.open-meteo.com', 'api.weather.gov', 'waterservices.usgs.gov', 'api.water.noaa.gov')},
+    # Update 15-minute forecast more frequently
+    {'id': 'Update Short-term Forecast', 'func': update_short_term_forecast_job, 'minutes': 5, 'keys': ('short_term_forecast', 'short_term_forecast_simple'),
+     'upstreams': ('api.open-meteo.com', 'waterservices.usgs.gov')},
+    # NOAA data updates less frequently
+    {'id': 'Update NOAA Stageflow Data', 'func': update_noaa_stageflow_job, 'minutes': 30, 'keys': ('noaa_stageflow_data',),
+     'upstreams': ('api.water.noaa.gov',)},
+    # Extended weather data updates hourly
+    {'id': 'Update Extended Weather Data', 'func': update_extended_weather_data_job, 'minutes': 60, 'keys': ('extended_weather_data',),
+     'upstreams': ('api.open-meteo.com', 'api.weather.gov')},
+    # Calculate extended forecast scores after NOAA updates
+    {'id': 'Update Extended Forecast Scores', 'func': update_extended_forecast_scores_job, 'minutes': 30, 'keys': ('extended_forecast_scores', 'extended_forecast_scores_simple', 'daily_forecast_summary'),
+     'upstreams': ('api.open-meteo.com', 'api.weather.gov', 'api.water.noaa.gov', 'waterservices.usgs.gov')},
+]
+
+# The job that produces each Redis key
+KEY_PRODUCERS = {key: job for job in JOB_SCHEDULE for key in job['keys']}
+
+# A key expires, is served flagged stale and gets refreshed in the background once it has
+# missed this many runs of its producing job
+STALE_AFTER_INTERVALS = 2
+KEY_LIFETIMES.update({key: STALE_AFTER_INTERVALS * job['minutes'] * 60 for key, job in KEY_PRODUCERS.items()})
+KEY_LIFETIMES.update({name: min(KEY_LIFETIMES[key] for key in view['inputs']) for name, view in COMPOSITE_VIEWS.items()})
@@ -0,0 +1,139 @@
+# app/timeline.py
+
+import time
+from datetime import datetime
+from app.utils import EST, to_epoch
+
+# Tiers of the materialized score timeline: the series, its sample spacing in seconds and
+# how far ahead of now (seconds) it is used; the last tier covers whatever remains.
+TIMELINE_TIERS = (
+    ('short_term_forecast', 15 * 60, 3 * 3600),
+    ('forecast_scores', 60 * 60, 48 * 3600),
+    ('extended_forecast_scores', 60 * 60, None),
+)
+
+# Range queries pick the finest resolution (seconds) that keeps the response small:
+# (maximum span, resolution) pairs, tried in order.
+AUTO_RESOLUTIONS = (
+    (6 * 3600, 15 * 60),
+    (72 * 3600, 60 * 60),
+    (None, 3 * 60 * 60),
+)
+
+
+def build_score_timeline(short_term_forecast, forecast_scores, extended_forecast_scores, now=None):
+    """
+    Merges the three score series into one timeline of rows: 15-minute samples for the
+    first 3 hours, hourly samples out to 48 hours and extended samples after that. A tier
+    only contributes rows after the last one taken from a finer tier, so a missing series
+    is backfilled by the next one. Each row records its resolution (minutes) and source.
+    """
+    now = time.time() if now is None else now
+    rows_by_key = {
+        'short_term_forecast': short_term_forecast,
+        'forecast_scores': forecast_scores,
+        'extended_forecast_scores': extended_forecast_scores,
+    }
+    timeline = []
+    covered_until = None
+    for key, spacing, horizon in TIMELINE_TIERS:
+        for row in rows_by_key[key] or ():
+            if not row.get('timestamp'):
+                continue
+            epoch = to_epoch(row['timestamp'])
+            # Keep the sample now falls in, but nothing that ended before it
+            if epoch + spacing <= now or (covered_until is not None and epoch < covered_until):
+                continue
+            if horizon is not None and epoch >= now + horizon:
+                continue
+            timeline.append((epoch, dict(row, resolution=spacing // 60, source=key)))
+        if timeline:
+            covered_until = timeline[-1][0] + spacing
+    timeline.sort(key=lambda entry: entry[0])
+    return [row for _, row in timeline]
+
+
+def timeline_samples(timeline, now=None):
+    """
+    Returns the published score timeline (columnar) as time-ordered (epoch, score, span)
+    samples for window searches. span is how long a sample is representative for: the gap
+    to the next sample, capped at the sample's resolution, so holes in the data stay
+    visible. Samples without a score and samples that ended before now are dropped.
+    """
+    columns = timeline['columns']
+    samples = []
+    for epoch, score, resolution in zip(timeline['epochs'], columns.get('score.score', []),
+                                        columns.get('resolution', [])):
+        spacing = (resolution or 60) * 60
+        if score is None or (now is not None and epoch + spacing <= now):
+            continue
+        samples.append([epoch, score, spacing])
+
+    for sample, following in zip(samples, samples[1:]):
+        sample[2] = min(sample[2], following[0] - sample[0])
+    return [tuple(sample) for sample in samples]
+
+
+def auto_resolution(start, end):
+    """Returns the sample spacing (seconds) a range query over [start, end] is served at."""
+    span = end - start
+    for max_span, resolution in AUTO_RESOLUTIONS:
+        if max_span is None or span <= max_span:
+            return resolution
+
+
+def thin_rows(rows, resolution):
+    """
+    Thins time-ordered rows to one per resolution-sized slot, with slots aligned to local
+    clock time (3-hour slots start at 00:00, 03:00, ... America/New_York).
+    """
+    if not rows:
+        return []
+    offset = int(datetime.fromtimestamp(to_epoch(rows[0]['timestamp']), EST).utcoffset().total_seconds())
+    thinned = []
+    last_slot = None
+    for row in rows:
+        slot = (to_epoch(row['timestamp']) + offset) // resolution
+        if slot != last_slot:
+            thinned.append(row)
+            last_slot = slot
+    return thinned
+
+
+def _interpolate(before, after, weight):
+    """Linearly blends two values when both are numbers; otherwise keeps the nearer one."""
+    numeric = all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in (before, after))
+    if numeric:
+        return round(before + (after - before) * weight, 3)
+    return before if weight < 0.5 else after
+
+
+def timeline_point(before, after, epoch, interpolate=False):
+    """
+    Answers a point query from the timeline samples at-or-before and after epoch (either may
+    be None past an end). Returns the nearer sample, or with interpolate a row blended
+    linearly between the two (numeric fields only) unless they are further apart than the
+    earlier one's resolution. Returns None more than an hour outside the timeline.
+    """
+    before_epoch = to_epoch(before['timestamp']) if before else None
+    after_epoch = to_epoch(after['timestamp']) if after else None
+    if before is None or after is None:
+        row, row_epoch = (before, before_epoch) if before else (after, after_epoch)
+        return row if row and abs(epoch - row_epoch) <= 3600 else None
+    gap = after_epoch - before_epoch
+    if not interpolate or epoch == before_epoch or gap > (before.get('resolution') or 60) * 60:
+        return before if epoch - before_epoch <= after_epoch - epoch else after
+    weight = (epoch - before_epoch) / gap
+
+    def blend(a, b):
+        if isinstance(a, dict) and isinstance(b, dict):
+            return {name: blend(a.get(name), b.get(name)) for name in a.keys() | b.keys()}
+        return _interpolate(a, b, weight)
+
+    row = blend(before, after)
+    # Which sample the blend is attributed to is not itself interpolated
+    row['resolution'], row['source'] = before.get('resolution'), before.get('source')
+    row['timestamp'] = datetime.fromtimestamp(epoch, EST).strftime('%Y-%m-%dT%H:%M')
+    row['interpolated'] = True
+    row['between'] = [before['timestamp'], after['timestamp']]
+    return row
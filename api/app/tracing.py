@@ -0,0 +1,254 @@
+# app/tracing.py
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+# Finished spans kept in memory per worker for /debug/traces
+TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', '2000'))
+# Optional JSON lines file every finished span is appended to (shared by all workers)
+TRACE_EXPORT_PATH = os.getenv('TRACE_EXPORT_PATH')
+# Size in bytes past which the export file is rotated to <path>.1, replacing the previous one
+TRACE_EXPORT_MAX_BYTES = int(os.getenv('TRACE_EXPORT_MAX_BYTES', str(10 * 1024 * 1024)))
+# Spans are written to the export file in batches, at least this often (seconds)...
+TRACE_EXPORT_INTERVAL = float(os.getenv('TRACE_EXPORT_INTERVAL', '1'))
+# ...or as soon as this many are waiting
+TRACE_EXPORT_BATCH_SIZE = int(os.getenv('TRACE_EXPORT_BATCH_SIZE', '256'))
+# Set to 0 to turn span recording off entirely
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', '1').lower() not in ('0', 'false', 'no')
+# /debug/traces is only served when set, since spans expose upstream URLs, timings and errors
+DEBUG_TRACES_ENABLED = os.getenv('DEBUG_TRACES_ENABLED', '').lower() in ('1', 'true', 'yes')
+
+# (trace id, span id) of the span the current code runs in
+_current = ContextVar('rowcast_span', default=(None, None))
+
+
+def _tail_lines(path, count, block_size=65536):
+    """Returns the last count lines of a file, reading backwards from its end in blocks instead of in full."""
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        data = b''
+        # One newline more than lines wanted, so a line cut by the block boundary is not among them
+        while position > 0 and data.count(b'\n') <= count:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+    return data.decode('utf-8', errors='replace').splitlines()[-count:]
+
+
+class SpanExporter:
+    """
+    Keeps finished spans in a ring buffer and, if configured, appends them to a JSON lines
+    file, which is rotated once it grows past max_bytes. File writes are batched: export only
+    queues the span, and a background thread writes the queue every flush_interval seconds,
+    or as soon as batch_size spans are waiting.
+    """
+
+    def __init__(self, size=TRACE_BUFFER_SIZE, path=TRACE_EXPORT_PATH, max_bytes=TRACE_EXPORT_MAX_BYTES,
+                 batch_size=TRACE_EXPORT_BATCH_SIZE, flush_interval=TRACE_EXPORT_INTERVAL):
+        self._spans = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._path = path
+        self._max_bytes = max_bytes
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._pending = []
+        # Serializes file writes, so export never waits on disk
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._flusher = None
+        self._flusher_pid = None
+
+    def export(self, span):
+        with self._lock:
+            self._spans.append(span)
+            if not self._path:
+                return
+            if self._flusher_pid != os.getpid():
+                self._start_flusher()
+            self._pending.append(span)
+            if len(self._pending) >= self._batch_size:
+                self._wake.set()
+
+    def _start_flusher(self):
+        # Also runs after a fork, whose child has the queue but not the thread; the parent writes those spans
+        self._pending = []
+        self._flusher_pid = os.getpid()
+        self._flusher = threading.Thread(target=self._run_flusher, name='span-exporter', daemon=True)
+        self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            self._wake.wait(self._flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Writes the queued spans to the export file in one append."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending or not self._path:
+                return
+            try:
+                with open(self._path, 'a') as f:
+                    f.write(''.join(json.dumps(span) + '\n' for span in pending))
+                    size = f.tell()
+                # Any worker may rotate; a batch another worker appends meanwhile lands in either file
+                if size > self._max_bytes:
+                    os.replace(self._path, f"{self._path}.1")
+            except OSError as e:
+                logger.warning(f"Could not write {len(pending)} spans to {self._path}: {e}")
+
+    def spans(self, limit=None):
+        """
+        Returns recent finished spans, oldest first: the tail of the JSON lines file if
+        configured, else this worker's buffer.
+        """
+        if self._path:
+            self.flush()
+        if self._path and os.path.exists(self._path):
+            spans = []
+            for line in _tail_lines(self._path, limit or self._spans.maxlen):
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:  # A line another worker is still writing
+                    continue
+            return spans
+        with self._lock:
+            spans = list(self._spans)
+        return spans[-limit:] if limit else spans
+
+
+exporter = SpanExporter()
+# Spans still queued when the process exits
+atexit.register(exporter.flush)
+
+
+def new_run_id():
+    return uuid.uuid4().hex[:16]
+
+
+@contextmanager
+def span(name, new_trace=False, **attributes):
+    """
+    Times the enclosed block as a span named name. Spans opened inside it become its
+    children and share its trace (run) id; new_trace starts a new trace, as every
+    scheduled job run and every request does.
+    """
+    if not TRACING_ENABLED:
+        yield {}
+        return
+    trace_id, parent_id = _current.get()
+    if new_trace or trace_id is None:
+        trace_id, parent_id = new_run_id(), None
+    record = {
+        'traceId': trace_id,
+        'spanId': uuid.uuid4().hex[:8],
+        'parentId': parent_id,
+        'name': name,
+        'start': time.time(),
+        'attributes': attributes,
+        'status': 'ok'
+    }
+    token = _current.set((trace_id, record['spanId']))
+    started = time.perf_counter()
+    try:
+        yield record['attributes']
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record['durationMs'] = round((time.perf_counter() - started) * 1000, 3)
+        _current.reset(token)
+        exporter.export(record)
+
+
+def traced(name=None, new_trace=False):
+    """Decorator running the function inside a span (named after the function by default)."""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, new_trace=new_trace):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def init_request_tracing(app):
+    """Registers hooks opening a root span per request, which Redis spans on the read path join."""
+
+    @app.before_request
+    def start_request_span():
+        if not TRACING_ENABLED or not request.path.startswith('/api'):
+            return
+        g.request_span = span(f"{request.method} {request.path}", new_trace=True)
+        g.request_span_attributes = g.request_span.__enter__()
+
+    @app.after_request
+    def tag_request_span(response):
+        if 'request_span' in g:
+            g.request_span_attributes.update(status=response.status_code,
+                                             route=request.url_rule.rule if request.url_rule else None)
+        return response
+
+    @app.teardown_request
+    def end_request_span(error=None):
+        request_span = g.pop('request_span', None)
+        if request_span is not None:
+            if error is not None:
+                request_span.__exit__(type(error), error, error.__traceback__)
+            else:
+                request_span.__exit__(None, None, None)
+
+
+def group_traces(spans):
+    """Groups spans by trace, newest trace first, each as a depth-annotated tree in start order."""
+    traces = {}
+    for record in spans:
+        traces.setdefault(record['traceId'], []).append(record)
+
+    grouped = []
+    for trace_id, records in traces.items():
+        children = {}
+        for record in records:
+            children.setdefault(record['parentId'], []).append(record)
+        ids = {record['spanId'] for record in records}
+        # Roots, plus spans whose parent has already left the buffer
+        roots = [record for record in records if record['parentId'] is None or record['parentId'] not in ids]
+        ordered = []
+
+        def walk(record, depth):
+            ordered.append(dict(record, depth=depth))
+            for child in sorted(children.get(record['spanId'], ()), key=lambda child: child['start']):
+                walk(child, depth + 1)
+
+        for root in sorted(roots, key=lambda root: root['start']):
+            walk(root, 0)
+        start = min(record['start'] for record in records)
+        end = max(record['start'] + record['durationMs'] / 1000 for record in records)
+        grouped.append({
+            'traceId': trace_id,
+            'name': ordered[0]['name'],
+            'start': start,
+            'durationMs': round((end - start) * 1000, 3),
+            'errors': sum(record['status'] == 'error' for record in records),
+            'spans': ordered
+        })
+    grouped.sort(key=lambda trace: trace['start'], reverse=True)
+    return grouped
@@ -0,0 +1,152 @@
+# app/upstream.py
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from app.extensions import redis_client
+from app.metrics import metrics
+from app.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failures (errors, timeouts, 429 or 5xx) after which an upstream's breaker opens
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('UPSTREAM_BREAKER_THRESHOLD', '3'))
+# First open period in seconds; doubles with every consecutive re-open, up to the maximum
+BREAKER_BASE_SECONDS = float(os.getenv('UPSTREAM_BREAKER_BASE_SECONDS', '60'))
+BREAKER_MAX_SECONDS = float(os.getenv('UPSTREAM_BREAKER_MAX_SECONDS', '1800'))
+# Redis hash holding each upstream's breaker state, so every worker can flag stale data
+BREAKERS_KEY = 'upstream_breakers'
+# Seconds a worker reuses breaker states read from Redis
+BREAKER_STATE_TTL = 5
+
+
+class UpstreamUnavailable(requests.exceptions.ConnectionError):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Breaker for one upstream host. Closed: calls go through. Open: calls fail immediately
+    until the backoff (exponential in the number of consecutive opens, with jitter) has
+    passed. Half-open: a single probe call decides between closing and re-opening.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.state = 'closed'
+        self.failures = 0
+        self.opens = 0
+        self.retry_at = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go out now; moves an expired open breaker to half-open for one probe."""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.time() >= self.retry_at:
+                self.state = 'half_open'
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            changed = self.state != 'closed'
+            self.state, self.failures, self.opens, self.retry_at = 'closed', 0, 0, 0
+        if changed:
+            logger.info(f"Circuit for {self.name} closed")
+            self._publish()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state != 'half_open' and self.failures < BREAKER_FAILURE_THRESHOLD:
+                return
+            self.opens += 1
+            backoff = min(BREAKER_MAX_SECONDS, BREAKER_BASE_SECONDS * 2 ** (self.opens - 1))
+            # Jitter spreads the probes of several workers over the second half of the backoff
+            self.retry_at = time.time() + backoff * random.uniform(0.5, 1.0)
+            self.state = 'open'
+        logger.warning(f"Circuit for {self.name} open after {self.failures} consecutive failures; "
+                       f"next probe in {self.retry_at - time.time():.0f}s")
+        self._publish()
+
+    def snapshot(self):
+        return {'state': self.state, 'failures': self.failures, 'retryAt': self.retry_at or None,
+                'updatedAt': time.time()}
+
+    def _publish(self):
+        try:
+            redis_client.hset(BREAKERS_KEY, self.name, json.dumps(self.snapshot()))
+        except Exception as e:
+            logger.warning(f"Could not record breaker state of {self.name}: {e}")
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(name):
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+_breaker_states = {'states': {}, 'read_at': 0}
+
+
+def breaker_states():
+    """Returns {upstream: state} as last recorded by any worker, re-read at most every BREAKER_STATE_TTL seconds."""
+    if time.time() - _breaker_states['read_at'] >= BREAKER_STATE_TTL:
+        try:
+            states = {name: json.loads(value) for name, value in redis_client.hgetall(BREAKERS_KEY).items()}
+        except Exception as e:
+            logger.warning(f"Could not read upstream breaker states: {e}")
+            states = _breaker_states['states']
+        _breaker_states.update(states=states, read_at=time.time())
+    return _breaker_states['states']
+
+
+def upstream_name(url):
+    """Names the upstream API a URL belongs to by its host (e.g. api.open-meteo.com)."""
+    return urlparse(url).hostname or 'unknown'
+
+
+def upstream_get(url, **kwargs):
+    """
+    requests.get for calls to upstream APIs, behind a per-host circuit breaker. Records
+    latency and the status code ('error' when no response arrived, 'short_circuit' when the
+    breaker rejected the call) per upstream, traced as a span of the current run. Raises
+    UpstreamUnavailable (a requests ConnectionError) while the breaker is open; other
+    exceptions propagate unchanged.
+    """
+    labels = {'upstream': upstream_name(url)}
+    breaker = breaker_for(labels['upstream'])
+    if not breaker.allow():
+        metrics.inc('rowcast_upstream_responses_total', dict(labels, status='short_circuit'))
+        raise UpstreamUnavailable(f"Circuit for {labels['upstream']} is open; "
+                                  f"next probe in {max(0, breaker.retry_at - time.time()):.0f}s")
+
+    started = time.perf_counter()
+    with span(f"GET {labels['upstream']}", url=url, breaker=breaker.state) as request_span:
+        try:
+            response = requests.get(url, **kwargs)
+        except Exception:
+            metrics.inc('rowcast_upstream_responses_total', dict(labels, status='error'))
+            breaker.record_failure()
+            raise
+        finally:
+            metrics.observe('rowcast_upstream_request_duration_seconds', labels, time.perf_counter() - started)
+        request_span['status'] = response.status_code
+    metrics.inc('rowcast_upstream_responses_total', dict(labels, status=response.status_code))
+    if response.status_code == 429 or response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
@@ -1,5 +1,11 @@
 # app/utils.py
 
+from datetime import datetime
+import pytz
+
+# Timestamps without an offset (Open-Meteo's) are local to the river.
+EST = pytz.timezone('America/New_York')
+
 def clamp(val, min_val, max_val):
     if val is None:
         return None
@@ -24,4 +30,12 @@ def deg_to_cardinal(deg):
         idx = int((float(deg) % 360) / 22.5 + 0.5) % 16
         return dirs[idx]
     except Exception:
-        return "N/A"
\ No newline at end of file
+        return "N/A"
+
+
+def to_epoch(timestamp):
+    """Converts an ISO timestamp to epoch seconds; naive timestamps are America/New_York local time."""
+    dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = EST.localize(dt)
+    return int(dt.timestamp())
@@ -0,0 +1,103 @@
+# app/windows.py
+
+from collections import OrderedDict, deque
+from datetime import datetime
+import threading
+from app.utils import EST
+
+# Window searches kept per worker, keyed by forecast versions and search parameters
+WINDOW_CACHE_SIZE = 128
+
+
+def scan_windows(samples, duration):
+    """
+    Computes the minimum and time-weighted mean score of the window of duration seconds
+    starting at every sample, in one linear pass: the window end advances monotonically
+    with its start, a monotonic deque tracks the minimum and prefix sums of score * span
+    give the mean. Windows that run past the data or across a hole are skipped.
+
+    Yields (start index, end epoch, minimum, mean).
+    """
+    n = len(samples)
+    prefix = [0.0] * (n + 1)
+    # holes[i] counts samples before i that do not reach the next one
+    holes = [0] * (n + 1)
+    for i, (epoch, score, span) in enumerate(samples):
+        prefix[i + 1] = prefix[i] + score * span
+        reaches_next = i + 1 == n or epoch + span >= samples[i + 1][0]
+        holes[i + 1] = holes[i] + (0 if reaches_next else 1)
+
+    minimums = deque()
+    last = -1
+    for first in range(n):
+        end = samples[first][0] + duration
+        while last + 1 < n and samples[last + 1][0] < end:
+            last += 1
+            while minimums and samples[minimums[-1]][1] >= samples[last][1]:
+                minimums.pop()
+            minimums.append(last)
+        while minimums[0] < first:
+            minimums.popleft()
+
+        last_epoch, last_score, last_span = samples[last]
+        if last_epoch + last_span < end or holes[last] - holes[first] > 0:
+            continue
+        weighted = prefix[last] - prefix[first] + last_score * (end - last_epoch)
+        yield first, end, samples[minimums[0]][1], weighted / duration
+
+
+def best_windows(samples, duration, threshold, k, mode='min'):
+    """
+    Returns up to k non-overlapping windows of duration seconds whose minimum (mode='min')
+    or mean (mode='mean') score is at least threshold, best first.
+    """
+    candidates = []
+    for first, end, minimum, mean in scan_windows(samples, duration):
+        value = minimum if mode == 'min' else mean
+        if value >= threshold:
+            candidates.append((value, samples[first][0], end, minimum, mean))
+    candidates.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+
+    chosen = []
+    for value, start, end, minimum, mean in candidates:
+        if len(chosen) == k:
+            break
+        if all(end <= window[1] or start >= window[2] for window in chosen):
+            chosen.append((value, start, end, minimum, mean))
+
+    return [
+        {
+            'start': datetime.fromtimestamp(start, EST).isoformat(),
+            'end': datetime.fromtimestamp(end, EST).isoformat(),
+            'score': round(value, 3),
+            'minScore': round(minimum, 3),
+            'meanScore': round(mean, 3)
+        }
+        for value, start, end, minimum, mean in chosen
+    ]
+
+
+class WindowCache:
+    """Bounded per-worker cache of window searches; entries are keyed by forecast versions, so new data never hits a stale entry."""
+
+    def __init__(self, size=WINDOW_CACHE_SIZE):
+        self._entries = OrderedDict()
+        self._size = size
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+
+
+window_cache = WindowCache()
@@ -0,0 +1,19 @@
+# gunicorn.conf.py
+# Loaded by gunicorn started from api/ (it reads ./gunicorn.conf.py by default), or with -c gunicorn.conf.py.
+
+import os
+
+
+def on_starting(server):
+    """
+    Records the number of workers from gunicorn's own settings, however they were given (-w,
+    WEB_CONCURRENCY, a config file), before any worker imports the app: app.extensions refuses
+    the single-process storage backends when it is above 1, or missing.
+    """
+    os.environ['GUNICORN_SERVER_WORKERS'] = str(server.cfg.workers)
+
+
+def nworkers_changed(server, new_value, old_value):
+    # Also called when the master sets up, before a --preload app is imported, and when workers
+    # are added with TTIN, whose new workers then check the new count the same way
+    os.environ['GUNICORN_SERVER_WORKERS'] = str(new_value)
@@ -30,7 +30,7 @@ export FLASK_ENV=development
 export FLASK_DEBUG=1
 
 # Use gunicorn for consistent behavior
-gunicorn -w 1 -b 127.0.0.1:5000 --timeout 120 --access-logfile logs/access.log --error-logfile logs/error.log --capture-output --enable-stdio-inheritance wsgi:app &
+gunicorn -w 1 -k gthread --threads 8 -b 127.0.0.1:5000 --timeout 120 --access-logfile logs/access.log --error-logfile logs/error.log --capture-output --enable-stdio-inheritance wsgi:app &
 
 # Store the PID
 echo $! > .dev_server.pid
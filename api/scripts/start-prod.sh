@@ -65,10 +65,17 @@ python3 refresh_all_data.py
 echo "🌐 Starting Flask API in production mode on http://localhost:5000"
 export FLASK_ENV=production
 
-# Use multiple workers for production, with absolute log paths
+# Use multiple workers for production, with absolute log paths.
+# Threaded workers: every open /api/stream (Server-Sent Events) connection holds one thread
+# for as long as the client stays, so a sync worker would be blocked by a single stream.
+# With gthread, --timeout only restarts a worker whose main loop stopped responding; it does
+# not cut off long-lived streams, which send a keep-alive every 15 seconds.
+# gunicorn.conf.py records the worker count, so the app can refuse in-process storage backends with several workers
+GUNICORN_WORKERS=${GUNICORN_WORKERS:-4}
+GUNICORN_THREADS=${GUNICORN_THREADS:-32}
 GUNICORN_ERROR_LOG="$LOGS_DIR/error.log"
 GUNICORN_ACCESS_LOG="$LOGS_DIR/access.log"
-gunicorn -w 4 -b 127.0.0.1:5000 --timeout 120 --access-logfile "$GUNICORN_ACCESS_LOG" --error-logfile "$GUNICORN_ERROR_LOG" --daemon wsgi:app
+gunicorn -c gunicorn.conf.py -w "$GUNICORN_WORKERS" -k gthread --threads "$GUNICORN_THREADS" -b 127.0.0.1:5000 --timeout 120 --keep-alive 75 --access-logfile "$GUNICORN_ACCESS_LOG" --error-logfile "$GUNICORN_ERROR_LOG" --daemon wsgi:app
 
 # Check if Gunicorn started successfully
 sleep 2
@@ -32,7 +32,7 @@ export FLASK_ENV=development
 export FLASK_DEBUG=1
 
 # Start test server
-gunicorn -w 1 -b 127.0.0.1:8000 --timeout 120 --access-logfile logs/test_access.log --error-logfile logs/test_error.log --capture-output --enable-stdio-inheritance wsgi:app &
+gunicorn -w 1 -k gthread --threads 8 -b 127.0.0.1:8000 --timeout 120 --access-logfile logs/test_access.log --error-logfile logs/test_error.log --capture-output --enable-stdio-inheritance wsgi:app &
 
 echo $! > .test_server.pid
 
@@ -0,0 +1,60 @@
+# tests/conftest.py
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+# The app reads its configuration at import time: run against the in-process storage
+# backend, with local snapshot files in a scratch directory, before anything imports it.
+os.environ['STORAGE_BACKEND'] = 'memory'
+os.environ['SNAPSHOT_STORE'] = 'redis'
+os.environ['LOCAL_SNAPSHOT_DIR'] = tempfile.mkdtemp(prefix='rowcast-test-snapshots-')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+from flask import Flask  # noqa: E402
+from app.extensions import redis_client  # noqa: E402
+from app.local_snapshots import local_snapshots  # noqa: E402
+from app.snapshots import snapshot_cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def storage(tmp_path, monkeypatch):
+    """An empty storage backend and local snapshot directory for every test."""
+    redis_client.flushall()
+    monkeypatch.setattr(local_snapshots, 'directory', str(tmp_path / 'local'))
+    monkeypatch.setattr(local_snapshots, '_open', {})
+    monkeypatch.setattr(snapshot_cache, '_entries', {})
+    monkeypatch.setattr(snapshot_cache, '_stats', {})
+    yield redis_client
+    redis_client.flushall()
+
+
+@pytest.fixture(autouse=True)
+def no_upstreams(monkeypatch):
+    """Upstream APIs are unreachable in tests: jobs started on demand fail fast instead of going online."""
+    def unreachable(url, **kwargs):
+        raise requests.exceptions.ConnectionError(f"No upstream calls in tests: {url}")
+    monkeypatch.setattr('app.upstream.requests.get', unreachable)
+    monkeypatch.setattr('app.upstream._breakers', {})
+    monkeypatch.setattr('app.upstream._breaker_states', {'states': {}, 'read_at': 0})
+
+
+@pytest.fixture
+def redis_down():
+    """Makes the storage backend refuse every command, like a Redis server that went down."""
+    server = redis_client.connection_pool.connection_kwargs['server']
+    server.connected = False
+    yield
+    server.connected = True
+
+
+@pytest.fixture
+def client():
+    """A test client for the API blueprint, without the scheduler or startup jobs of create_app."""
+    from app.routes import bp
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    return app.test_client()
@@ -0,0 +1,73 @@
+# tests/test_access_log.py
+
+import json
+import logging
+
+import pytest
+from flask import Flask
+
+from app import access_log
+from app.access_log import init_access_log
+
+
+@pytest.fixture
+def app_client():
+    app = Flask(__name__)
+    init_access_log(app)
+    app.add_url_rule('/small', 'small', lambda: 'ok')
+    app.add_url_rule('/large', 'large', lambda: 'x' * 10000, methods=['GET', 'POST'])
+    app.add_url_rule('/error', 'error', lambda: ('failed', 500))
+    return app.test_client()
+
+
+@pytest.fixture
+def entries(caplog):
+    """Returns the access log entries written so far."""
+    caplog.set_level(logging.INFO, logger='rowcast.access')
+    return lambda: [json.loads(record.getMessage()) for record in caplog.records if record.name == 'rowcast.access']
+
+
+@pytest.fixture
+def draw(monkeypatch):
+    """Fixes the random number each request's sampling decision is made with."""
+    def set_draw(value):
+        monkeypatch.setattr(access_log.random, 'random', lambda: value)
+    return set_draw
+
+
+def test_requests_are_logged_at_the_sample_rate(app_client, entries, draw, monkeypatch):
+    monkeypatch.setattr(access_log, 'ACCESS_LOG_SAMPLE_RATE', 0.25)
+    draw(0.3)
+    app_client.get('/small')
+    assert entries() == []
+
+    draw(0.2)
+    app_client.get('/small')
+    (entry,) = entries()
+    assert (entry['route'], entry['status'], entry['bytes'], entry['sampleRate']) == ('/small', 200, 2, 0.25)
+    assert entry['latencyMs'] >= 0
+    assert 'responseBody' not in entry and 'requestHeaders' not in entry
+
+
+def test_server_errors_and_slow_requests_are_always_logged(app_client, entries, draw, monkeypatch):
+    monkeypatch.setattr(access_log, 'ACCESS_LOG_SAMPLE_RATE', 0)
+    draw(0.5)
+    app_client.get('/error')
+    monkeypatch.setattr(access_log, 'ACCESS_LOG_SLOW_MS', 0)
+    app_client.get('/small')
+
+    assert [entry['status'] for entry in entries()] == [500, 200]
+
+
+def test_payloads_are_logged_only_with_the_debug_flag_and_cut_to_size(app_client, entries, draw, monkeypatch):
+    monkeypatch.setattr(access_log, 'ACCESS_LOG_PAYLOADS', True)
+    monkeypatch.setattr(access_log, 'ACCESS_LOG_PAYLOAD_MAX_BYTES', 100)
+    draw(0)
+
+    app_client.get('/small')
+    app_client.post('/large', data='y' * 500)
+
+    small, large = entries()
+    assert small['responseBody'] == 'ok'
+    assert large['responseBody'] == 'x' * 100 + '... (10000 bytes)'
+    assert large['requestBody'] == 'y' * 100 + '... (500 bytes)'
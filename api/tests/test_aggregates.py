@@ -0,0 +1,59 @@
+# tests/test_aggregates.py
+
+from app.aggregates import build_daily_summary
+from app.snapshots import publish_snapshot
+
+
+def row(timestamp, score, **factors):
+    return {'timestamp': timestamp, 'score': {'score': score, 'factors': factors}}
+
+
+def test_days_follow_america_new_york_midnight():
+    summary = build_daily_summary([
+        # 23:30 on July 1st in New York, already July 2nd in UTC
+        row('2025-07-02T03:30:00Z', 4),
+        row('2025-07-01T23:00', 6),
+        # 00:00 local starts the next day
+        row('2025-07-02T04:00:00Z', 8),
+        row('2025-07-02T01:00-04:00', 9),
+    ])
+
+    assert [(day['date'], day['hours']) for day in summary['days']] == [('2025-07-01', 2), ('2025-07-02', 2)]
+
+
+def test_winter_days_use_standard_time():
+    summary = build_daily_summary([row('2025-01-15T04:30:00Z', 5), row('2025-01-15T05:00:00Z', 7)])
+
+    assert [day['date'] for day in summary['days']] == ['2025-01-14', '2025-01-15']
+
+
+def test_day_statistics():
+    (day,) = build_daily_summary([
+        row('2025-07-01T06:00', 2, wind=3, temperature=8),
+        row('2025-07-01T07:00', 5, wind=2, temperature=9),
+        row('2025-07-01T08:00', 9.5, wind=9, temperature=7),
+        row('2025-07-01T09:00', 7, wind=4, temperature=8),
+    ], thresholds=(5, 8))['days']
+
+    assert (day['min'], day['max'], day['mean'], day['median']) == (2, 9.5, 5.88, 6)
+    assert day['bestHour'] == {'timestamp': '2025-07-01T08:00', 'score': 9.5}
+    assert day['worstHour'] == {'timestamp': '2025-07-01T06:00', 'score': 2}
+    assert day['histogram'] == [0, 1, 1, 1, 1]
+    assert day['hoursAbove'] == {'5': 3, '8': 1}
+    assert day['limitingFactor'] == {'factor': 'wind', 'hours': 3}
+
+
+def test_rows_without_a_score_are_skipped():
+    summary = build_daily_summary([row('2025-07-01T06:00', None), {'timestamp': '2025-07-01T07:00'},
+                                   {'score': {'score': 5}}, row('2025-07-01T08:00', 6)])
+
+    assert [(day['hours'], day['mean']) for day in summary['days']] == [(1, 6)]
+
+
+def test_daily_summary_route(client):
+    publish_snapshot('daily_forecast_summary', build_daily_summary([row('2025-07-01T06:00', 6)]))
+
+    response = client.get('/api/rowcast/forecast/daily')
+
+    assert response.status_code == 200
+    assert response.get_json()['days'][0]['date'] == '2025-07-01'
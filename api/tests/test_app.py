@@ -0,0 +1,46 @@
+# tests/test_app.py
+
+import threading
+import time
+
+import pytest
+
+from app import create_app
+from app.extensions import redis_client, scheduler
+from app.snapshots import publish_snapshot
+
+
+@pytest.fixture
+def slow_core_refresh(monkeypatch):
+    """A core data refresh that takes a second; returns an event set when it has run."""
+    done = threading.Event()
+
+    def refresh():
+        time.sleep(1)
+        done.set()
+    monkeypatch.setattr('app.tasks.refresh_core_data', refresh)
+    yield done
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+
+
+def test_startup_refresh_runs_in_the_background(slow_core_refresh):
+    started = time.monotonic()
+    create_app()
+
+    assert time.monotonic() - started < 1
+    assert not slow_core_refresh.is_set()
+    assert slow_core_refresh.wait(5)
+
+
+def test_restart_serves_the_local_snapshot_until_refreshed(slow_core_refresh):
+    publish_snapshot('water_data', {'current': {'discharge': 1200}})
+    # Redis came back empty, as after a restart without persistence
+    redis_client.flushall()
+    client = create_app().test_client()
+
+    response = client.get('/api/water/current')
+
+    assert response.status_code == 200
+    assert response.get_json()['discharge'] == 1200
+    assert response.headers['X-Data-Stale'] == 'true'
@@ -0,0 +1,117 @@
+# tests/test_conditional.py
+
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.extensions import redis_client
+from app.refresh import REFRESH_LOCK_PREFIX
+from app.snapshots import UPDATED_AT_KEY, publish_snapshot
+from app.tasks import KEY_PRODUCERS
+
+
+@pytest.fixture
+def water():
+    publish_snapshot('water_data', {'current': {'discharge': 1200}})
+
+
+def test_matching_etag_is_not_modified(client, water):
+    etag = client.get('/api/water/current').headers['ETag']
+
+    response = client.get('/api/water/current', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+
+
+def test_weak_etag_matches(client, water):
+    etag = client.get('/api/water/current').headers['ETag']
+
+    assert client.get('/api/water/current', headers={'If-None-Match': f"W/{etag}"}).status_code == 304
+
+
+def test_each_encoding_has_its_own_etag(client, water):
+    tags = {encoding: client.get('/api/water/current', headers={'Accept-Encoding': encoding}).headers['ETag']
+            for encoding in ('br', 'gzip', 'identity')}
+    tags['msgpack'] = client.get('/api/water/current', headers={'Accept': 'application/msgpack'}).headers['ETag']
+
+    assert len(set(tags.values())) == 4
+
+
+def test_not_modified_carries_vary(client, water):
+    response = client.get('/api/water/current', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+    not_modified = client.get('/api/water/current', headers={'Accept-Encoding': 'gzip',
+                                                             'If-None-Match': response.headers['ETag']})
+
+    assert not_modified.status_code == 304
+    assert set(not_modified.vary) == set(response.vary) == {'Accept', 'Accept-Encoding'}
+
+
+def test_republishing_changes_the_etag(client, water):
+    etag = client.get('/api/water/current').headers['ETag']
+    publish_snapshot('water_data', {'current': {'discharge': 900}})
+
+    response = client.get('/api/water/current', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['X-Data-Version'] and response.headers['ETag'] != etag
+
+
+@pytest.fixture
+def idle_water_job(monkeypatch):
+    """A water job that publishes nothing, as when its upstream is down."""
+    monkeypatch.setitem(KEY_PRODUCERS, 'water_data', dict(KEY_PRODUCERS['water_data'], func=lambda: None))
+
+
+def test_max_age_lasts_until_the_next_scheduled_run(client, water, monkeypatch):
+    next_run = datetime.now(timezone.utc) + timedelta(seconds=120)
+    monkeypatch.setattr('app.routes.scheduler', SimpleNamespace(
+        running=True, get_job=lambda job_id: SimpleNamespace(next_run_time=next_run)))
+
+    cache_control = client.get('/api/water/current').cache_control
+
+    assert 118 <= cache_control.max_age <= 120
+    # One refresh interval of the water job
+    assert cache_control.stale_while_revalidate == 900
+
+
+def test_max_age_without_a_scheduler_counts_from_the_last_write(client, water):
+    cache_control = client.get('/api/water/current').cache_control
+
+    assert 898 <= cache_control.max_age <= 900
+
+
+def test_expired_data_has_no_max_age_and_is_flagged_stale(client, idle_water_job):
+    now = time.time()
+    publish_snapshot('water_data', {'current': {'discharge': 1200}},
+                     freshness={'fetchedAt': now - 3600, 'expiresAt': now - 60})
+    # Written an hour ago, so the job's next run is overdue
+    redis_client.hset(UPDATED_AT_KEY, 'water_data', now - 3600)
+
+    response = client.get('/api/water/current')
+
+    assert response.status_code == 200
+    assert response.headers['X-Data-Stale'] == 'true'
+    assert response.cache_control.max_age == 0
+    assert response.cache_control.stale_while_revalidate == 900
+
+
+def test_unpublished_data_being_refreshed_answers_retry_after(client, idle_water_job):
+    response = client.get('/api/water/current')
+
+    assert response.status_code == 404
+    assert response.headers['Retry-After'] == '5'
+
+
+def test_unpublished_data_refreshed_this_period_has_no_retry_after(client, idle_water_job):
+    # Another worker's refresh already ran and published nothing
+    redis_client.set(REFRESH_LOCK_PREFIX + KEY_PRODUCERS['water_data']['id'], 'done', ex=60)
+
+    response = client.get('/api/water/current')
+
+    assert response.status_code == 404
+    assert 'Retry-After' not in response.headers
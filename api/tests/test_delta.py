@@ -0,0 +1,49 @@
+# tests/test_delta.py
+
+from app import snapshots
+from app.snapshots import load_history, publish_snapshot
+
+
+def rows(scores):
+    return [{'timestamp': f"2025-07-01T{hour:02d}:00", 'score': {'score': score}} for hour, score in scores.items()]
+
+
+def test_delta_since_a_previous_version(client):
+    first = publish_snapshot('forecast_scores', rows({6: 7.0, 7: 6.5, 8: 6.0}))
+    current = publish_snapshot('forecast_scores', rows({7: 6.5, 8: 4.0, 9: 5.0}))
+
+    delta = client.get(f"/api/rowcast/forecast?since={first}").get_json()
+
+    assert delta['version'] == current and delta['since'] == first and not delta['full']
+    assert delta['changed'] == rows({8: 4.0})
+    assert delta['added'] == rows({9: 5.0})
+    assert delta['removed'] == ['2025-07-01T06:00']
+
+
+def test_delta_since_the_current_version_is_empty(client):
+    current = publish_snapshot('forecast_scores', rows({6: 7.0}))
+
+    delta = client.get(f"/api/rowcast/forecast?since={current}").get_json()
+
+    assert (delta['changed'], delta['added'], delta['removed'], delta['full']) == ([], [], [], False)
+
+
+def test_unknown_version_falls_back_to_the_full_series(client):
+    current = publish_snapshot('forecast_scores', rows({6: 7.0, 7: 6.5}))
+
+    delta = client.get(f"/api/rowcast/forecast?since={current - 1}").get_json()
+
+    assert delta['full'] and delta['rows'] == rows({6: 7.0, 7: 6.5})
+
+
+def test_history_keeps_only_the_latest_versions(monkeypatch):
+    monkeypatch.setattr(snapshots, 'DELTA_HISTORY_LENGTH', 2)
+    versions = [publish_snapshot('forecast_scores', rows({6: score})) for score in (1.0, 2.0, 3.0)]
+
+    assert sorted(load_history('forecast_scores', versions)) == versions[1:]
+
+
+def test_invalid_since_is_a_400(client):
+    publish_snapshot('forecast_scores', rows({6: 7.0}))
+
+    assert client.get('/api/rowcast/forecast?since=latest').status_code == 400
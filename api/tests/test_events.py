@@ -0,0 +1,107 @@
+# tests/test_events.py
+
+import json
+import time
+
+import pytest
+
+from app.events import CONNECTION_BUFFER_SIZE, EVENTS_CHANNEL, EventSubscription, event_broker, publish_event
+from app.extensions import redis_client
+from app.snapshots import publish_snapshot
+
+
+def listening():
+    """Waits until the broker's listener thread is subscribed to the events channel."""
+    deadline = time.monotonic() + 5
+    while not dict(redis_client.pubsub_numsub(EVENTS_CHANNEL)).get(EVENTS_CHANNEL):
+        assert time.monotonic() < deadline, "listener did not subscribe"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def stream(client):
+    """Opens /api/stream; returns a function reading its next message."""
+    response = client.get('/api/stream')
+    chunks = iter(response.response)
+    listening()
+    yield lambda: next(chunks).decode('utf-8')
+    response.close()
+
+
+def test_published_events_reach_every_subscriber():
+    subscriptions = [event_broker.subscribe() for _ in range(2)]
+    listening()
+    try:
+        publish_event('version', {'key': 'water_data', 'version': 7})
+
+        for subscription in subscriptions:
+            event = json.loads(subscription.next(timeout=2))
+            assert event['type'] == 'version' and event['data'] == {'key': 'water_data', 'version': 7}
+    finally:
+        for subscription in subscriptions:
+            event_broker.unsubscribe(subscription)
+
+
+def test_a_full_buffer_drops_the_oldest_events():
+    subscription = EventSubscription(size=4)
+    for i in range(6):
+        subscription.push(i)
+
+    assert [subscription.next(timeout=0) for _ in range(5)] == [2, 3, 4, 5, None]
+
+
+def test_a_slow_stream_skips_to_the_newest_events(stream):
+    assert stream() == "retry: 5000\n\n"
+    (subscription,) = event_broker._subscriptions
+    for i in range(CONNECTION_BUFFER_SIZE + 6):
+        publish_event('version', {'key': 'water_data', 'version': i})
+    deadline = time.monotonic() + 5
+    while not subscription._events or json.loads(subscription._events[-1])['data']['version'] != CONNECTION_BUFFER_SIZE + 5:
+        assert time.monotonic() < deadline, "events not delivered"
+        time.sleep(0.01)
+
+    assert json.loads(stream().split('data: ', 1)[1])['version'] == 6
+
+
+def test_stream_sends_retry_and_published_events(stream):
+    assert stream() == "retry: 5000\n\n"
+
+    publish_snapshot('water_data', {'current': {'discharge': 1200}})
+
+    message = stream()
+    assert message.startswith("event: version\n")
+    assert json.loads(message.split('data: ', 1)[1])['key'] == 'water_data'
+
+
+def test_stream_starts_with_the_current_score(client):
+    publish_snapshot('rowcast_current', {'rowcastScore': 7.5, 'factors': {'wind': 1}, 'params': {}})
+
+    response = client.get('/api/stream')
+    chunks = iter(response.response)
+    try:
+        next(chunks)
+        assert next(chunks).decode('utf-8') == 'event: score\ndata: {"rowcastScore": 7.5, "factors": {"wind": 1}}\n\n'
+    finally:
+        response.close()
+
+
+def test_idle_stream_sends_keep_alives(monkeypatch, client):
+    monkeypatch.setattr('app.routes.STREAM_HEARTBEAT_SECONDS', 0.05)
+    response = client.get('/api/stream')
+    chunks = iter(response.response)
+    try:
+        assert next(chunks).decode('utf-8') == "retry: 5000\n\n"
+        assert next(chunks).decode('utf-8') == ": keep-alive\n\n"
+    finally:
+        response.close()
+
+
+def test_closed_streams_unsubscribe(client):
+    response = client.get('/api/stream')
+    chunks = iter(response.response)
+    next(chunks)
+    subscribed = len(event_broker._subscriptions)
+
+    response.close()
+
+    assert len(event_broker._subscriptions) == subscribed - 1
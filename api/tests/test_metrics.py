@@ -0,0 +1,59 @@
+# tests/test_metrics.py
+
+import pytest
+
+from app.extensions import redis_client
+from app.metrics import MetricsRegistry
+
+
+def sample(text, line_start):
+    """Returns the value of the first exposition line starting with line_start."""
+    return next(float(line.rsplit(' ', 1)[1]) for line in text.splitlines() if line.startswith(line_start))
+
+
+def test_samples_are_totalled_across_workers():
+    workers = [MetricsRegistry(), MetricsRegistry()]
+    for worker in workers:
+        worker.inc('rowcast_job_runs_total', {'job': 'weather', 'outcome': 'success'})
+        worker.observe('rowcast_upstream_request_duration_seconds', {'upstream': 'api.open-meteo.com'}, 0.2)
+        worker.flush()
+
+    text = workers[0].render()
+
+    assert sample(text, 'rowcast_job_runs_total{job="weather",outcome="success"}') == 2
+    assert sample(text, 'rowcast_upstream_request_duration_seconds_bucket{upstream="api.open-meteo.com",le="0.25"}') == 2
+    assert sample(text, 'rowcast_upstream_request_duration_seconds_count{upstream="api.open-meteo.com"}') == 2
+    assert sample(text, 'rowcast_metrics_aggregated') == 1
+
+
+def test_render_without_redis_shows_local_samples(redis_down):
+    registry = MetricsRegistry()
+    registry.inc('rowcast_job_runs_total', {'job': 'weather', 'outcome': 'failure'})
+
+    text = registry.render()
+
+    assert sample(text, 'rowcast_job_runs_total{job="weather",outcome="failure"}') == 1
+    assert sample(text, 'rowcast_metrics_aggregated') == 0
+
+
+def test_samples_survive_a_failed_flush(redis_down):
+    from redis.exceptions import ConnectionError
+    registry = MetricsRegistry()
+    registry.inc('rowcast_job_runs_total', {'job': 'weather', 'outcome': 'success'}, 3)
+    registry.set_gauge('rowcast_job_last_success_timestamp_seconds', {'job': 'weather'}, 100)
+
+    with pytest.raises(ConnectionError):
+        registry.flush()
+    registry.set_gauge('rowcast_job_last_success_timestamp_seconds', {'job': 'weather'}, 200)
+    redis_client.connection_pool.connection_kwargs['server'].connected = True
+    registry.flush()
+
+    assert float(redis_client.hget('metrics:rowcast_job_runs_total', 'job="weather",outcome="success"')) == 3
+    assert float(redis_client.hget('metrics:rowcast_job_last_success_timestamp_seconds', 'job="weather"')) == 200
+
+
+def test_metrics_endpoint_without_redis(client, redis_down):
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert 'rowcast_metrics_aggregated 0' in response.get_data(as_text=True)
@@ -0,0 +1,52 @@
+# tests/test_msgpack.py
+
+import math
+from array import array
+
+import msgpack
+
+from app.snapshots import publish_snapshot, render_msgpack
+from app.utils import to_epoch
+
+ROWS = [
+    {'timestamp': '2025-07-01T07:00', 'score': {'score': 6.5}, 'conditions': {'windSpeed': None, 'summary': 'Clear'}},
+    {'timestamp': '2025-07-01T06:00', 'score': {'score': 7}, 'conditions': {'windSpeed': 4.2, 'summary': 'Clear'}},
+]
+
+
+def typed(typecode, data):
+    return array(typecode, data).tolist()
+
+
+def test_row_lists_round_trip_as_typed_columns():
+    series = msgpack.unpackb(render_msgpack({'forecast': ROWS}))['forecast']
+
+    assert typed('q', series['epochs']) == [to_epoch('2025-07-01T06:00'), to_epoch('2025-07-01T07:00')]
+    assert typed('d', series['columns']['score.score']) == [7.0, 6.5]
+    wind = typed('d', series['columns']['conditions.windSpeed'])
+    assert wind[0] == 4.2 and math.isnan(wind[1])
+    # Columns that are not all numbers stay plain lists
+    assert series['columns']['conditions.summary'] == ['Clear', 'Clear']
+    assert series['columns']['timestamp'] == ['2025-07-01T06:00', '2025-07-01T07:00']
+
+
+def test_msgpack_is_served_when_preferred(client):
+    publish_snapshot('forecast_scores', ROWS)
+
+    response = client.get('/api/rowcast/forecast', headers={'Accept': 'application/msgpack'})
+
+    assert response.mimetype == 'application/msgpack'
+    assert typed('d', msgpack.unpackb(response.data)['columns']['score.score']) == [7.0, 6.5]
+
+
+def test_rows_with_non_string_timestamps_stay_rows():
+    rows = [{'timestamp': 1751364000, 'score': 7}, {'timestamp': 1751367600, 'score': 6}]
+
+    assert msgpack.unpackb(render_msgpack({'samples': rows})) == {'samples': rows}
+
+
+def test_unusual_rows_do_not_abort_the_publish(client):
+    publish_snapshot('noaa_stageflow_data', {'current': {'stage': 3.1},
+                                             'forecast': [{'timestamp': 1751364000, 'stage': 3.2}]})
+
+    assert client.get('/api/noaa/stageflow/current').get_json()['stage'] == 3.1
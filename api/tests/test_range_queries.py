@@ -0,0 +1,86 @@
+# tests/test_range_queries.py
+
+import pytest
+
+from app.snapshots import publish_snapshot
+
+ROWS = [
+    {'timestamp': f"2025-07-01T{hour:02d}:00", 'score': {'score': hour / 2}, 'conditions': {'windSpeed': hour}}
+    for hour in range(6, 12)
+]
+
+
+@pytest.fixture
+def forecast():
+    publish_snapshot('forecast_scores', ROWS)
+    publish_snapshot('score_timeline', ROWS)
+
+
+def test_range_and_projection(client, forecast):
+    response = client.get('/api/rowcast/forecast?from=2025-07-01T07:00&to=2025-07-01T09:00&fields=score.score')
+
+    assert response.status_code == 200
+    assert response.get_json() == [
+        {'timestamp': f"2025-07-01T{hour:02d}:00", 'score': {'score': hour / 2}} for hour in (7, 8, 9)
+    ]
+
+
+def test_epoch_seconds_and_limit(client, forecast):
+    response = client.get('/api/rowcast/forecast?from=0&limit=2')
+
+    assert [row['timestamp'] for row in response.get_json()] == ['2025-07-01T06:00', '2025-07-01T07:00']
+
+
+@pytest.mark.parametrize('path', [
+    '/api/rowcast/forecast?from=inf',
+    '/api/rowcast/forecast?to=1e400',
+    '/api/rowcast/forecast?from=nan',
+    '/api/rowcast/forecast?from=yesterday',
+    '/api/rowcast/forecast?limit=-1',
+    '/api/rowcast/timeline?from=inf',
+    '/api/rowcast/timeline?to=-1e400',
+])
+def test_invalid_range_is_a_json_400(client, forecast, path):
+    response = client.get(path)
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_index_members_are_row_positions(forecast):
+    from app.extensions import redis_client
+    from app.series import index_key
+    from app.snapshots import get_versions, versioned
+    version = get_versions(['forecast_scores'])['forecast_scores'].version
+
+    assert redis_client.zrange(versioned(index_key('forecast_scores'), version), 0, -1) == [str(i) for i in range(6)]
+
+
+def test_weather_forecast_rows_are_read_from_the_snapshot(client):
+    alert = {'event': 'Heat Advisory'}
+    # Rows out of time order, as the snapshot keeps them
+    rows = [{'timestamp': '2025-07-01T08:00', 'windSpeed': 8, 'weatherAlerts': []},
+            {'timestamp': '2025-07-01T07:00', 'windSpeed': 5, 'weatherAlerts': [alert]}]
+    publish_snapshot('weather_data', {'current': {'windSpeed': 5}, 'forecast': rows})
+
+    response = client.get('/api/weather/forecast?from=2025-07-01T06:00&fields=weatherAlerts')
+
+    assert response.get_json() == [{'timestamp': '2025-07-01T07:00', 'weatherAlerts': [alert]},
+                                   {'timestamp': '2025-07-01T08:00', 'weatherAlerts': []}]
+
+
+def test_point_queries_find_the_neighbouring_rows(client, forecast):
+    response = client.get('/api/rowcast/at/2025-07-01T07:30?interpolate=true')
+
+    assert response.status_code == 200
+    assert response.get_json()['score']['score'] == pytest.approx(3.75)
+
+
+def test_ranges_are_read_from_the_local_snapshot_after_redis_lost_its_data(client, forecast):
+    from app.extensions import redis_client
+    redis_client.flushall()
+
+    response = client.get('/api/rowcast/forecast?from=2025-07-01T10:00&fields=conditions')
+
+    assert response.get_json() == [{'timestamp': f"2025-07-01T{hour}:00", 'conditions': {'windSpeed': hour}}
+                                   for hour in (10, 11)]
@@ -0,0 +1,155 @@
+# tests/test_refresh.py
+
+import threading
+import time
+
+import pytest
+
+from app.snapshots import publish_snapshot
+from app.tasks import KEY_PRODUCERS
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def water_job(monkeypatch):
+    """Replaces the water job with one that publishes new data after a short delay; returns its run count."""
+    runs = []
+
+    def job():
+        runs.append(time.time())
+        time.sleep(0.2)
+        publish_snapshot('water_data', {'current': {'discharge': 900}})
+    monkeypatch.setitem(KEY_PRODUCERS, 'water_data', dict(KEY_PRODUCERS['water_data'], func=job))
+    return runs
+
+
+@pytest.fixture
+def expired_water():
+    now = time.time()
+    publish_snapshot('water_data', {'current': {'discharge': 1200}},
+                     freshness={'fetchedAt': now - 3600, 'expiresAt': now - 60})
+
+
+def test_expired_data_is_served_stale_while_it_refreshes(client, water_job, expired_water):
+    response = client.get('/api/water/current')
+
+    assert response.status_code == 200
+    assert response.get_json()['discharge'] == 1200
+    assert response.headers['X-Data-Stale'] == 'true'
+    wait_for(lambda: client.get('/api/water/current').get_json()['discharge'] == 900)
+    fresh = client.get('/api/water/current')
+    assert fresh.headers['X-Data-Stale'] == 'false'
+    assert len(water_job) == 1
+
+
+def test_concurrent_requests_share_one_refresh(client, water_job, expired_water):
+    threads = [threading.Thread(target=client.get, args=('/api/water/current',)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    wait_for(lambda: client.get('/api/water/current').get_json()['discharge'] == 900)
+    assert len(water_job) == 1
+
+
+def test_a_key_is_refreshed_at_most_once_per_lock_period(client, water_job, expired_water):
+    client.get('/api/water/current')
+    wait_for(lambda: len(water_job) == 1 and client.get('/api/water/current').get_json()['discharge'] == 900)
+    now = time.time()
+    publish_snapshot('water_data', {'current': {'discharge': 1200}},
+                     freshness={'fetchedAt': now - 3600, 'expiresAt': now - 60})
+
+    client.get('/api/water/current')
+    time.sleep(0.3)
+
+    assert len(water_job) == 1
+
+
+def test_freshness_of_object_and_list_bodies(client):
+    publish_snapshot('water_data', {'current': {'discharge': 1200}})
+    publish_snapshot('forecast_scores', [{'timestamp': '2025-07-01T06:00', 'score': {'score': 7}}])
+
+    current = client.get('/api/water/current')
+    forecast = client.get('/api/rowcast/forecast')
+
+    assert current.get_json()['freshness']['fetchedAt'] == current.headers['X-Data-Fetched-At']
+    assert isinstance(forecast.get_json(), list)
+    assert forecast.headers['X-Data-Fetched-At'] and forecast.headers['X-Data-Expires-At']
+    assert forecast.headers['X-Data-Stale'] == 'false'
+
+
+WEATHER = {'current': {'apparentTemp': 80, 'windSpeed': 5, 'windGust': 8, 'precipitation': 0, 'uvIndex': 3}}
+WATER = {'current': {'discharge': 5000, 'waterTemp': 75}}
+
+
+@pytest.fixture
+def input_jobs(monkeypatch):
+    """Weather and water jobs that publish at once and after a delay, each rebuilding the composite views."""
+    from app.tasks import update_composite_views
+
+    def job(key, data, delay):
+        def run():
+            time.sleep(delay)
+            publish_snapshot(key, data)
+            update_composite_views((key,))
+        return run
+    monkeypatch.setitem(KEY_PRODUCERS, 'weather_data', dict(KEY_PRODUCERS['weather_data'],
+                                                            func=job('weather_data', WEATHER, 0)))
+    monkeypatch.setitem(KEY_PRODUCERS, 'water_data', dict(KEY_PRODUCERS['water_data'],
+                                                          func=job('water_data', WATER, 0.3)))
+
+
+def test_cold_start_waits_for_a_view_until_all_its_inputs_arrived(client, input_jobs):
+    # The weather job finishes first; rowcast_current cannot be built until the water data is in
+    response = client.get('/api/rowcast')
+
+    assert response.status_code == 200
+    assert response.get_json()['rowcastScore'] > 0
+
+
+def test_views_without_inputs_are_not_published():
+    from app.snapshots import get_versions
+    from app.tasks import update_composite_views
+    publish_snapshot('weather_data', WEATHER)
+
+    update_composite_views(('weather_data',))
+
+    assert get_versions(['rowcast_current'])['rowcast_current'].version is None
+    assert get_versions(['complete_view'])['complete_view'].version is not None
+
+
+def test_publishing_is_abandoned_when_an_input_changed():
+    from app.snapshots import get_versions, publish_snapshots
+    version = publish_snapshot('weather_data', WEATHER)
+    publish_snapshot('weather_data', WEATHER)
+
+    assert publish_snapshots({'complete_view': {'run': 1}}, inputs={'weather_data': version}) is None
+    assert publish_snapshots({'complete_view': {'run': 1}}, inputs={'water_data': None}) is not None
+    assert get_versions(['complete_view'])['complete_view'].version is not None
+
+
+def test_a_rebuild_from_older_inputs_does_not_replace_a_newer_one(monkeypatch):
+    from app.snapshots import snapshot_cache
+    from app.tasks import COMPOSITE_VIEWS, update_composite_views
+    publish_snapshot('weather_data', WEATHER)
+    publish_snapshot('water_data', WATER)
+    build = COMPOSITE_VIEWS['rowcast_current']['build']
+
+    def build_while_water_is_republished(weather, water):
+        # Another worker publishes new water data and rebuilds while this build is running
+        monkeypatch.setitem(COMPOSITE_VIEWS['rowcast_current'], 'build', build)
+        publish_snapshot('water_data', dict(WATER, current=dict(WATER['current'], discharge=9000)))
+        update_composite_views(('water_data',))
+        return build(weather, water)
+    monkeypatch.setitem(COMPOSITE_VIEWS['rowcast_current'], 'build', build_while_water_is_republished)
+
+    update_composite_views(('weather_data',))
+
+    assert snapshot_cache.get('rowcast_current')['params']['discharge'] == 9000
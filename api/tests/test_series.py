@@ -0,0 +1,52 @@
+# tests/test_series.py
+
+from app.series import encode_columns, select_rows, select_rows_at
+from app.snapshots import publish_snapshot, snapshot_cache
+
+ALERT = {'event': 'Heat Advisory', 'severity': 'Moderate'}
+ROWS = [
+    {'timestamp': '2025-07-01T07:00', 'score': {'score': 6.5, 'factors': {'wind': 0.9}},
+     'conditions': {'windSpeed': 8, 'weatherAlerts': [ALERT]}},
+    {'timestamp': '2025-07-01T06:00', 'score': {'score': 7.0, 'factors': {'wind': 1.0}},
+     'conditions': {'windSpeed': 5, 'weatherAlerts': [ALERT]}},
+    {'timestamp': '2025-07-01T08:00', 'score': {'score': 5.5, 'factors': {'wind': 0.7}},
+     'conditions': {'windSpeed': 12, 'weatherAlerts': []}},
+]
+
+
+def test_columns_are_sorted_by_time_with_alerts_stored_once():
+    series = encode_columns(ROWS)
+
+    assert series['epochs'] == sorted(series['epochs'])
+    assert series['columns']['score.score'] == [7.0, 6.5, 5.5]
+    assert series['columns']['score.factors.wind'] == [1.0, 0.9, 0.7]
+    assert series['alerts'] == [ALERT]
+    assert series['columns']['conditions.weatherAlerts'] == [[0], [0], []]
+
+
+def test_rows_round_trip():
+    series = encode_columns(ROWS)
+
+    assert select_rows(series) == sorted(ROWS, key=lambda row: row['timestamp'])
+
+
+def test_select_rows_by_range_limit_and_fields():
+    series = encode_columns(ROWS)
+    start = series['epochs'][1]
+
+    assert select_rows(series, start=start, fields=['score.score']) == [
+        {'timestamp': '2025-07-01T07:00', 'score': {'score': 6.5}},
+        {'timestamp': '2025-07-01T08:00', 'score': {'score': 5.5}},
+    ]
+    assert select_rows(series, limit=1, fields=['conditions.weatherAlerts']) == [
+        {'timestamp': '2025-07-01T06:00', 'conditions': {'weatherAlerts': [ALERT]}}
+    ]
+    assert select_rows_at(series, [2], fields=['score']) == [
+        {'timestamp': '2025-07-01T08:00', 'score': {'score': 5.5, 'factors': {'wind': 0.7}}}
+    ]
+
+
+def test_score_series_are_stored_as_columns():
+    publish_snapshot('forecast_scores', ROWS)
+
+    assert snapshot_cache.get('forecast_scores') == encode_columns(ROWS)
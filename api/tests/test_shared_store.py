@@ -0,0 +1,95 @@
+# tests/test_shared_store.py
+
+import json
+import os
+import time
+
+import pytest
+
+from app import snapshots
+from app.snapshots import SharedMemorySnapshotStore, get_versions, load_body, publish_snapshot, publish_snapshots
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Publishes into a shared-memory snapshot store in a scratch directory."""
+    shared = SharedMemorySnapshotStore(str(tmp_path / 'shared'))
+    monkeypatch.setattr(snapshots, 'snapshot_store', shared)
+    return shared
+
+
+def manifest(store):
+    with open(os.path.join(store.directory, store.MANIFEST)) as f:
+        return json.load(f)
+
+
+def snapshot_file(store, key, version):
+    return os.path.join(store.directory, f"{key}@{version}.snap")
+
+
+def test_publishes_are_readable_from_another_store_instance(store):
+    generation = publish_snapshots({'weather_data': {'current': {'temp': 70}}, 'water_data': {'current': {'discharge': 1}}})
+    # Another worker process maps the same files
+    other = SharedMemorySnapshotStore(store.directory)
+
+    assert other.versions(['weather_data', 'water_data']) == {'weather_data': str(generation),
+                                                              'water_data': str(generation)}
+    assert load_body('water_data', str(generation), 'current')[0] is not None
+    assert get_versions(['water_data'])['water_data'].expires_at is not None
+
+
+def test_superseded_files_are_kept_for_the_ttl_after_being_replaced(store):
+    old = publish_snapshot('water_data', {'current': {'discharge': 1200}})
+    # Written long ago, but current until the next publish
+    os.utime(snapshot_file(store, 'water_data', old), (0, 0))
+    publish_snapshot('water_data', {'current': {'discharge': 900}})
+
+    assert os.path.exists(snapshot_file(store, 'water_data', old))
+    assert time.time() - manifest(store)['superseded'][f"water_data@{old}.snap"] < 5
+
+
+def test_superseded_files_are_deleted_after_the_ttl(store, monkeypatch):
+    monkeypatch.setattr(snapshots, 'SUPERSEDED_TTL', 0.2)
+    first = publish_snapshot('water_data', {'current': {'discharge': 1200}})
+    second = publish_snapshot('water_data', {'current': {'discharge': 900}})
+    time.sleep(0.3)
+    third = publish_snapshot('water_data', {'current': {'discharge': 600}})
+
+    assert not os.path.exists(snapshot_file(store, 'water_data', first))
+    assert os.path.exists(snapshot_file(store, 'water_data', second))
+    assert os.path.exists(snapshot_file(store, 'water_data', third))
+    assert list(manifest(store)['superseded']) == [f"water_data@{second}.snap"]
+
+
+def test_orphaned_files_age_out_by_write_time(store):
+    publish_snapshot('water_data', {'current': {'discharge': 1200}})
+    orphan = snapshot_file(store, 'water_data', 1)
+    in_progress = snapshot_file(store, 'weather_data', 2)
+    for path in (orphan, in_progress):
+        with open(path, 'wb') as f:
+            f.write(b'RCSNAP1\n')
+    os.utime(orphan, (0, 0))
+
+    publish_snapshot('water_data', {'current': {'discharge': 900}})
+
+    assert not os.path.exists(orphan)
+    assert os.path.exists(in_progress)
+
+
+def test_publishing_is_abandoned_when_an_input_changed(store):
+    version = publish_snapshot('weather_data', {'current': {'temp': 70}})
+    publish_snapshot('weather_data', {'current': {'temp': 72}})
+
+    assert publish_snapshots({'complete_view': {'run': 1}}, inputs={'weather_data': version}) is None
+    assert 'complete_view' not in manifest(store)['keys']
+    assert not [name for name in os.listdir(store.directory) if name.startswith('complete_view')]
+
+
+def test_an_older_generation_is_not_swapped_in(store, monkeypatch):
+    older = store.next_generation()
+    newer = publish_snapshot('water_data', {'current': {'discharge': 900}})
+    monkeypatch.setattr(store, 'next_generation', lambda: older)
+
+    assert publish_snapshot('water_data', {'current': {'discharge': 1200}}) is None
+    assert manifest(store)['keys']['water_data']['version'] == str(newer)
+    assert not os.path.exists(snapshot_file(store, 'water_data', older))
@@ -0,0 +1,39 @@
+# tests/test_snapshot_cache.py
+
+from app.snapshots import publish_snapshot, snapshot_cache
+
+
+def test_unpublished_key_is_none():
+    assert snapshot_cache.get('water_data') is None
+
+
+def test_reads_are_decoded_once_per_version():
+    publish_snapshot('water_data', {'current': {'discharge': 1200}})
+
+    assert snapshot_cache.get('water_data')['current'] == {'discharge': 1200}
+    assert snapshot_cache.get('water_data')['current'] == {'discharge': 1200}
+    assert snapshot_cache.stats()['keys']['water_data'] == {'hits': 1, 'misses': 1, 'hitRatio': 0.5}
+
+
+def test_republishing_invalidates_the_entry():
+    publish_snapshot('water_data', {'current': {'discharge': 1200}})
+    snapshot_cache.get('water_data')
+    publish_snapshot('water_data', {'current': {'discharge': 900}})
+
+    assert snapshot_cache.get('water_data')['current'] == {'discharge': 900}
+    assert snapshot_cache.stats()['keys']['water_data']['misses'] == 2
+
+
+def test_get_many_reads_only_stale_keys(monkeypatch):
+    publish_snapshot('water_data', {'current': {'discharge': 1200}})
+    publish_snapshot('weather_data', {'current': {'temp': 70}})
+    snapshot_cache.get('water_data')
+
+    from app.snapshots import snapshot_store
+    reads = []
+    get = snapshot_store.get
+    monkeypatch.setattr(snapshot_store, 'get', lambda items, **kwargs: reads.append(items) or get(items, **kwargs))
+    results = snapshot_cache.get_many(['water_data', 'weather_data'])
+
+    assert results['weather_data']['current'] == {'temp': 70}
+    assert [[key for key, _, _ in items] for items in reads] == [['weather_data']]
@@ -0,0 +1,145 @@
+# tests/test_snapshots.py
+
+import json
+import os
+import threading
+
+import brotli
+
+from app import snapshots
+from app.extensions import redis_client
+from app.local_snapshots import local_snapshots
+from app.snapshots import (SUPERSEDED_TTL, body_key, get_versions, load_body, publish_snapshot, publish_snapshots,
+                           snapshot_cache, snapshot_store, versioned)
+
+
+def test_a_run_swaps_all_of_its_keys_at_once():
+    generation = publish_snapshots({'weather_data': {'current': {'run': 1}}, 'water_data': {'current': {'run': 1}}})
+
+    assert {key: state.version for key, state in get_versions(['weather_data', 'water_data']).items()} == {
+        'weather_data': str(generation), 'water_data': str(generation)}
+
+
+def test_readers_never_see_a_mix_of_runs():
+    stop = threading.Event()
+
+    def publish():
+        run = 0
+        while not stop.is_set():
+            run += 1
+            publish_snapshots({'weather_data': {'current': {'run': run}}, 'water_data': {'current': {'run': run}}})
+
+    publish_snapshots({'weather_data': {'current': {'run': 0}}, 'water_data': {'current': {'run': 0}}})
+    publisher = threading.Thread(target=publish)
+    publisher.start()
+    try:
+        for _ in range(200):
+            versions = snapshot_store.versions(['weather_data', 'water_data'])
+            data = snapshot_cache.get_many(['weather_data', 'water_data'], versions)
+            assert versions['weather_data'] == versions['water_data']
+            assert data['weather_data']['current'] == data['water_data']['current']
+    finally:
+        stop.set()
+        publisher.join()
+
+
+def test_replaced_generations_stay_readable_until_they_expire():
+    old = publish_snapshot('water_data', {'current': {'discharge': 1200}})
+    publish_snapshot('water_data', {'current': {'discharge': 900}})
+
+    assert snapshot_cache.get_many(['water_data'], {'water_data': str(old)})['water_data']['current'] == {'discharge': 1200}
+    assert 0 < redis_client.ttl(versioned('water_data', old)) <= SUPERSEDED_TTL
+    assert redis_client.ttl(body_key('water_data', 'current', 'gzip', old)) <= SUPERSEDED_TTL
+
+
+def test_generations_keep_increasing_after_redis_loses_its_data():
+    old = publish_snapshot('water_data', {'current': {'discharge': 1200}})
+    redis_client.flushall()
+
+    assert publish_snapshot('water_data', {'current': {'discharge': 900}}) > old
+
+
+def test_local_snapshots_serve_while_redis_has_nothing():
+    generation = publish_snapshot('water_data', {'current': {'discharge': 1200}})
+    redis_client.flushall()
+
+    state = get_versions(['water_data'])['water_data']
+    assert state.local and state.version == str(generation)
+    assert load_body('water_data', state.version, 'current')[0] is not None
+
+
+def test_etag_changes_when_a_flushed_store_republishes(client):
+    publish_snapshot('water_data', {'current': {'discharge': 1200}})
+    etag = client.get('/api/water/current').headers['ETag']
+    # Redis restarted empty on a node without local snapshot files, and the next run published new data
+    redis_client.flushall()
+    for name in os.listdir(local_snapshots.directory):
+        os.remove(os.path.join(local_snapshots.directory, name))
+    publish_snapshot('water_data', {'current': {'discharge': 900}})
+
+    response = client.get('/api/water/current', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.get_json()['discharge'] == 900
+
+
+def test_identity_clients_get_the_gzip_body_inflated():
+    generation = publish_snapshot('water_data', {'current': {'discharge': 1200}})
+
+    body, encoding = load_body('water_data', str(generation), 'current', {'identity'})
+
+    assert encoding == 'identity'
+    assert json.loads(body)['discharge'] == 1200
+
+
+def test_brotli_is_preferred_when_accepted():
+    generation = publish_snapshot('water_data', {'current': {'discharge': 1200}})
+
+    body, encoding = load_body('water_data', str(generation), 'current', {'gzip', 'br', 'identity'})
+
+    assert encoding == 'br'
+    assert json.loads(brotli.decompress(body))['discharge'] == 1200
+    assert load_body('water_data', str(generation), 'current', {'gzip', 'identity'})[1] == 'gzip'
+
+
+def test_identity_responses_are_plain_json(client):
+    publish_snapshot('water_data', {'current': {'discharge': 1200}})
+
+    response = client.get('/api/water/current', headers={'Accept-Encoding': 'identity'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_json()['discharge'] == 1200
+
+
+def test_a_run_that_started_earlier_cannot_swap_in_last(monkeypatch):
+    render = snapshots._render_snapshot
+    later = []
+
+    def slow_render(key, data, generation, freshness):
+        if not later:
+            # A later run takes the next generation and publishes while this one is still rendering
+            later.append(None)
+            later.append(publish_snapshot('water_data', {'current': {'discharge': 900}}))
+        return render(key, data, generation, freshness)
+    monkeypatch.setattr(snapshots, '_render_snapshot', slow_render)
+
+    assert publish_snapshot('water_data', {'current': {'discharge': 1200}}) is None
+    assert get_versions(['water_data'])['water_data'].version == str(later[1])
+    assert snapshot_cache.get('water_data')['current'] == {'discharge': 900}
+
+
+def test_workers_seeding_a_new_counter_at_once_get_distinct_generations(monkeypatch):
+    floor = snapshots._generation_floor
+    others = []
+
+    def racing_floor(versions=()):
+        if not others:
+            # Another worker seeds the counter and takes a generation in between
+            others.append(True)
+            others.append(snapshot_store.next_generation())
+        return floor(versions)
+    monkeypatch.setattr(snapshots, '_generation_floor', racing_floor)
+
+    generation = snapshot_store.next_generation()
+
+    assert generation == others[1] + 1
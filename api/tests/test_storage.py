@@ -0,0 +1,89 @@
+# tests/test_storage.py
+
+import os
+import runpy
+from types import SimpleNamespace
+
+import pytest
+
+from app import extensions
+from app.extensions import storage_health
+
+
+def test_storage_health_pings_the_backend():
+    health = storage_health()
+
+    assert health['backend'] == 'memory'
+    assert health['ok'] is True
+    assert health['latencyMs'] >= 0
+
+
+def test_storage_health_reports_an_unreachable_backend(redis_down):
+    health = storage_health()
+
+    assert health['ok'] is False
+    assert health['error']
+
+
+def test_health_route_answers_503_while_storage_is_down(client, redis_down):
+    assert client.get('/api/health').status_code == 503
+
+
+def test_health_route_answers_200(client):
+    response = client.get('/api/health')
+
+    assert response.status_code == 200
+    assert response.get_json()['ok'] is True
+
+
+def test_unknown_backends_are_rejected(monkeypatch):
+    monkeypatch.setattr(extensions, 'STORAGE_BACKEND', 'sqlite')
+
+    with pytest.raises(ValueError):
+        extensions._create_clients()
+
+
+@pytest.mark.parametrize('variable', ['GUNICORN_WORKERS', 'WEB_CONCURRENCY'])
+@pytest.mark.parametrize('backend', ['memory', 'file'])
+def test_in_process_backends_refuse_several_workers(monkeypatch, backend, variable):
+    monkeypatch.setattr(extensions, 'STORAGE_BACKEND', backend)
+    monkeypatch.setenv(variable, '4')
+
+    with pytest.raises(RuntimeError, match='workers'):
+        extensions._create_clients()
+
+
+def test_in_process_backends_run_a_single_worker(monkeypatch):
+    monkeypatch.setattr(extensions, 'STORAGE_BACKEND', 'file')
+    monkeypatch.setenv('GUNICORN_WORKERS', '1')
+
+    text, binary = extensions._create_clients()
+    text.set('key', 'value')
+
+    assert binary.get('key') == b'value'
+
+
+def test_in_process_backends_refuse_gunicorn_without_its_config(monkeypatch):
+    monkeypatch.setattr(extensions, 'STORAGE_BACKEND', 'memory')
+    monkeypatch.setenv('SERVER_SOFTWARE', 'gunicorn/23.0.0')
+    monkeypatch.delenv('GUNICORN_SERVER_WORKERS', raising=False)
+
+    with pytest.raises(RuntimeError, match='gunicorn.conf.py'):
+        extensions._create_clients()
+
+
+@pytest.mark.parametrize('workers, refused', [(1, False), (4, True)])
+def test_in_process_backends_check_the_gunicorn_worker_count(monkeypatch, workers, refused):
+    monkeypatch.setattr(extensions, 'STORAGE_BACKEND', 'memory')
+    monkeypatch.setenv('SERVER_SOFTWARE', 'gunicorn/23.0.0')
+    # The environment claims a single worker; only the count gunicorn reports counts
+    monkeypatch.setenv('GUNICORN_WORKERS', '1')
+    monkeypatch.setenv('GUNICORN_SERVER_WORKERS', '0')
+    config = runpy.run_path(os.path.join(os.path.dirname(__file__), '..', 'gunicorn.conf.py'))
+    config['on_starting'](SimpleNamespace(cfg=SimpleNamespace(workers=workers)))
+
+    if refused:
+        with pytest.raises(RuntimeError, match='4 workers'):
+            extensions._create_clients()
+    else:
+        assert extensions._create_clients()
@@ -0,0 +1,57 @@
+# tests/test_timeline.py
+
+import time
+from datetime import datetime
+
+from app.series import encode_columns
+from app.snapshots import publish_snapshot
+from app.timeline import build_score_timeline, timeline_samples
+from app.utils import EST
+
+HOUR = 3600
+
+
+def rows(start, count, spacing, score):
+    """count rows of one score every spacing seconds from epoch start, with naive local timestamps."""
+    return [{'timestamp': datetime.fromtimestamp(start + i * spacing, EST).strftime('%Y-%m-%dT%H:%M'),
+             'score': {'score': score}} for i in range(count)]
+
+
+def test_finer_tiers_take_precedence_up_to_their_horizon():
+    now = (int(time.time()) // HOUR + 1) * HOUR
+    timeline = build_score_timeline(rows(now, 16, 900, 9), rows(now, 72, HOUR, 5), rows(now, 168, HOUR, 2), now=now)
+
+    sources = [row['source'] for row in timeline]
+    assert sources[:12] == ['short_term_forecast'] * 12
+    assert set(sources[12:57]) == {'forecast_scores'}
+    assert set(sources[57:]) == {'extended_forecast_scores'}
+    epochs = [row['timestamp'] for row in timeline]
+    assert epochs == sorted(epochs) and len(epochs) == len(set(epochs))
+
+
+def test_missing_tiers_are_backfilled_by_coarser_ones():
+    now = (int(time.time()) // HOUR + 1) * HOUR
+    timeline = build_score_timeline(None, rows(now, 24, HOUR, 5), None, now=now)
+
+    assert [row['resolution'] for row in timeline] == [60] * 24
+
+
+def test_samples_keep_holes_and_drop_the_past():
+    now = 10 * HOUR
+    series = rows(8 * HOUR, 3, HOUR, 7) + rows(13 * HOUR, 1, HOUR, 6)
+    timeline = encode_columns([dict(row, resolution=60) for row in series])
+
+    assert timeline_samples(timeline, now=now) == [(10 * HOUR, 7, HOUR), (13 * HOUR, 6, HOUR)]
+
+
+def test_windows_are_searched_in_the_published_timeline(client):
+    now = (int(time.time()) // HOUR + 1) * HOUR
+    publish_snapshot('score_timeline', build_score_timeline(
+        rows(now, 12, 900, 9), rows(now, 48, HOUR, 5), None, now=now))
+
+    response = client.get('/api/rowcast/windows?duration=120&threshold=8&k=3')
+
+    assert response.status_code == 200
+    windows = response.get_json()['windows']
+    # Only the short-term tier clears 8, so there is room for exactly one 2-hour window in its 3 hours
+    assert [window['minScore'] for window in windows] == [9]
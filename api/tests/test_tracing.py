@@ -0,0 +1,92 @@
+# tests/test_tracing.py
+
+import json
+import os
+import time
+
+from app.tracing import SpanExporter, group_traces, span
+
+
+def record(i):
+    return {'traceId': f"t{i}", 'spanId': f"s{i}", 'parentId': None, 'name': f"job {i}", 'start': i,
+            'durationMs': 1.0, 'attributes': {}, 'status': 'ok'}
+
+
+def test_spans_nest_into_traces(monkeypatch):
+    exporter = SpanExporter(size=10)
+    monkeypatch.setattr('app.tracing.exporter', exporter)
+    with span('job weather', new_trace=True):
+        with span('publish snapshots'):
+            pass
+
+    (trace,) = group_traces(exporter.spans())
+    assert [(s['name'], s['depth']) for s in trace['spans']] == [('job weather', 0), ('publish snapshots', 1)]
+
+
+def test_export_file_is_read_from_its_tail(tmp_path):
+    path = tmp_path / 'spans.jsonl'
+    exporter = SpanExporter(size=5, path=str(path))
+    for i in range(1000):
+        exporter.export(record(i))
+
+    assert [s['spanId'] for s in exporter.spans()] == [f"s{i}" for i in range(995, 1000)]
+    assert [s['spanId'] for s in exporter.spans(limit=2)] == ['s998', 's999']
+
+
+def test_export_file_is_rotated(tmp_path):
+    path = tmp_path / 'spans.jsonl'
+    line_size = len(json.dumps(record(99))) + 1
+    exporter = SpanExporter(size=5, path=str(path), max_bytes=10 * line_size, flush_interval=60)
+    for i in range(25):
+        exporter.export(record(i))
+        if i % 3 == 2:
+            exporter.flush()
+    exporter.flush()
+
+    assert os.path.getsize(path) <= 10 * line_size
+    assert os.path.getsize(f"{path}.1") <= 12 * line_size
+    assert exporter.spans()[-1]['spanId'] == 's24'
+
+
+def test_export_writes_spans_in_batches(tmp_path):
+    path = tmp_path / 'spans.jsonl'
+    exporter = SpanExporter(size=5, path=str(path), batch_size=3, flush_interval=60)
+    exporter.export(record(1))
+    exporter.export(record(2))
+
+    assert not path.exists()
+    exporter.export(record(3))
+    for _ in range(100):
+        if path.exists() and len(path.read_text().splitlines()) == 3:
+            break
+        time.sleep(0.01)
+    assert [json.loads(line)['spanId'] for line in path.read_text().splitlines()] == ['s1', 's2', 's3']
+
+
+def test_unfinished_lines_are_skipped(tmp_path):
+    path = tmp_path / 'spans.jsonl'
+    exporter = SpanExporter(size=5, path=str(path))
+    exporter.export(record(1))
+    exporter.flush()
+    with open(path, 'a') as f:
+        f.write('{"traceId": "t2", "spa')
+
+    assert [s['spanId'] for s in exporter.spans()] == ['s1']
+
+
+def test_debug_traces_are_off_by_default(client):
+    assert client.get('/debug/traces').status_code == 404
+
+
+def test_debug_traces_when_enabled(client, monkeypatch):
+    monkeypatch.setattr('app.routes.DEBUG_TRACES_ENABLED', True)
+
+    assert client.get('/debug/traces?format=json').status_code == 200
+
+
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setattr('app.routes.METRICS_TOKEN', 'secret')
+
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
@@ -0,0 +1,107 @@
+# tests/test_upstream.py
+
+import json
+import time
+
+import pytest
+import requests
+
+from app import upstream
+from app.extensions import redis_client
+from app.snapshots import publish_snapshot
+from app.upstream import BREAKER_FAILURE_THRESHOLD, BREAKERS_KEY, UpstreamUnavailable, breaker_for, upstream_get
+
+URL = 'https://api.open-meteo.com/v1/forecast'
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Answers upstream calls with the queued status codes (or exceptions) and records them."""
+    made = []
+    queued = []
+
+    def get(url, **kwargs):
+        made.append(url)
+        outcome = queued.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return Response(outcome)
+    monkeypatch.setattr('app.upstream.requests.get', get)
+    return made, queued
+
+
+def fail(times):
+    for _ in range(times):
+        with pytest.raises(requests.exceptions.ConnectionError):
+            upstream_get(URL)
+
+
+def test_breaker_opens_after_consecutive_failures(calls):
+    made, queued = calls
+    queued.extend([requests.exceptions.ConnectionError()] * BREAKER_FAILURE_THRESHOLD)
+    fail(BREAKER_FAILURE_THRESHOLD)
+
+    with pytest.raises(UpstreamUnavailable):
+        upstream_get(URL)
+    assert len(made) == BREAKER_FAILURE_THRESHOLD
+    assert json.loads(redis_client.hget(BREAKERS_KEY, 'api.open-meteo.com'))['state'] == 'open'
+
+
+def test_server_errors_and_rate_limits_count_as_failures(calls):
+    _, queued = calls
+    queued.extend([503, 429, 500])
+    for _ in range(3):
+        upstream_get(URL)
+
+    assert breaker_for('api.open-meteo.com').state == 'open'
+
+
+def test_a_success_resets_the_failure_count(calls):
+    _, queued = calls
+    queued.extend([500] * (BREAKER_FAILURE_THRESHOLD - 1) + [200] + [500] * (BREAKER_FAILURE_THRESHOLD - 1))
+    for _ in range(2 * BREAKER_FAILURE_THRESHOLD - 1):
+        upstream_get(URL)
+
+    assert breaker_for('api.open-meteo.com').state == 'closed'
+
+
+def test_half_open_probe_closes_or_reopens_with_longer_backoff(calls, monkeypatch):
+    made, queued = calls
+    monkeypatch.setattr(upstream.random, 'uniform', lambda low, high: 1.0)
+    queued.extend([500] * BREAKER_FAILURE_THRESHOLD)
+    for _ in range(BREAKER_FAILURE_THRESHOLD):
+        upstream_get(URL)
+    breaker = breaker_for('api.open-meteo.com')
+    first_backoff = breaker.retry_at - time.time()
+
+    # The backoff passed: one probe goes out, fails, and the breaker re-opens for twice as long
+    breaker.retry_at = time.time()
+    queued.append(500)
+    upstream_get(URL)
+    assert breaker.state == 'open'
+    assert breaker.retry_at - time.time() == pytest.approx(2 * first_backoff, rel=0.01)
+
+    breaker.retry_at = time.time()
+    queued.append(200)
+    upstream_get(URL)
+    assert breaker.state == 'closed' and breaker.opens == 0
+    assert len(made) == BREAKER_FAILURE_THRESHOLD + 2
+
+
+def test_open_breakers_flag_responses_stale(client, calls):
+    _, queued = calls
+    publish_snapshot('water_data', {'current': {'discharge': 1200}})
+    queued.extend([500] * BREAKER_FAILURE_THRESHOLD)
+    for _ in range(BREAKER_FAILURE_THRESHOLD):
+        upstream_get('https://waterservices.usgs.gov/nwis/iv/')
+
+    response = client.get('/api/water/current')
+
+    assert response.status_code == 200
+    assert response.headers['X-Data-Stale'] == 'true'
+    assert response.headers['X-Upstream-Unavailable'] == 'waterservices.usgs.gov'
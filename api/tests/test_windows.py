@@ -0,0 +1,81 @@
+# tests/test_windows.py
+
+import random
+
+import pytest
+
+from app.snapshots import publish_snapshot
+from app.windows import best_windows, scan_windows
+
+HOUR = 3600
+
+
+def brute_force(samples, duration):
+    """Minimum and time-weighted mean of every complete, gap-free window, sample by sample."""
+    results = []
+    for first, (start, _, _) in enumerate(samples):
+        end = start + duration
+        covered = [(epoch, score, span) for epoch, score, span in samples[first:] if epoch < end]
+        last_epoch, _, last_span = covered[-1]
+        gapless = all(epoch + span >= following[0] for (epoch, _, span), following in zip(covered, covered[1:]))
+        if last_epoch + last_span < end or not gapless:
+            continue
+        weighted = sum(score * (min(epoch + span, end) - epoch) for epoch, score, span in covered)
+        results.append((first, end, min(score for _, score, _ in covered), weighted / duration))
+    return results
+
+
+def test_scan_matches_a_brute_force_search():
+    rng = random.Random(7)
+    samples = []
+    epoch = 0
+    for _ in range(200):
+        span = rng.choice((900, 900, 3600))
+        samples.append((epoch, round(rng.uniform(0, 10), 2), span))
+        # Occasional holes in the data
+        epoch += span + (1800 if rng.random() < 0.05 else 0)
+
+    for duration in (900, 5400, 4 * HOUR):
+        expected = brute_force(samples, duration)
+        actual = list(scan_windows(samples, duration))
+        assert [(first, end) for first, end, _, _ in actual] == [(first, end) for first, end, _, _ in expected]
+        for (_, _, minimum, mean), (_, _, expected_minimum, expected_mean) in zip(actual, expected):
+            assert minimum == expected_minimum
+            assert mean == pytest.approx(expected_mean)
+
+
+def test_windows_do_not_cross_holes():
+    samples = [(0, 8, HOUR), (HOUR, 8, HOUR), (3 * HOUR, 8, HOUR), (4 * HOUR, 8, HOUR)]
+
+    assert [first for first, _, _, _ in scan_windows(samples, 2 * HOUR)] == [0, 2]
+
+
+def test_best_windows_are_non_overlapping_and_best_first():
+    scores = [5, 7, 8, 8, 6, 9, 9, 9, 4]
+    samples = [(i * HOUR, score, HOUR) for i, score in enumerate(scores)]
+
+    windows = best_windows(samples, 2 * HOUR, 6, 3)
+
+    # The window from sample 6 also scores 9 but overlaps the one from sample 5, and every
+    # other window clearing 6 overlaps one of the two chosen
+    assert [window['score'] for window in windows] == [9, 8]
+    spans = sorted((window['start'], window['end']) for window in windows)
+    assert all(end <= start for (_, end), (start, _) in zip(spans, spans[1:]))
+
+
+def test_mean_mode_ranks_by_mean():
+    samples = [(i * HOUR, score, HOUR) for i, score in enumerate([10, 3, 6, 6])]
+
+    assert best_windows(samples, 2 * HOUR, 6, 1, mode='mean')[0]['meanScore'] == 6.5
+    assert best_windows(samples, 2 * HOUR, 6, 1, mode='min')[0]['minScore'] == 6
+
+
+@pytest.mark.parametrize('threshold', ['nan', 'inf', '-inf', '1e400', '11', '-1', 'high'])
+def test_threshold_must_be_a_score(client, threshold):
+    rows = [{'timestamp': f"2030-07-01T{hour:02d}:00", 'score': {'score': 8}, 'resolution': 60} for hour in range(24)]
+    publish_snapshot('score_timeline', rows)
+
+    response = client.get(f"/api/rowcast/windows?threshold={threshold}")
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()